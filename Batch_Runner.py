@@ -0,0 +1,112 @@
+'''
+Batch runner of WFO Step 1 / Backtesting over a matrix of strategies x symbols x timeframes
+'''
+
+import argparse
+import os
+from config.strategy_config import AppConfig
+from optimization.batchscheduler import BatchJob, BatchManifest, BatchScheduler
+from Backtesting import Backtesting
+from WFO_Step1 import WFOStep1
+
+STEP_CLASSES = {
+    "wfo_step1": WFOStep1,
+    "backtesting": Backtesting,
+}
+
+
+class BatchRunner(object):
+
+    def parse_args(self):
+        parser = argparse.ArgumentParser(description='Runs WFO Step 1 or Backtesting for every strategy/symbol/timeframe combination in one pool of worker processes. '
+                                                     'All the other arguments are passed to the step (e.g. -r, --startyear, -e, --wfo_training_period)',
+                                         allow_abbrev=False)
+
+        parser.add_argument('--step',
+                            type=str,
+                            default="wfo_step1",
+                            choices=list(STEP_CLASSES.keys()),
+                            help='The step to run')
+
+        parser.add_argument('-y', '--strategies',
+                            type=str,
+                            nargs='+',
+                            required=True,
+                            help='The strategy IDs')
+
+        parser.add_argument('-s', '--symbols',
+                            type=str,
+                            nargs='+',
+                            required=True,
+                            help='The Symbols/Currency Pairs To Process')
+
+        parser.add_argument('-t', '--timeframes',
+                            type=str,
+                            nargs='+',
+                            required=True,
+                            help='The timeframes')
+
+        parser.add_argument('-x', '--maxcpus',
+                            type=int,
+                            default=8,
+                            help='The max number of CPUs to use for processing')
+
+        parser.add_argument('--restart',
+                            action='store_true',
+                            help='Ignore the checkpoint manifest of a previous batch run with the same run ID and start from scratch')
+
+        return parser.parse_known_args()
+
+    def get_manifest_filename(self, step, step_args):
+        output_path = step.get_output_path(step.whereAmI(), step_args)
+        os.makedirs(output_path, exist_ok=True)
+        return '{}/{}_{}_BatchManifest.json'.format(output_path, step_args.runid, type(step).__name__)
+
+    def create_jobs(self, step_class, args, step_argv, startcash):
+        jobs = []
+        for strategy in args.strategies:
+            for symbol in args.symbols:
+                for timeframe in args.timeframes:
+                    step_args = step_class().parse_args(step_argv + ['-y', strategy, '-s', symbol, '-t', timeframe])
+                    wfo_cycles = step_class().get_wfo_cycles(step_args)
+                    for wfo_cycle_info in wfo_cycles:
+                        jobs.append(BatchJob(step_class, step_args, startcash, wfo_cycles, wfo_cycle_info))
+        return jobs
+
+    def run(self):
+        args, step_argv = self.parse_args()
+        step_class = STEP_CLASSES[args.step]
+        startcash = AppConfig.get_global_default_cash_size()
+
+        jobs = self.create_jobs(step_class, args, step_argv, startcash)
+        if len(jobs) == 0:
+            return
+
+        manifest_filename = self.get_manifest_filename(step_class(), jobs[0].args)
+        if args.restart and os.path.exists(manifest_filename):
+            os.remove(manifest_filename)
+        manifest = BatchManifest(manifest_filename)
+        print("Batch checkpoint manifest: {}".format(manifest_filename))
+
+        pending_jobs = []
+        for job in jobs:
+            if manifest.is_completed(job.key):
+                print("Skipping completed job {}".format(job.key))
+            elif not job.has_market_data():
+                print("!!! There is no market data for the start/end date range of job {}. Skipping.".format(job.key))
+            else:
+                print("\nPreparing job {}".format(job.key))
+                job.prepare()
+                pending_jobs.append(job)
+
+        scheduler = BatchScheduler(args.maxcpus, manifest)
+        scheduler.run(pending_jobs)
+
+
+def main():
+    runner = BatchRunner()
+    runner.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -13,6 +13,7 @@ from plotting.equity_curve import EquityCurvePlotter
 from model.backtestmodel import BacktestModel
 from model.backtestmodelgenerator import BacktestModelGenerator
 from strategies.helper.utils import Utils
+from strategies.helper.strategylogger import StrategyLogger
 from model.common import WFOMode
 from wfo.wfo_helper import WFOHelper
 from model.common import WFOMode, StrategyRunData, StrategyConfig
@@ -79,6 +80,16 @@ class DebugStrategy(object):
                             action ='store_true',
                             help=('Print Debug logs'))
 
+        parser.add_argument('--logringsize',
+                            type=int,
+                            default=0,
+                            help='Keep the last N strategy log records and print them if the strategy fails (0 - disabled)')
+
+        parser.add_argument('--tracefile',
+                            type=str,
+                            default=None,
+                            help='Write every strategy log record into this binary trace file')
+
         return parser.parse_args()
 
     def init_cerebro(self, args, startcash, lotsize, lottype):
@@ -350,6 +361,8 @@ class DebugStrategy(object):
         curr_wfo_cycle_info = wfo_cycles[0]
         self.update_wfo_params(curr_wfo_cycle_info)
 
+        StrategyLogger.configure(args.logringsize, args.tracefile)
+
         self.init_cerebro(args, self._startcash, self._lotsize, self._lottype)
 
         self.add_strategy()
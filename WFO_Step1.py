@@ -3,29 +3,30 @@ Step 1 - WFO Training process
 '''
  
 import backtrader as bt
-import backtrader.feeds as btfeeds
 
 import argparse
 from extensions.analyzers.drawdown import TVNetProfitDrawDown
 from extensions.analyzers.tradeanalyzer import TVTradeAnalyzer
 from extensions.sizers.percentsizer import VariablePercentSizer
 from extensions.sizers.cashsizer import FixedCashSizer
+from extensions.feeds.binarydata import WindowedFeedFactory
 from datetime import datetime
-from datetime import timedelta
 from config.strategy_config import AppConfig
 from config.strategy_enum import BTStrategyEnum
 from model.backtestmodel import BacktestModel
 from model.backtestmodelgenerator import BacktestModelGenerator
-from common.stfetcher import StFetcher
+from model.resultsstore import ResultsStoreFactory
+from optimization.optimizer import ProcessPoolOptimizer
+from optimization.paramgrid import ParameterGrid
+from optimization.screening import GridScreener
+from common.marketdatacatalog import MarketDataCatalog
 from strategies.helper.validation import ParametersValidator
 from strategies.helper.utils import Utils
 from wfo.wfo_helper import WFOHelper
 from model.common import WFOMode, StrategyRunData, StrategyConfig
 from model.reports_common import ColumnName
-import itertools
 import collections
 import os
-import csv
 import pandas as pd
 import objgraph
 import sys
@@ -49,8 +50,6 @@ class CerebroRunner(object):
 
     _DEBUG_MEMORY_STATS = False
 
-    _batch_number = 0
-
     def getsize(self, obj_0):
         """Recursively iterate to sum size of object & members."""
         _seen_ids = set()
@@ -89,13 +88,6 @@ class CerebroRunner(object):
             #gc.collect()
             #objgraph.show_refs(self.cerebro.runstrats[-1], max_depth=8, filename='memory_chain{:03d}.png'.format(self._batch_number), filter=lambda x: not inspect.isclass(x), refcounts=True)
 
-    def optimization_step(self, strat):
-        self._batch_number += 1
-        st = strat[0]
-        st.strat_id = self._batch_number
-        print('!! Finished Batch Run={}'.format(self._batch_number))
-        self.print_debug_memory_stats()
-
     def run_strategies(self):
         # Run over everything
         return self.cerebro.run()
@@ -110,20 +102,18 @@ class WFOStep1(object):
     def __init__(self):
         self._cerebro = None
         self._params = None
-        self. _is_output_file1_exists = None
-        self._is_output_file2_exists = None
         self._market_data_input_filename = None
         self._output_file1_full_name = None
         self._output_file2_full_name = None
-        self._ofile1 = None
-        self._ofile2 = None
-        self._writer1 = None
-        self._writer2 = None
+        self._store1 = None
+        self._store2 = None
         self._step1_model = None
+        self._strategy_class = None
+        self._strategy_params_grid = None
 
         self._equity_curve_plotter = EquityCurvePlotter("Step1")
 
-    def parse_args(self):
+    def parse_args(self, argv=None):
         parser = argparse.ArgumentParser(description='Walk Forward Optimization Step 1: Training')
 
         parser.add_argument('-r', '--runid',
@@ -188,7 +178,6 @@ class WFOStep1(object):
         parser.add_argument('-x', '--maxcpus',
                             type=int,
                             default=8,
-                            choices=[1, 2, 3, 4, 5, 7, 8],
                             help='The max number of CPUs to use for processing')
 
         parser.add_argument('-l', '--lottype',
@@ -222,23 +211,28 @@ class WFOStep1(object):
                             type=float,
                             help='The percentage of capital to risk on a trade')
 
+        parser.add_argument('--screentop',
+                            type=int,
+                            default=0,
+                            help='Screen the parameter grid with the fast exit simulator first and run only this number of top combinations through the full backtest (0 - run the whole grid)')
+
         parser.add_argument('--debug',
                             action='store_true',
                             help=('Print Debugs'))
 
-        return parser.parse_args()
+        return parser.parse_args(argv)
 
     def cleanup_cerebro(self, runner):
         # Clean up cerebro
         runner.cerebro = None
-        StFetcher.cleanall()
+        self._strategy_class = None
+        self._strategy_params_grid = None
         gc.collect()
 
     def init_cerebro(self, runner, args, startcash):
         # Create an instance of cerebro
         self._cerebro = bt.Cerebro(optreturn=True, maxcpus=args.maxcpus, preload=True, cheat_on_open=True)
 
-        self._cerebro.optcallback(runner.optimization_step)
         runner.cerebro = self._cerebro
 
         # Set our desired cash start
@@ -247,7 +241,7 @@ class WFOStep1(object):
         # Add the analyzers we are interested in
         self._cerebro.addanalyzer(bt.analyzers.SQN, _name="sqn")
         self._cerebro.addanalyzer(TVNetProfitDrawDown, _name="dd", initial_cash=startcash)
-        self._cerebro.addanalyzer(TVTradeAnalyzer, _name="ta", cash=startcash)
+        self._cerebro.addanalyzer(TVTradeAnalyzer, _name="ta", cash=startcash, deferstats=AppConfig.is_global_step1_deferred_stats())
 
         # add the sizer
         if args.lottype != "" and args.lottype == "Percentage":
@@ -258,6 +252,12 @@ class WFOStep1(object):
         if args.commtype.lower() == 'percentage':
             self._cerebro.broker.setcommission(args.commission)
 
+    def build_cerebro(self, args, startcash, wfo_cycle_info):
+        runner = CerebroRunner()
+        self.init_cerebro(runner, args, startcash)
+        self.add_datas(args, wfo_cycle_info)
+        return runner.cerebro
+
     def get_strategy_enum(self, args):
         return BTStrategyEnum.get_strategy_enum_by_str(args.strategy)
 
@@ -277,19 +277,6 @@ class WFOStep1(object):
     def get_marketdata_filename(self, exchange, symbol, timeframe):
         return './marketdata/{}/{}/{}/{}-{}-{}.csv'.format(exchange, symbol, timeframe, exchange, symbol, timeframe)
 
-    @staticmethod
-    def iterize(iterable):
-        niterable = list()
-        for elem in iterable:
-            if isinstance(elem, string_types):
-                elem = (elem,)
-            elif not isinstance(elem, collections.abc.Iterable):
-                elem = (elem,)
-
-            niterable.append(elem)
-
-        return niterable
-
     def get_wfo_cycles(self, args):
         start_date = self.get_wfo_startdate(args)
         return WFOHelper.get_wfo_cycles(start_date, args.num_wfo_cycles, args.wfo_training_period, args.wfo_testing_period)
@@ -303,34 +290,22 @@ class WFOStep1(object):
     def enqueue_strategies(self, strategy_enum):
         strategy_class = strategy_enum.value.clazz
 
-        kwargz = self._params
-        optkeys = list(self._params)
-        vals = self.iterize(kwargz.values())
-        optvals = itertools.product(*vals)
-        okwargs1 = map(zip, itertools.repeat(optkeys), optvals)
-        optkwargs = map(dict, okwargs1)
-        list_strat_params = list(optkwargs)
+        self._strategy_class = strategy_class
+        self._strategy_params_grid = ParameterGrid(self._params, validator=self.validate_strategy_params)
 
-        for params in list_strat_params:
-            if self.validate_strategy_params(params):
-                StFetcher.register(strategy_class, **params)
+        print("Number of strategies: {} (out of {} parameter combinations)".format(len(self._strategy_params_grid), self._strategy_params_grid.get_total_count()))
 
-        print("Number of strategies: {}".format(len(StFetcher.COUNT())))
-        self._cerebro.optstrategy(StFetcher, idx=StFetcher.COUNT())
 
+    def get_strategy_params_grid(self):
+        return self._strategy_params_grid
 
     def check_market_data_csv_has_data(self, filename, wfo_cycle_info):
-        df = pd.read_csv(filename)
         fromdate = wfo_cycle_info.training_start_date
         todate = wfo_cycle_info.training_end_date
-        for index, row in df.iterrows():
-            timestamp_str = row['Timestamp']
-            timestamp = datetime.strptime(timestamp_str, '%Y-%m-%dT%H:%M:%S')
-            if fromdate < timestamp and todate < timestamp:
-                print("!!! There is no market data for the start/end date range provided. Finishing execution.")
-                quit()
-            else:
-                return True
+        if not MarketDataCatalog.has_data(filename, fromdate, todate):
+            print("!!! There is no market data for the start/end date range provided. Finishing execution.")
+            quit()
+        return True
 
     def get_input_filename(self, args):
         return './marketdata/{}/{}/{}/{}-{}-{}.csv'.format(args.exchange, args.symbol, args.timeframe, args.exchange, args.symbol, args.timeframe)
@@ -357,31 +332,13 @@ class WFOStep1(object):
         self._cerebro.adddata(data_tf, "data_{}".format(args.timeframe))
 
     def build_data(self, fromdate, todate, exchange, symbol, timeframe):
-        fromdate_back_delta = timedelta(days=50)  # Adjust from date to add more candle data from the past to strategy to prevent any calculation problems with indicators
+        # The feed includes warm-up candles before fromdate for the indicators and a few candles after todate
         granularity = Utils.get_granularity_by_tf_str(timeframe)
         timeframe_id = granularity[0][0]
         compression = granularity[0][1]
-        fromdate_back = fromdate - fromdate_back_delta
-        todate_delta = timedelta(days=2)  # Adjust to date to add more candle data
-        todate_beyond = todate + todate_delta
 
         marketdata_filename = self.get_marketdata_filename(exchange, symbol, timeframe)
-        return btfeeds.GenericCSVData(
-            dataname=marketdata_filename,
-            fromdate=fromdate_back,
-            todate=todate_beyond,
-            timeframe=timeframe_id,
-            compression=compression,
-            dtformat="%Y-%m-%dT%H:%M:%S",
-            # nullvalue=0.0,
-            datetime=0,
-            open=1,
-            high=2,
-            low=3,
-            close=4,
-            volume=5,
-            openinterest=-1
-        )
+        return WindowedFeedFactory.build(marketdata_filename, fromdate, todate, timeframe_id, compression)
 
     def whereAmI(self):
         return os.path.dirname(os.path.realpath(__import__("__main__").__file__))
@@ -397,27 +354,29 @@ class WFOStep1(object):
         output_path = self.get_output_path(base_dir, args)
         os.makedirs(output_path, exist_ok=True)
 
-        self._output_file1_full_name = self.get_output_filename1(output_path, args)
-        if os.path.exists(self._output_file1_full_name):
-            self._is_output_file1_exists = True
-        else:
-            self._is_output_file1_exists = False
+        self._store1 = ResultsStoreFactory.create(self.get_output_filename1(output_path, args))
+        self._output_file1_full_name = self._store1.filename
 
-        self._ofile1 = open(self._output_file1_full_name, "a")
-        self._writer1 = csv.writer(self._ofile1, delimiter=',', quotechar='"', quoting=csv.QUOTE_ALL)
+        self._store2 = ResultsStoreFactory.create(self.get_output_filename2(output_path, args))
+        self._output_file2_full_name = self._store2.filename
 
-        self._output_file2_full_name = self.get_output_filename2(output_path, args)
-        if os.path.exists(self._output_file2_full_name):
-            self._is_output_file2_exists = True
-        else:
-            self._is_output_file2_exists = False
+    def get_results_stores(self):
+        return [self._store1, self._store2]
+
+    def screen_strategies(self, runner, args):
+        commission = args.commission if args.commtype.lower() == 'percentage' else 0
+        screener = GridScreener(runner.cerebro, self._strategy_class, GridScreener.get_sizer_mode(args.lottype), args.lotsize, commission, args.risk)
+        return screener.get_top_params(self._strategy_params_grid, args.screentop)
 
-        self._ofile2 = open(self._output_file2_full_name, "a")
-        self._writer2 = csv.writer(self._ofile2, delimiter=',', quotechar='"', quoting=csv.QUOTE_ALL)
+    def run_strategies(self, runner, args):
+        strategy_params = self._strategy_params_grid
+        if args.screentop and len(strategy_params) > args.screentop:
+            strategy_params = self.screen_strategies(runner, args)
+            print("Number of strategies after screening: {}".format(len(strategy_params)))
 
-    def run_strategies(self, runner):
         # Run over everything
-        return runner.run_strategies()
+        optimizer = ProcessPoolOptimizer(args.maxcpus)
+        return optimizer.run(runner.cerebro, self._strategy_class, strategy_params)
 
     def create_model(self, wfo_cycles, curr_wfo_cycle_info, run_results, args):
         model = BacktestModel(WFOMode.WFO_MODE_TRAINING, wfo_cycles)
@@ -428,45 +387,27 @@ class WFOStep1(object):
         strategy_config.lottype = args.lottype
         model = generator.populate_model_data(model, strategy_run_data, strategy_config, curr_wfo_cycle_info, run_results)
         model.filter_wfo_training_top_results(STEP1_NUMBER_TOP_ROWS)
+        model = generator.postprocess_model_data(model)
         return model
 
-    def printfinalresultsheader(self, writer, model):
-        if self._is_output_file1_exists is True:
-            return
-
-        # Designate the rows
-        h1 = model.get_header_names()
-
-        # Print header
-        print_list = [h1]
-        for row in print_list:
-            writer.writerow(row)
-
-    def printequitycurvedataheader(self, writer, model):
-        if self._is_output_file2_exists is True:
-            return
+    def printfinalresultsheader(self, store, model):
+        # Header is written only into a new results file
+        store.set_header(model.get_header_names())
 
-        # Designate the rows
-        h1 = model.get_equity_curve_header_names()
+    def printequitycurvedataheader(self, store, model):
+        store.set_header(model.get_equity_curve_header_names())
 
-        # Print header
-        print_list = [h1]
-        for row in print_list:
-            writer.writerow(row)
-
-    def printfinalresults(self, writer, arr):
+    def printfinalresults(self, store, arr):
         print_list = []
         print_list.extend(arr)
         print("Writing {} rows...".format(len(print_list)))
-        for item in print_list:
-            writer.writerow(item)
-        self._ofile1.flush()
+        store.append(print_list)
+        store.flush()
 
-    def printequitycurvedataresults(self, writer, arr):
+    def printequitycurvedataresults(self, store, arr):
         print_list = []
         print_list.extend(arr)
-        for item in print_list:
-            writer.writerow(item)
+        store.append(print_list)
 
     def generate_equitycurve_images(self, model, args):
         results_df = model.get_model_df().reset_index(drop=False)
@@ -477,8 +418,23 @@ class WFOStep1(object):
             self._equity_curve_plotter.generate_images_step1(results_df, equity_curve_df, args)
 
     def cleanup(self):
-        self._ofile1.close()
-        self._ofile2.close()
+        self._store1.close()
+        self._store2.close()
+
+    def save_results(self, wfo_cycles, wfo_cycle_info, run_results, args):
+        self._step1_model = self.create_model(wfo_cycles, wfo_cycle_info, run_results, args)
+
+        self.printfinalresultsheader(self._store1, self._step1_model)
+
+        self.printequitycurvedataheader(self._store2, self._step1_model)
+
+        self.printfinalresults(self._store1, self._step1_model.get_model_data_arr())
+
+        self.printequitycurvedataresults(self._store2, self._step1_model.get_equity_curve_report_data_arr())
+
+        self.generate_equitycurve_images(self._step1_model, args)
+
+        self.cleanup()
 
     def run(self):
         args = self.parse_args()
@@ -514,21 +470,9 @@ class WFOStep1(object):
 
             self.enqueue_strategies(strategy_enum)
 
-            run_results = self.run_strategies(runner)
-
-            self._step1_model = self.create_model(wfo_cycles, curr_wfo_cycle_info, run_results, args)
-
-            self.printfinalresultsheader(self._writer1, self._step1_model)
-
-            self.printequitycurvedataheader(self._writer2, self._step1_model)
-
-            self.printfinalresults(self._writer1, self._step1_model.get_model_data_arr())
-
-            self.printequitycurvedataresults(self._writer2, self._step1_model.get_equity_curve_report_data_arr())
-
-            self.generate_equitycurve_images(self._step1_model, args)
+            run_results = self.run_strategies(runner, args)
 
-            self.cleanup()
+            self.save_results(wfo_cycles, curr_wfo_cycle_info, run_results, args)
 
 
 def main():
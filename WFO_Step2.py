@@ -3,29 +3,30 @@ Step 2 - WFO Testing process
 '''
 
 import backtrader as bt
-import backtrader.feeds as btfeeds
 
 import argparse
 from extensions.analyzers.drawdown import TVNetProfitDrawDown
 from extensions.analyzers.tradeanalyzer import TVTradeAnalyzer
 from extensions.sizers.percentsizer import VariablePercentSizer
 from extensions.sizers.cashsizer import FixedCashSizer
+from extensions.feeds.binarydata import WindowedFeedFactory
 from datetime import datetime
-from datetime import timedelta
 from strategies.helper.utils import Utils
 from config.strategy_enum import BTStrategyEnum
-from common.stfetcher import StFetcher
+from common.marketdatacatalog import MarketDataCatalog
 from model.common import WFOTestingData, WFOTestingDataList, StrategyRunData, StrategyConfig
 from model.backtestmodel import BacktestModel
 from model.backtestmodelgenerator import BacktestModelGenerator
+from model.resultsstore import ResultsStoreFactory
+from model.reports_common import ColumnName
 from model.common import WFOMode
 from config.strategy_config import AppConfig
 from wfo.wfo_helper import WFOHelper
+from optimization.chainexecutor import ChainExecutor
+from optimization.optimizer import WorkerCerebroCache, _run_strategy
 import os
-import csv
 import pandas as pd
 import ast
-import gc
 
 string_types = str
 
@@ -48,10 +49,48 @@ class CerebroRunner(object):
         return self.cerebro.run()
 
 
+def run_testing_task(step_class, args, data_args, strategy_class, testing_params):
+    step = step_class()
+    cerebro = WorkerCerebroCache.get((step_class.__name__,) + data_args, step.build_cerebro, args, *data_args)
+    return _run_strategy(cerebro, strategy_class, testing_params)
+
+
+class WFOTestingChain(object):
+    '''The WFO cycles of one strategy/exchange/symbol/timeframe. Each cycle starts with the cash
+    the same training id ended the previous cycle with (``WFOStep2.calc_startcash()``), so the cycles
+    of a chain run one after another, while different chains run concurrently (``ChainExecutor``).
+    '''
+
+    def __init__(self, step, wfo_testing_model, model_generator, wfo_testing_data, args):
+        self._step = step
+        self._wfo_testing_model = wfo_testing_model
+        self._model_generator = model_generator
+        self._wfo_testing_data = wfo_testing_data
+        self._args = args
+        self._strategy_run_data = StrategyRunData(wfo_testing_data.strategyid, wfo_testing_data.exchange, wfo_testing_data.currency_pair, wfo_testing_data.timeframe)
+        self._num_wfo_cycles = len(wfo_testing_data.wfo_cycles_dict)
+        self._wfo_cycle_id = 1
+
+    def get_next_stage(self):
+        if self._wfo_cycle_id > self._num_wfo_cycles:
+            return None
+        return self._step.get_testing_tasks(self._wfo_testing_model, self._wfo_cycle_id, self._wfo_testing_data, self._args)
+
+    def on_stage_done(self, results):
+        data = self._wfo_testing_data
+        print("Finished WFO Testing - Cycle {} - for {}/{}/{}/{}: {} strategies".format(self._wfo_cycle_id, data.strategyid, data.exchange, data.currency_pair, data.timeframe, len(results)))
+        curr_wfo_cycle_info = data.wfo_cycles_dict[self._wfo_cycle_id]
+        strategy_config = StrategyConfig()
+        strategy_config.lotsize = self._args.lotsize
+        strategy_config.lottype = self._args.lottype
+        self._model_generator.populate_model_data(self._wfo_testing_model, self._strategy_run_data, strategy_config, curr_wfo_cycle_info, results)
+        self._wfo_cycle_id += 1
+
+
 class WFOStep2(object):
 
     _INDEX_ALL_KEYS_ARR = ["Strategy ID", "Exchange", "Currency Pair", "Timeframe", "Parameters"]
-    _INDEX_STEP2_NUMBERS_ARR = [0, 1, 2, 3]
+    _INDEX_STEP2_COLUMNS_ARR = [ColumnName.STRATEGY_ID, ColumnName.EXCHANGE, ColumnName.CURRENCY_PAIR, ColumnName.TIMEFRAME]
 
     def __init__(self):
         self._cerebro = None
@@ -60,10 +99,8 @@ class WFOStep2(object):
         self._market_data_input_filename = None
         self._output_file1_full_name = None
         self._output_file2_full_name = None
-        self._ofile1 = None
-        self._ofile2 = None
-        self._writer1 = None
-        self._writer2 = None
+        self._store1 = None
+        self._store2 = None
         self._step2_model = None
 
     def parse_args(self):
@@ -138,15 +175,10 @@ class WFOStep2(object):
             self._cerebro.broker.setcommission(args.commission)
 
     def check_market_data_csv_has_data(self, filename, startdate, enddate):
-        df = pd.read_csv(filename)
-        for index, row in df.iterrows():
-            timestamp_str = row['Timestamp']
-            timestamp = datetime.strptime(timestamp_str, '%Y-%m-%dT%H:%M:%S')
-            if startdate < timestamp and enddate < timestamp:
-                print("!!! There is no market data for the start/end date range provided. Finishing execution.")
-                quit()
-            else:
-                return True
+        if not MarketDataCatalog.has_data(filename, startdate, enddate):
+            print("!!! There is no market data for the start/end date range provided. Finishing execution.")
+            quit()
+        return True
 
     def get_input_filename(self, args):
         dirname = self.whereAmI()
@@ -156,8 +188,8 @@ class WFOStep2(object):
         dirname = self.whereAmI()
         return '{}/strategyrun_results/{}/{}_Step1_EquityCurveData.csv'.format(dirname, args.runid, args.runid)
 
-    def read_csv_data(self, filepath):
-        df = pd.read_csv(filepath, index_col=self._INDEX_STEP2_NUMBERS_ARR)
+    def read_results_data(self, filepath):
+        df = ResultsStoreFactory.create(filepath).read(self._INDEX_STEP2_COLUMNS_ARR)
         df = df.sort_index()
         return df
 
@@ -179,12 +211,14 @@ class WFOStep2(object):
         os.makedirs(output_path, exist_ok=True)
 
         self._output_file1_full_name = self.get_output_filename1(output_path, args)
-        self._ofile1 = open(self._output_file1_full_name, "w")
-        self._writer1 = csv.writer(self._ofile1, delimiter=',', quotechar='"', quoting=csv.QUOTE_ALL)
+        self._store1 = ResultsStoreFactory.create(self._output_file1_full_name)
+        self._store1.reset()
+        self._output_file1_full_name = self._store1.filename
 
         self._output_file2_full_name = self.get_output_filename2(output_path, args)
-        self._ofile2 = open(self._output_file2_full_name, "w")
-        self._writer2 = csv.writer(self._ofile2, delimiter=',', quotechar='"', quoting=csv.QUOTE_ALL)
+        self._store2 = ResultsStoreFactory.create(self._output_file2_full_name)
+        self._store2.reset()
+        self._output_file2_full_name = self._store2.filename
 
     def get_step1_key(self, strat, exch, sym, tf, params):
         return "{}-{}-{}-{}-{}".format(strat, exch, sym, tf, params)
@@ -199,31 +233,19 @@ class WFOStep2(object):
         self._cerebro.adddata(data_tf, "data_{}".format(timeframe))
 
     def build_data(self, exchange, symbol, timeframe, fromdate, todate):
-        fromdate_back_delta = timedelta(days=50)  # Adjust from date to add more candle data from the past to strategy to prevent any calculation problems with indicators
+        # The feed includes warm-up candles before fromdate for the indicators and a few candles after todate
         granularity = Utils.get_granularity_by_tf_str(timeframe)
         timeframe_id = granularity[0][0]
         compression = granularity[0][1]
-        fromdate_back = fromdate - fromdate_back_delta
-        todate_delta = timedelta(days=2)  # Adjust to date to add more candle data
-        todate_beyond = todate + todate_delta
 
         marketdata_filename = self.get_marketdata_filename(exchange, symbol, timeframe)
-        return btfeeds.GenericCSVData(
-            dataname=marketdata_filename,
-            fromdate=fromdate_back,
-            todate=todate_beyond,
-            timeframe=timeframe_id,
-            compression=compression,
-            dtformat="%Y-%m-%dT%H:%M:%S",
-            # nullvalue=0.0,
-            datetime=0,
-            open=1,
-            high=2,
-            low=3,
-            close=4,
-            volume=5,
-            openinterest=-1
-        )
+        return WindowedFeedFactory.build(marketdata_filename, fromdate, todate, timeframe_id, compression)
+
+    def build_cerebro(self, args, exchange, symbol, timeframe, fromdate, todate):
+        runner = CerebroRunner()
+        self.init_cerebro(runner, args, AppConfig.get_global_default_cash_size())
+        self.add_datas(exchange, symbol, timeframe, fromdate, todate)
+        return runner.cerebro
 
     def get_parameters_map(self, parameters_json):
         return ast.literal_eval(parameters_json)
@@ -235,136 +257,87 @@ class WFOStep2(object):
         else:
             return AppConfig.get_global_default_cash_size()
 
-    def enqueue_strategies(self, wfo_testing_model, wfo_cycle_id, wfo_testing_data, testing_startdate, testing_enddate, args):
-        strategy_enum = BTStrategyEnum.get_strategy_enum_by_str(wfo_testing_data.strategyid)
+    def get_testing_params(self, wfo_testing_model, wfo_cycle_id, wfo_cycle_training_id, wfo_cycle_params_dict, wfo_testing_data, testing_startdate, testing_enddate, args):
+        startcash = self.calc_startcash(wfo_testing_model, wfo_cycle_id, wfo_cycle_training_id, wfo_testing_data)
+        testing_params = self.get_parameters_map(wfo_cycle_params_dict[wfo_cycle_id])
+        testing_params.update({("debug",                 args.debug),
+                               ("wfo_cycle_id",          wfo_cycle_id),
+                               ("wfo_cycle_training_id", wfo_cycle_training_id),
+                               ("startcash", startcash),
+                               ("fromyear",  testing_startdate.year),
+                               ("frommonth", testing_startdate.month),
+                               ("fromday",   testing_startdate.day),
+                               ("toyear",    testing_enddate.year),
+                               ("tomonth",   testing_enddate.month),
+                               ("today",     testing_enddate.day)})
+        return testing_params
+
+    def get_testing_tasks(self, wfo_testing_model, wfo_cycle_id, wfo_testing_data, args):
+        strategy_class = BTStrategyEnum.get_strategy_enum_by_str(wfo_testing_data.strategyid).value.clazz
+        wfo_cycle_info = wfo_testing_data.wfo_cycles_dict[wfo_cycle_id]
+        testing_startdate = wfo_cycle_info.testing_start_date
+        testing_enddate = wfo_cycle_info.testing_end_date
+        data_args = (wfo_testing_data.exchange, wfo_testing_data.currency_pair, wfo_testing_data.timeframe, testing_startdate, testing_enddate)
+        tasks = []
         for wfo_cycle_training_id, wfo_cycle_params_dict in wfo_testing_data.training_id_params_dict.items():
-            startcash = self.calc_startcash(wfo_testing_model, wfo_cycle_id, wfo_cycle_training_id, wfo_testing_data)
-            testing_params = self.get_parameters_map(wfo_cycle_params_dict[wfo_cycle_id])
-            testing_params.update({("debug",                 args.debug),
-                                   ("wfo_cycle_id",          wfo_cycle_id),
-                                   ("wfo_cycle_training_id", wfo_cycle_training_id),
-                                   ("startcash", startcash),
-                                   ("fromyear",  testing_startdate.year),
-                                   ("frommonth", testing_startdate.month),
-                                   ("fromday",   testing_startdate.day),
-                                   ("toyear",    testing_enddate.year),
-                                   ("tomonth",   testing_enddate.month),
-                                   ("today",     testing_enddate.day)})
-            strategy_class = strategy_enum.value.clazz
-            StFetcher.register(strategy_class, **testing_params)
-
-        print("Enqueued {} of strategies in Cerebro for WFO Testing Stage".format(len(StFetcher.COUNT())))
-        self._cerebro.optstrategy(StFetcher, idx=StFetcher.COUNT())
-
-    def cleanup_cerebro(self, runner):
-        # Clean up and destroy cerebro
-        runner.cerebro.runstop()
-        runner.cerebro = None
-        StFetcher.cleanall()
-        gc.collect()
-
-    def run_strategies(self, runner):
-        # clock the start of the process
-        tstart = datetime.now()
-        tstart_str = tstart.strftime("%Y-%m-%d %H:%M:%S")
-
-        print("!! Started current run at {}. Number of strategies={}".format(tstart_str, len(StFetcher.COUNT())))
-        # Run over everything
-        stratruns = runner.run_strategies()
+            testing_params = self.get_testing_params(wfo_testing_model, wfo_cycle_id, wfo_cycle_training_id, wfo_cycle_params_dict, wfo_testing_data, testing_startdate, testing_enddate, args)
+            tasks.append((run_testing_task, (type(self), args, data_args, strategy_class, testing_params)))
+        return tasks
 
-        # clock the end of the process
-        tend = datetime.now()
-        tend_str = tend.strftime("%Y-%m-%d %H:%M:%S")
-
-        print("Cerebro has processed {} strategies at {}".format(len(stratruns), tend_str))
-
-        # Clean up and destroy cerebro
-        runner.cerebro.runstop()
-        runner.cerebro = None
-        StFetcher.cleanall()
-        gc.collect()
-
-        return stratruns
+    def check_market_data(self, wfo_testing_data_list):
+        for wfo_testing_data in wfo_testing_data_list.get_wfo_testing_data_arr():
+            marketdata_filename = self.get_marketdata_filename(wfo_testing_data.exchange, wfo_testing_data.currency_pair, wfo_testing_data.timeframe)
+            for wfo_cycle_info in wfo_testing_data.wfo_cycles_dict.values():
+                self.check_market_data_csv_has_data(marketdata_filename, wfo_cycle_info.testing_start_date, wfo_cycle_info.testing_end_date)
 
     def run_wfo_testing(self, input_df, args):
         model_generator = BacktestModelGenerator(False)
-        strat_list, exc_list, sym_list, tf_list = WFOHelper.get_unique_index_value_lists(input_df)
         wfo_testing_data_list = WFOHelper.parse_wfo_testing_data(input_df)
         wfo_cycles = wfo_testing_data_list.get_wfo_cycles_list()
         wfo_testing_model = BacktestModel(WFOMode.WFO_MODE_TESTING, wfo_cycles)
 
-        for strategy in strat_list:
-            for exchange in exc_list:
-                for symbol in sym_list:
-                    for timeframe in tf_list:
-                        num_wfo_cycles = wfo_testing_data_list.get_num_wfo_cycles()
-                        strategy_run_data = StrategyRunData(strategy, exchange, symbol, timeframe)
-                        for wfo_cycle_id in range(1, num_wfo_cycles + 1):
-                            wfo_testing_data = wfo_testing_data_list.get_wfo_testing_data(strategy, exchange, symbol, timeframe)
-                            startcash = AppConfig.get_global_default_cash_size()
-                            runner = CerebroRunner()
-                            self.init_cerebro(runner, args, startcash)
-
-                            wfo_cycle_info = wfo_testing_data.wfo_cycles_dict[wfo_cycle_id]
-                            testing_startdate = wfo_cycle_info.testing_start_date
-                            testing_enddate = wfo_cycle_info.testing_end_date
-                            self._market_data_input_filename = self.get_marketdata_filename(exchange, symbol, timeframe)
-                            self.check_market_data_csv_has_data(self._market_data_input_filename, testing_startdate, testing_enddate)
-                            self.add_datas(exchange, symbol, timeframe, testing_startdate, testing_enddate)
-                            self.enqueue_strategies(wfo_testing_model, wfo_cycle_id, wfo_testing_data, testing_startdate, testing_enddate, args)
-
-                            print("\n******** Running WFO Testing: {} iterations - Cycle {} - for {}/{}/{}/{} ********".format(wfo_testing_data_list.get_num_training_ids(), wfo_cycle_id,
-                                                                                                                                   strategy, exchange, symbol, timeframe))
-                            run_results = self.run_strategies(runner)
-
-                            curr_wfo_cycle_info = wfo_testing_data.wfo_cycles_dict[wfo_cycle_id]
-                            strategy_config = StrategyConfig()
-                            strategy_config.lotsize = args.lotsize
-                            strategy_config.lottype = args.lottype
-                            wfo_testing_model = model_generator.populate_model_data(wfo_testing_model, strategy_run_data, strategy_config, curr_wfo_cycle_info, run_results)
+        self.check_market_data(wfo_testing_data_list)
+
+        chains = [WFOTestingChain(self, wfo_testing_model, model_generator, wfo_testing_data, args) for wfo_testing_data in wfo_testing_data_list.get_wfo_testing_data_arr()]
+        print("\n******** Running WFO Testing: {} strategy/exchange/symbol/timeframe chains of {} cycles, {} iterations each ********".format(
+            len(chains), wfo_testing_data_list.get_num_wfo_cycles(), wfo_testing_data_list.get_num_training_ids()))
+        executor = ChainExecutor(args.maxcpus)
+        executor.run(chains)
 
         wfo_testing_model.sort_wfo_testing_results()
         return wfo_testing_model
 
-    def printfinalresultsheader(self, writer, model):
+    def printfinalresultsheader(self, store, model):
         # Designate the rows
         h1 = model.get_header_names()
 
-        # Print header
-        print_list = [h1]
-        for row in print_list:
-            writer.writerow(row)
+        store.set_header(h1)
 
-    def printequitycurvedataheader(self, writer, model):
+    def printequitycurvedataheader(self, store, model):
         # Designate the rows
         h1 = model.get_equity_curve_header_names()
 
-        # Print header
-        print_list = [h1]
-        for row in print_list:
-            writer.writerow(row)
+        store.set_header(h1)
 
-    def printfinalresults(self, writer, model):
+    def printfinalresults(self, store, model):
         print_list = model.get_model_data_arr()
         print("Writing {} rows...".format(len(print_list)))
-        for item in print_list:
-            writer.writerow(item)
+        store.append(print_list)
 
-    def printequitycurvedataresults(self, writer, model):
+    def printequitycurvedataresults(self, store, model):
         print_list = model.get_equity_curve_report_data_arr()
-        for item in print_list:
-            writer.writerow(item)
+        store.append(print_list)
 
     def cleanup(self):
-        self._ofile1.close()
-        self._ofile2.close()
+        self._store1.close()
+        self._store2.close()
 
     def run(self):
         args = self.parse_args()
 
         self._input_filename = self.get_input_filename(args)
 
-        self.step1_df = self.read_csv_data(self._input_filename)
+        self.step1_df = self.read_results_data(self._input_filename)
 
         self.init_output_files(args)
 
@@ -372,15 +345,15 @@ class WFOStep2(object):
 
         self._step2_model = self.run_wfo_testing(self.step1_df, args)
 
-        self.printfinalresultsheader(self._writer1, self._step2_model)
+        self.printfinalresultsheader(self._store1, self._step2_model)
 
         print("Writing WFO Step 2 equity curve data to: {}".format(self._output_file2_full_name))
 
-        self.printequitycurvedataheader(self._writer2, self._step2_model)
+        self.printequitycurvedataheader(self._store2, self._step2_model)
 
-        self.printfinalresults(self._writer1, self._step2_model)
+        self.printfinalresults(self._store1, self._step2_model)
 
-        self.printequitycurvedataresults(self._writer2, self._step2_model)
+        self.printequitycurvedataresults(self._store2, self._step2_model)
 
         self.cleanup()
 
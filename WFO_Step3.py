@@ -8,10 +8,10 @@ from model.common import StrategyRunData
 from model.step3model import Step3Model
 from model.step3avgmodel import Step3AvgModel
 from model.step3modelgenerator import Step3ModelGenerator
+from model.resultsstore import ResultsStoreFactory
 from plotting.equity_curve import EquityCurvePlotter
 from wfo.wfo_helper import WFOHelper
 import os
-import csv
 import pandas as pd
 
 string_types = str
@@ -38,7 +38,7 @@ class CerebroRunner(object):
 class WFOStep3(object):
 
     _INDEX_ALL_KEYS_ARR = ["Strategy ID", "Exchange", "Currency Pair", "Timeframe", "Parameters"]
-    _INDEX_STEP2_NUMBERS_ARR = [0, 1, 2, 3]
+    _INDEX_STEP2_COLUMNS_ARR = [ColumnName.STRATEGY_ID, ColumnName.EXCHANGE, ColumnName.CURRENCY_PAIR, ColumnName.TIMEFRAME]
 
     def __init__(self):
         self._cerebro = None
@@ -50,12 +50,9 @@ class WFOStep3(object):
         self._output_file1_full_name = None
         self._output_file2_full_name = None
         self._output_file3_full_name = None
-        self._ofile1 = None
-        self._ofile2 = None
-        self._ofile3 = None
-        self._writer1 = None
-        self._writer2 = None
-        self._writer3 = None
+        self._store1 = None
+        self._store2 = None
+        self._store3 = None
         self._step3_model = None
         self._step3_avg_model = None
 
@@ -89,8 +86,8 @@ class WFOStep3(object):
         dirname = self.whereAmI()
         return '{}/strategyrun_results/{}/{}_Step2_EquityCurveData.csv'.format(dirname, args.runid, args.runid)
 
-    def read_csv_data(self, filepath):
-        df = pd.read_csv(filepath, index_col=self._INDEX_STEP2_NUMBERS_ARR)
+    def read_results_data(self, filepath):
+        df = ResultsStoreFactory.create(filepath).read(self._INDEX_STEP2_COLUMNS_ARR)
         df = df.sort_index()
         return df
 
@@ -115,16 +112,19 @@ class WFOStep3(object):
         os.makedirs(output_path, exist_ok=True)
 
         self._output_file1_full_name = self.get_output_filename1(output_path, args)
-        self._ofile1 = open(self._output_file1_full_name, "w")
-        self._writer1 = csv.writer(self._ofile1, delimiter=',', quotechar='"', quoting=csv.QUOTE_ALL)
+        self._store1 = ResultsStoreFactory.create(self._output_file1_full_name)
+        self._store1.reset()
+        self._output_file1_full_name = self._store1.filename
 
         self._output_file2_full_name = self.get_output_filename2(output_path, args)
-        self._ofile2 = open(self._output_file2_full_name, "w")
-        self._writer2 = csv.writer(self._ofile2, delimiter=',', quotechar='"', quoting=csv.QUOTE_ALL)
+        self._store2 = ResultsStoreFactory.create(self._output_file2_full_name)
+        self._store2.reset()
+        self._output_file2_full_name = self._store2.filename
 
         self._output_file3_full_name = self.get_output_filename3(output_path, args)
-        self._ofile3 = open(self._output_file3_full_name, "w")
-        self._writer3 = csv.writer(self._ofile3, delimiter=',', quotechar='"', quoting=csv.QUOTE_ALL)
+        self._store3 = ResultsStoreFactory.create(self._output_file3_full_name)
+        self._store3.reset()
+        self._output_file3_full_name = self._store3.filename
 
     def combine_wfo_testing_data(self, wfo_testing_data_list, input_df, equity_curve_df):
         model_generator = Step3ModelGenerator()
@@ -163,38 +163,31 @@ class WFOStep3(object):
                         step3_avg_model = model_generator.populate_avg_model_data(step3_avg_model, strategy_run_data, rows_df, equity_curve_rows_df)
         return step3_avg_model
 
-    def printfinalresultsheader(self, writer, model):
+    def printfinalresultsheader(self, store, model):
         # Designate the rows
         h1 = model.get_header_names()
 
-        # Print header
-        print_list = [h1]
-        for row in print_list:
-            writer.writerow(row)
+        store.set_header(h1)
 
-    def printequitycurvedataheader(self, writer, model):
+    def printequitycurvedataheader(self, store, model):
         # Designate the rows
         h1 = model.get_equity_curve_header_names()
 
-        # Print header
-        print_list = [h1]
-        for row in print_list:
-            writer.writerow(row)
+        store.set_header(h1)
 
-    def printfinalresults(self, writer, model):
+    def printfinalresults(self, store, model):
         print_list = model.get_model_data_arr()
         print("Writing {} rows...".format(len(print_list)))
-        for item in print_list:
-            writer.writerow(item)
+        store.append(print_list)
 
-    def printequitycurvedataresults(self, writer, model):
+    def printequitycurvedataresults(self, store, model):
         print_list = model.get_equity_curve_report_data_arr()
-        for item in print_list:
-            writer.writerow(item)
+        store.append(print_list)
 
     def cleanup(self):
-        self._ofile1.close()
-        self._ofile2.close()
+        self._store1.close()
+        self._store2.close()
+        self._store3.close()
 
     def run(self):
         args = self.parse_args()
@@ -202,8 +195,8 @@ class WFOStep3(object):
         self._input_filename = self.get_input_filename(args)
         self._equity_curve_input_filename = self.get_step2_equity_curve_filename(args)
 
-        self._step2_df = self.read_csv_data(self._input_filename)
-        self._equity_curve_df = self.read_csv_data(self._equity_curve_input_filename)
+        self._step2_df = self.read_results_data(self._input_filename)
+        self._equity_curve_df = self.read_results_data(self._equity_curve_input_filename)
 
         self.init_output_files(args)
 
@@ -215,13 +208,13 @@ class WFOStep3(object):
 
         print("Writing WFO Step 3 equity curve data to: {}".format(self._output_file2_full_name))
 
-        self.printfinalresultsheader(self._writer1, self._step3_model)
-        self.printequitycurvedataheader(self._writer2, self._step3_model)
-        self.printfinalresultsheader(self._writer3, self._step3_avg_model)
+        self.printfinalresultsheader(self._store1, self._step3_model)
+        self.printequitycurvedataheader(self._store2, self._step3_model)
+        self.printfinalresultsheader(self._store3, self._step3_avg_model)
 
-        self.printfinalresults(self._writer1, self._step3_model)
-        self.printequitycurvedataresults(self._writer2, self._step3_model)
-        self.printfinalresults(self._writer3, self._step3_avg_model)
+        self.printfinalresults(self._store1, self._step3_model)
+        self.printequitycurvedataresults(self._store2, self._step3_model)
+        self.printfinalresults(self._store3, self._step3_avg_model)
 
         self._equity_curve_plotter.generate_images_step3(wfo_testing_data_list, self._step3_model.get_model_df(), self._step3_model.get_equity_curve_model_df(), self._step3_avg_model.get_equity_curve_model_df(), args)
 
@@ -24,16 +24,15 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 '''
 
-import ccxt
-from datetime import datetime, timedelta, timezone
-import math
+import ccxt.async_support as ccxt
+from bot.ccxtbt.ratelimits import RateLimitConfig
+from common.marketdatadownloader import MarketDataDownloader
+from datetime import datetime, timezone
 import argparse
-import pandas as pd
-import time
-from calendar import timegm
-import pathlib
+import asyncio
 import os
 
+
 def parse_args():
     parser = argparse.ArgumentParser(description='CCXT Market Data Downloader')
 
@@ -54,6 +53,28 @@ def parse_args():
                         choices=['1m', '5m','15m', '30m','1h', '2h', '3h', '4h', '6h', '12h', '1d', '1M', '1y'],
                         help='The timeframe to download')
 
+    parser.add_argument('--startdate',
+                        type=str,
+                        default='2000-01-01',
+                        help='The UTC date (YYYY-MM-DD) to download from. The download starts at the first candle of the exchange after it')
+
+    parser.add_argument('--concurrency',
+                        type=int,
+                        default=4,
+                        help='The max number of date range chunks fetched at the same time')
+
+    parser.add_argument('--ratelimitfactor',
+                        type=float,
+                        default=1,
+                        help='The factor applied to the fetch_ohlcv rate limit of the exchange (see bot/ccxtbt/ratelimits.py)')
+
+    parser.add_argument('--update',
+                        action='store_true',
+                        help='Download only the candles newer than the last one of the existing market data file')
+
+    parser.add_argument('--check',
+                        action='store_true',
+                        help='Check the existing market data file for duplicate and missing candles and fetch the missing ones')
 
     parser.add_argument('--debug',
                             action ='store_true',
@@ -61,82 +82,87 @@ def parse_args():
 
     return parser.parse_args()
 
-# Get our arguments
-args = parse_args()
 
-# Get our Exchange
-try:
-    exchange = getattr (ccxt, args.exchange) ()
-except AttributeError:
+def print_error(message, items=None):
     print('-'*36,' ERROR ','-'*35)
-    print('Exchange "{}" not found. Please check the exchange is supported.'.format(args.exchange))
+    print(message)
+    if items is not None:
+        for key in items:
+            print('  - ' + key)
     print('-'*80)
-    quit()
 
-# Check if fetching of OHLC Data is supported
-if exchange.has["fetchOHLCV"] == False:
-    print('-'*36,' ERROR ','-'*35)
-    print('{} does not support fetching OHLC data. Please use another exchange'.format(args.exchange))
-    print('-'*80)
-    quit()
 
-# Check requested timeframe is available. If not return a helpful error.
-if args.timeframe not in exchange.timeframes:
-    print('-'*36,' ERROR ','-'*35)
-    print('The requested timeframe ({}) is not available from {}\n'.format(args.timeframe,args.exchange))
-    print('Available timeframes are:')
-    for key in exchange.timeframes.keys():
-        print('  - ' + key)
-    print('-'*80)
-    quit()
+def whereAmI():
+    return os.path.dirname(os.path.realpath(__import__("__main__").__file__))
 
-# Check if the symbol is available on the Exchange
-exchange.load_markets()
-if args.symbol not in exchange.symbols:
-    print('-'*36,' ERROR ','-'*35)
-    print('The requested symbol ({}) is not available from {}\n'.format(args.symbol,args.exchange))
-    print('Available symbols are:')
-    for key in exchange.symbols:
-        print('  - ' + key)
-    print('-'*80)
-    quit()
 
+def get_output_filename(args):
+    symbol_out = args.symbol.replace("/","")
+    output_path = '{}/marketdata/{}/{}/{}'.format(whereAmI(), args.exchange, symbol_out, args.timeframe)
+    os.makedirs(output_path, exist_ok=True)
+    return '{}/{}-{}-{}.csv'.format(output_path, args.exchange, symbol_out, args.timeframe)
+
+
+async def validate(exchange, args):
+    # Check if fetching of OHLC Data is supported
+    if exchange.has["fetchOHLCV"] == False:
+        print_error('{} does not support fetching OHLC data. Please use another exchange'.format(args.exchange))
+        return False
+
+    # Check requested timeframe is available. If not return a helpful error.
+    if args.timeframe not in exchange.timeframes:
+        print_error('The requested timeframe ({}) is not available from {}\n\nAvailable timeframes are:'.format(args.timeframe, args.exchange), exchange.timeframes.keys())
+        return False
+
+    # Check if the symbol is available on the Exchange
+    await exchange.load_markets()
+    if args.symbol not in exchange.symbols:
+        print_error('The requested symbol ({}) is not available from {}\n\nAvailable symbols are:'.format(args.symbol, args.exchange), exchange.symbols)
+        return False
+
+    return True
+
+
+async def download(exchange, args):
+    if not await validate(exchange, args):
+        return
+
+    filename = get_output_filename(args)
+    rate_limit_ms = RateLimitConfig.get_rate_limit(args.exchange, "fetch_ohlcv", args.ratelimitfactor)
+    start_ms = int(datetime.strptime(args.startdate, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp() * 1000)
+    print("Downloading {} {} {} into {}".format(args.exchange, args.symbol, args.timeframe, filename))
+    downloader = MarketDataDownloader(exchange, args.symbol, args.timeframe, filename, rate_limit_ms, concurrency=args.concurrency, debug=args.debug)
+    if args.check:
+        if not os.path.exists(filename):
+            print_error('There is no market data file to check: {}'.format(filename))
+            return
+        await downloader.repair()
+    elif args.update:
+        await downloader.update(start_ms)
+    else:
+        await downloader.download(start_ms)
+
+
+async def run(args):
+    # The requests are spaced out by MarketDataDownloader
+    exchange = getattr(ccxt, args.exchange)({'enableRateLimit': False})
+    try:
+        await download(exchange, args)
+    finally:
+        await exchange.close()
+
+
+def main():
+    # Get our arguments
+    args = parse_args()
+
+    # Get our Exchange
+    if not hasattr(ccxt, args.exchange):
+        print_error('Exchange "{}" not found. Please check the exchange is supported.'.format(args.exchange))
+        return
+
+    asyncio.run(run(args))
 
-def whereAmI():
-    return os.path.dirname(os.path.realpath(__import__("__main__").__file__))
 
-sym = args.symbol
-symbol_out = args.symbol.replace("/","")
-dirname = whereAmI()
-output_path = '{}/marketdata/{}/{}/{}'.format(dirname, args.exchange, symbol_out, args.timeframe)
-os.makedirs(output_path, exist_ok=True)
-
-# Get data
-#    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params={}):
-
-start_utc_time = time.strptime("2000-01-01T00:00:00.000Z", "%Y-%m-%dT%H:%M:%S.%fZ")
-start = timegm(start_utc_time) * 1000
-end = time.time() * 1000
-limit = 1000
-timestamp = start
-last_timestamp = None
-data = []
-
-while timestamp <= end and timestamp != last_timestamp:
-    print("Requesting " + datetime.fromtimestamp(int(timestamp/1000)).strftime("%Y-%m-%dT%H:%M:%S"))
-    trades = exchange.fetch_ohlcv(args.symbol, args.timeframe, timestamp, limit)
-    last_timestamp = timestamp
-    timestamp = trades[-1][0]
-    data.extend(trades)
-    time.sleep(6)
-    if len(data) > 0 and len(trades) > 1:
-        del data[-1] 
-
-for t in data:
-    t[0] = datetime.fromtimestamp(int(t[0] / 1000)).strftime("%Y-%m-%dT%H:%M:%S")
-
-header = ['Timestamp', 'Open', 'High', 'Low', 'Close', 'Volume']
-df = pd.DataFrame(data, columns=header).set_index('Timestamp')
-# Save it
-filename = '{}/{}-{}-{}.csv'.format(output_path, args.exchange, symbol_out,args.timeframe)
-df.to_csv(filename)
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+from extensions.feeds.binarydata import MarketDataBinaryCache
+from datetime import datetime
+import numpy as np
+import json
+import os
+
+
+class MarketDataCoverage(object):
+    def __init__(self, start_date, end_date):
+        self.start_date = start_date
+        self.end_date = end_date
+
+    def has_data(self, fromdate, todate):
+        return self.start_date is not None and self.start_date <= todate and self.end_date >= fromdate
+
+    def __str__(self):
+        return "MarketDataCoverage(start_date={}, end_date={})".format(self.start_date, self.end_date)
+
+
+class MarketDataCatalog(object):
+    '''Answers "which date range does this market data file cover" by looking only at
+    the first and the last candle of the file. The result is stored in a sidecar
+    ``<name>.coverage.json`` manifest next to the file and reused while the file's
+    mtime and size stay the same.
+    '''
+
+    CSV_DTFORMAT = "%Y-%m-%dT%H:%M:%S"
+    MANIFEST_DTFORMAT = "%Y-%m-%dT%H:%M:%S"
+    TAIL_BLOCK_SIZE = 4096
+
+    _CACHE = {}
+
+    @classmethod
+    def get_manifest_filename(cls, filename):
+        return '{}.coverage.json'.format(os.path.splitext(filename)[0])
+
+    @classmethod
+    def get_file_signature(cls, filename):
+        stat = os.stat(filename)
+        return [stat.st_mtime, stat.st_size]
+
+    @classmethod
+    def parse_csv_timestamp(cls, line):
+        timestamp_str = line.split(b',', 1)[0].strip().strip(b'"').decode()
+        return datetime.strptime(timestamp_str, cls.CSV_DTFORMAT)
+
+    @classmethod
+    def read_csv_head_line(cls, f):
+        f.seek(0)
+        f.readline()  # Skip header
+        for line in f:
+            if line.strip():
+                return line
+        return None
+
+    @classmethod
+    def read_csv_tail_line(cls, f):
+        f.seek(0, os.SEEK_END)
+        file_size = f.tell()
+        block_size = cls.TAIL_BLOCK_SIZE
+        while True:
+            offset = max(0, file_size - block_size)
+            f.seek(offset)
+            lines = [line for line in f.read().splitlines() if line.strip()]
+            # The first line of a block may be cut in the middle, so it is only trusted when the block starts the file
+            if len(lines) > 1 or offset == 0:
+                return lines[-1] if lines else None
+            block_size *= 2
+
+    @classmethod
+    def read_csv_coverage(cls, filename):
+        with open(filename, 'rb') as f:
+            head_line = cls.read_csv_head_line(f)
+            if head_line is None:
+                return MarketDataCoverage(None, None)
+            tail_line = cls.read_csv_tail_line(f)
+            return MarketDataCoverage(cls.parse_csv_timestamp(head_line), cls.parse_csv_timestamp(tail_line))
+
+    @classmethod
+    def read_binary_coverage(cls, filename):
+        timestamps = np.load(MarketDataBinaryCache.get_timestamps_filename(filename), mmap_mode='r')
+        if len(timestamps) == 0:
+            return MarketDataCoverage(None, None)
+        return MarketDataCoverage(datetime.utcfromtimestamp(int(timestamps[0])), datetime.utcfromtimestamp(int(timestamps[-1])))
+
+    @classmethod
+    def read_coverage(cls, filename):
+        if MarketDataBinaryCache.is_up_to_date(filename):
+            return cls.read_binary_coverage(filename)
+        return cls.read_csv_coverage(filename)
+
+    @classmethod
+    def format_date(cls, dt):
+        return dt.strftime(cls.MANIFEST_DTFORMAT) if dt is not None else None
+
+    @classmethod
+    def parse_date(cls, dt_str):
+        return datetime.strptime(dt_str, cls.MANIFEST_DTFORMAT) if dt_str is not None else None
+
+    @classmethod
+    def load_manifest(cls, filename, signature):
+        manifest_filename = cls.get_manifest_filename(filename)
+        if not os.path.exists(manifest_filename):
+            return None
+        try:
+            with open(manifest_filename, 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("signature") != signature:
+            return None
+        return MarketDataCoverage(cls.parse_date(manifest["start_date"]), cls.parse_date(manifest["end_date"]))
+
+    @classmethod
+    def save_manifest(cls, filename, signature, coverage):
+        manifest_filename = cls.get_manifest_filename(filename)
+        manifest = {
+            "signature": signature,
+            "start_date": cls.format_date(coverage.start_date),
+            "end_date": cls.format_date(coverage.end_date),
+        }
+        tmp_filename = '{}.{}.tmp'.format(manifest_filename, os.getpid())
+        try:
+            with open(tmp_filename, 'w') as f:
+                json.dump(manifest, f)
+            os.replace(tmp_filename, manifest_filename)
+        except OSError:
+            # The manifest is only an optimization, a read-only market data folder is fine
+            pass
+
+    @classmethod
+    def get_coverage(cls, filename):
+        signature = cls.get_file_signature(filename)
+        cached = cls._CACHE.get(filename)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        coverage = cls.load_manifest(filename, signature)
+        if coverage is None:
+            coverage = cls.read_coverage(filename)
+            cls.save_manifest(filename, signature, coverage)
+        cls._CACHE[filename] = (signature, coverage)
+        return coverage
+
+    @classmethod
+    def has_data(cls, filename, fromdate, todate):
+        return cls.get_coverage(filename).has_data(fromdate, todate)
@@ -0,0 +1,419 @@
+from extensions.feeds.binarydata import MarketDataBinaryCache
+from ccxt.base.errors import NetworkError, ExchangeError, DDoSProtection
+from dateutil.tz import tzlocal
+from datetime import datetime
+import pandas as pd
+import numpy as np
+import asyncio
+import json
+import os
+import time
+
+
+def to_store_timestamps(timestamps_ms):
+    # Local wall clock time of each candle, in seconds, the way the CSV files keep it
+    local_dt = pd.to_datetime(timestamps_ms, unit='ms', utc=True).tz_convert(tzlocal()).tz_localize(None)
+    return local_dt.values.astype('datetime64[s]').astype(np.int64)
+
+
+def from_store_timestamps(timestamps):
+    # UTC time of each candle, in ms. The wall clock hour repeated when DST ends is told apart by the
+    # order of the candles: a time not later than one before it is the second, standard time one.
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    utc_dt = pd.to_datetime(timestamps, unit='s').tz_localize(tzlocal(), ambiguous=True, nonexistent='shift_forward').tz_convert('UTC')
+    timestamps_ms = utc_dt.tz_localize(None).values.astype('datetime64[ms]').astype(np.int64)
+    # An ambiguous wall clock time is the one of two UTC times an hour apart
+    is_earlier = to_store_timestamps(timestamps_ms - 3600000) == timestamps
+    is_later = to_store_timestamps(timestamps_ms + 3600000) == timestamps
+    is_ambiguous = is_earlier | is_later
+    if is_ambiguous.any():
+        ambiguous_timestamps = timestamps[is_ambiguous]
+        latest_before = np.maximum.accumulate(np.concatenate([[np.iinfo(np.int64).min], ambiguous_timestamps[:-1]]))
+        is_dst = ambiguous_timestamps > latest_before
+        dst_timestamps_ms = timestamps_ms[is_ambiguous] - np.where(is_earlier[is_ambiguous], 3600000, 0)
+        timestamps_ms[is_ambiguous] = np.where(is_dst, dst_timestamps_ms, dst_timestamps_ms + 3600000)
+    return timestamps_ms
+
+
+class RequestRateLimiter(object):
+    '''Spaces out the requests of all the coroutines sharing it by at least ``interval_ms``.'''
+
+    def __init__(self, interval_ms):
+        self._interval = interval_ms / 1000.0
+        self._lock = asyncio.Lock()
+        self._next_time = 0.0
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            if self._next_time > now:
+                await asyncio.sleep(self._next_time - now)
+                now = self._next_time
+            self._next_time = now + self._interval
+
+
+class DownloadChunk(object):
+    def __init__(self, start_ms, end_ms):
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+
+    def __str__(self):
+        return "{} - {}".format(datetime.utcfromtimestamp(self.start_ms / 1000), datetime.utcfromtimestamp(self.end_ms / 1000))
+
+
+class DownloadCheckpoint(object):
+    '''State of a download kept next to the CSV file being written:
+
+      - ``<name>.download.json`` - the download range, the chunk length and the time up to which
+        the candles are already appended to the market data store;
+      - ``<name>.chunks/<start_ms>.npy`` - the candles of every chunk fetched but not appended yet
+        (ccxt rows: timestamp in ms, open, high, low, close, volume).
+
+    A download started again with the same range resumes from it. The checkpoint is removed when
+    the download completes.
+    '''
+
+    def __init__(self, csv_filename):
+        base_filename = os.path.splitext(csv_filename)[0]
+        self.manifest_filename = '{}.download.json'.format(base_filename)
+        self.chunks_dirname = '{}.chunks'.format(base_filename)
+        self.state = None
+
+    def load(self):
+        if os.path.exists(self.manifest_filename):
+            with open(self.manifest_filename, 'r') as f:
+                self.state = json.load(f)
+        return self.state
+
+    def save(self, state):
+        self.state = state
+        tmp_filename = '{}.{}.tmp'.format(self.manifest_filename, os.getpid())
+        with open(tmp_filename, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_filename, self.manifest_filename)
+
+    def get_chunk_filename(self, chunk):
+        return os.path.join(self.chunks_dirname, '{}.npy'.format(chunk.start_ms))
+
+    def has_chunk(self, chunk):
+        return os.path.exists(self.get_chunk_filename(chunk))
+
+    def save_chunk(self, chunk, rows):
+        os.makedirs(self.chunks_dirname, exist_ok=True)
+        filename = self.get_chunk_filename(chunk)
+        tmp_filename = '{}.{}.tmp'.format(filename, os.getpid())
+        with open(tmp_filename, 'wb') as f:
+            np.save(f, rows)
+        os.replace(tmp_filename, filename)
+
+    def load_chunk(self, chunk):
+        return np.load(self.get_chunk_filename(chunk))
+
+    def remove_chunk(self, chunk):
+        filename = self.get_chunk_filename(chunk)
+        if os.path.exists(filename):
+            os.remove(filename)
+
+    def remove(self):
+        if os.path.isdir(self.chunks_dirname):
+            for name in os.listdir(self.chunks_dirname):
+                os.remove(os.path.join(self.chunks_dirname, name))
+            os.rmdir(self.chunks_dirname)
+        if os.path.exists(self.manifest_filename):
+            os.remove(self.manifest_filename)
+        self.state = None
+
+
+class MarketDataDownloader(object):
+    '''Downloads the OHLCV candles of a symbol/timeframe into a market data CSV file (and its binary cache).
+
+    The date range is split into chunks of ``CHUNK_NUM_REQUESTS`` requests each. The chunks are fetched
+    concurrently (at most ``concurrency`` at a time) while a shared limiter keeps the requests
+    ``rate_limit_ms`` apart. Every fetched chunk is checkpointed to disk and the chunks are appended to
+    the market data store in date order as soon as all the earlier ones are there, so an interrupted
+    download resumes without fetching the stored chunks again.
+
+    ``exchange`` is a ``ccxt.async_support`` exchange instance, or any object with the same
+    ``fetch_ohlcv()`` coroutine and ``parse_timeframe()`` method. Candles are stored with the local
+    time of the machine as their timestamp, as the CSV files have always been.
+    '''
+
+    CHUNK_NUM_REQUESTS = 10
+    RATE_LIMIT_ERROR_RECOVER_DELAY = 90
+
+    def __init__(self, exchange, symbol, timeframe, csv_filename, rate_limit_ms, concurrency=4, limit=1000, retries=5, debug=False):
+        self._exchange = exchange
+        self._symbol = symbol
+        self._timeframe = timeframe
+        self._csv_filename = csv_filename
+        self._rate_limiter = RequestRateLimiter(rate_limit_ms)
+        self._concurrency = max(1, concurrency)
+        self._limit = limit
+        self._retries = retries
+        self._debug = debug
+        self._timeframe_ms = exchange.parse_timeframe(timeframe) * 1000
+        self._checkpoint = DownloadCheckpoint(csv_filename)
+
+    def get_chunk_length_ms(self):
+        return self._timeframe_ms * self._limit * self.CHUNK_NUM_REQUESTS
+
+    def get_chunks(self, start_ms, end_ms):
+        chunk_length_ms = self.get_chunk_length_ms()
+        return [DownloadChunk(chunk_start_ms, min(chunk_start_ms + chunk_length_ms, end_ms)) for chunk_start_ms in range(start_ms, end_ms, chunk_length_ms)]
+
+    def get_last_closed_candle_end_ms(self):
+        # The candle in progress is not downloaded: it would be stored with its values so far
+        now_ms = int(time.time() * 1000)
+        return now_ms - now_ms % self._timeframe_ms
+
+    async def fetch_ohlcv(self, since, limit):
+        for attempt in range(self._retries):
+            await self._rate_limiter.wait()
+            try:
+                if self._debug:
+                    print('Fetching: {}, TF: {}, Since: {}, Limit: {}'.format(self._symbol, self._timeframe, since, limit))
+                return await self._exchange.fetch_ohlcv(self._symbol, self._timeframe, since, limit)
+            except (NetworkError, ExchangeError) as err:
+                print("fetch_ohlcv(): catched {}: {}".format(type(err).__name__, err))
+                if attempt == self._retries - 1:
+                    raise
+                if isinstance(err, DDoSProtection):
+                    await asyncio.sleep(self.RATE_LIMIT_ERROR_RECOVER_DELAY)
+                else:
+                    await asyncio.sleep(2 ** attempt)
+
+    async def fetch_first_timestamp(self, start_ms):
+        rows = await self.fetch_ohlcv(start_ms, 1)
+        return int(rows[0][0]) if rows else None
+
+    async def fetch_chunk(self, chunk):
+        rows = []
+        since = chunk.start_ms
+        while since < chunk.end_ms:
+            page = await self.fetch_ohlcv(since, self._limit)
+            if not page:
+                break
+            rows.extend(row for row in page if since <= row[0] < chunk.end_ms)
+            last_timestamp = int(page[-1][0])
+            if last_timestamp + self._timeframe_ms >= chunk.end_ms or last_timestamp < since:
+                break
+            since = last_timestamp + self._timeframe_ms
+        return np.array(rows, dtype=np.float64).reshape(-1, 6)
+
+    def to_store_timestamps(self, timestamps_ms):
+        return to_store_timestamps(timestamps_ms)
+
+    def append_to_store(self, rows):
+        if len(rows) == 0:
+            return
+        order = np.argsort(rows[:, 0], kind='mergesort')
+        rows = rows[order]
+        # The candles already stored (e.g. appended again after a crash) are dropped by their UTC time
+        rows = rows[np.concatenate([[True], np.diff(rows[:, 0]) > 0]) & (rows[:, 0] > self.get_stored_until_ms())]
+        MarketDataBinaryCache.append(self._csv_filename, self.to_store_timestamps(rows[:, 0].astype(np.int64)), rows[:, 1:6].T, drop_not_newer=False)
+
+    def get_stored_until_ms(self):
+        '''Returns the UTC time (ms) of the last candle of the market data file, 0 if there is none.'''
+        # The candles before the last one tell whether it is in the repeated hour of the end of DST
+        last_timestamps = MarketDataBinaryCache.get_last_timestamps(self._csv_filename)
+        return int(from_store_timestamps(last_timestamps)[-1]) if len(last_timestamps) > 0 else 0
+
+    def init_checkpoint(self, start_ms, end_ms):
+        state = self._checkpoint.load()
+        if state is not None and state["start_ms"] == start_ms and state["chunk_length_ms"] == self.get_chunk_length_ms():
+            print("Resuming the download: candles up to {} are already stored".format(datetime.utcfromtimestamp(state["appended_until_ms"] / 1000)))
+            # A later end date only adds chunks
+            state["end_ms"] = max(state["end_ms"], end_ms)
+            self._checkpoint.save(state)
+            return state
+
+        # The chunks of another download are of no use, the candles already stored are kept
+        self._checkpoint.remove()
+        state = {"start_ms": start_ms, "end_ms": end_ms, "chunk_length_ms": self.get_chunk_length_ms(), "appended_until_ms": max(start_ms, self.get_stored_until_ms())}
+        self._checkpoint.save(state)
+        return state
+
+    def print_progress(self, tstart, num_fetched, num_chunks):
+        elapsed = (datetime.now() - tstart).total_seconds()
+        eta = elapsed / num_fetched * (num_chunks - num_fetched) if num_fetched > 0 else 0
+        print('!! Fetched chunks={}/{}, elapsed={}s, ETA={}s'.format(num_fetched, num_chunks, round(elapsed), round(eta)))
+
+    async def download(self, start_ms, end_ms=None):
+        '''Downloads the candles from ``start_ms`` (or the first one the exchange has after it) until
+        ``end_ms`` (exclusive, default: the last closed candle) and returns the number of chunks fetched.
+        The candles of an existing market data file are kept: only the ones after its last candle are fetched.
+        '''
+        end_ms = end_ms or self.get_last_closed_candle_end_ms()
+        first_timestamp = await self.fetch_first_timestamp(start_ms)
+        if first_timestamp is None:
+            print("No candles of {} {} after {}".format(self._symbol, self._timeframe, datetime.utcfromtimestamp(start_ms / 1000)))
+            return 0
+        # The chunks are aligned to the first candle, a resumed download gets the same chunks
+        state = self.init_checkpoint(first_timestamp, end_ms)
+        return await self.fetch_and_store(state)
+
+    async def update(self, start_ms, end_ms=None):
+        '''Downloads only the candles newer than the last one of the market data file. The last stored
+        candle is requested again and dropped as a duplicate, so that the new candles start right after it.
+        Without a market data file it is the same as ``download()``.
+        '''
+        end_ms = end_ms or self.get_last_closed_candle_end_ms()
+        state = self._checkpoint.load()
+        if state is not None:
+            # An interrupted download or update of this file: finish it first
+            return await self.fetch_and_store(self.init_checkpoint(state["start_ms"], end_ms))
+
+        update_start_ms = self.get_stored_until_ms()
+        if update_start_ms == 0:
+            return await self.download(start_ms, end_ms)
+
+        if update_start_ms + self._timeframe_ms >= end_ms:
+            print("The market data is up to date")
+            return 0
+        print("Updating from the last stored candle: {}".format(datetime.utcfromtimestamp(update_start_ms / 1000)))
+        state = {"start_ms": update_start_ms, "end_ms": end_ms, "chunk_length_ms": self.get_chunk_length_ms(), "appended_until_ms": update_start_ms}
+        self._checkpoint.save(state)
+        return await self.fetch_and_store(state)
+
+    async def fetch_and_store(self, state):
+        chunks = self.get_chunks(state["appended_until_ms"], state["end_ms"])
+        semaphore = asyncio.Semaphore(self._concurrency)
+        fetched = [False] * len(chunks)
+        num_fetched = 0
+        next_to_append = 0
+        tstart = datetime.now()
+
+        async def fetch(idx):
+            chunk = chunks[idx]
+            if not self._checkpoint.has_chunk(chunk):
+                async with semaphore:
+                    rows = await self.fetch_chunk(chunk)
+                self._checkpoint.save_chunk(chunk, rows)
+            return idx
+
+        tasks = [asyncio.ensure_future(fetch(idx)) for idx in range(len(chunks))]
+        try:
+            for future in asyncio.as_completed(tasks):
+                idx = await future
+                fetched[idx] = True
+                num_fetched += 1
+                # Append the chunks in date order: the store only ever grows at its end
+                while next_to_append < len(chunks) and fetched[next_to_append]:
+                    chunk = chunks[next_to_append]
+                    self.append_to_store(self._checkpoint.load_chunk(chunk))
+                    state["appended_until_ms"] = chunk.end_ms
+                    self._checkpoint.save(state)
+                    self._checkpoint.remove_chunk(chunk)
+                    next_to_append += 1
+                self.print_progress(tstart, num_fetched, len(chunks))
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        self._checkpoint.remove()
+        return len(chunks)
+
+    async def repair(self):
+        '''Checks the market data file with ``MarketDataIntegrityChecker``, drops the duplicate candles and
+        fetches the missing ones. Gaps the exchange has no candles for are recorded and not requested again.
+        Returns the report of the check.
+        '''
+        checker = MarketDataIntegrityChecker(self._csv_filename, self._timeframe_ms // 1000)
+        report = checker.check()
+        print(report)
+        gaps = [gap for gap in report.gaps if not checker.is_known_empty_gap(gap)]
+        if report.num_duplicates == 0 and report.num_unordered == 0 and len(gaps) == 0:
+            return report
+
+        semaphore = asyncio.Semaphore(self._concurrency)
+
+        async def fetch(gap):
+            async with semaphore:
+                return await self.fetch_chunk(DownloadChunk(gap[0] * 1000, gap[1] * 1000 + self._timeframe_ms))
+
+        print("Fetching {} missing ranges".format(len(gaps)))
+        fetched_rows = await asyncio.gather(*[fetch(gap) for gap in gaps])
+        for gap, rows in zip(gaps, fetched_rows):
+            if len(rows) == 0:
+                checker.add_known_empty_gap(gap)
+        checker.save_known_empty_gaps()
+
+        rows = np.concatenate(fetched_rows) if len(fetched_rows) > 0 else np.empty((0, 6))
+        checker.merge(rows[:, 0].astype(np.int64) // 1000, rows[:, 1:6].T)
+        print("Fetched {} missing candles".format(len(rows)))
+        return report
+
+
+class MarketDataIntegrityReport(object):
+    def __init__(self, csv_filename, num_candles, num_duplicates, num_unordered, gaps):
+        self.csv_filename = csv_filename
+        self.num_candles = num_candles
+        self.num_duplicates = num_duplicates
+        self.num_unordered = num_unordered
+        # (first missing UTC epoch second, last missing UTC epoch second, number of missing candles) of every gap
+        self.gaps = gaps
+
+    def __str__(self):
+        return "{}: candles={}, duplicates={}, out of order={}, gaps={} ({} missing candles)".format(
+            self.csv_filename, self.num_candles, self.num_duplicates, self.num_unordered, len(self.gaps), self.get_num_missing())
+
+    def get_num_missing(self):
+        return sum(gap[2] for gap in self.gaps)
+
+
+class MarketDataIntegrityChecker(object):
+    '''Detects the duplicate, out of order and missing candles of a market data CSV file.
+
+    The candles are checked in UTC time: the local wall clock time of the file repeats an hour when DST
+    ends and skips one when it starts. Gaps the exchange itself has no candles for (e.g. maintenance)
+    are kept in ``<name>.integrity.json`` once confirmed, so that they are not fetched again by every check.
+    '''
+
+    def __init__(self, csv_filename, timeframe_seconds):
+        self._csv_filename = csv_filename
+        self._timeframe_seconds = timeframe_seconds
+        self._known_empty_gaps_filename = '{}.integrity.json'.format(os.path.splitext(csv_filename)[0])
+        self._known_empty_gaps = set()
+        if os.path.exists(self._known_empty_gaps_filename):
+            with open(self._known_empty_gaps_filename, 'r') as f:
+                self._known_empty_gaps = set(tuple(gap) for gap in json.load(f).get("empty_gaps", []))
+        self._utc_timestamps = None
+        self._ohlcv = None
+
+    def load(self):
+        df = pd.read_csv(self._csv_filename)
+        timestamps = pd.to_datetime(df["Timestamp"], format=MarketDataBinaryCache.CSV_DTFORMAT).values.astype('datetime64[s]').astype(np.int64)
+        self._utc_timestamps = from_store_timestamps(timestamps) // 1000
+        self._ohlcv = df[MarketDataBinaryCache.CSV_COLUMNS].values.astype(np.float64).T
+
+    def check(self):
+        self.load()
+        timestamps = self._utc_timestamps
+        num_unordered = int(np.count_nonzero(np.diff(timestamps) < 0))
+        unique_timestamps = np.unique(timestamps)
+        num_duplicates = len(timestamps) - len(unique_timestamps)
+        steps = np.diff(unique_timestamps)
+        gap_idx = np.flatnonzero(steps > self._timeframe_seconds)
+        gaps = [(int(unique_timestamps[idx] + self._timeframe_seconds), int(unique_timestamps[idx + 1] - self._timeframe_seconds), int(steps[idx] // self._timeframe_seconds - 1)) for idx in gap_idx]
+        return MarketDataIntegrityReport(self._csv_filename, len(timestamps), num_duplicates, num_unordered, gaps)
+
+    def is_known_empty_gap(self, gap):
+        return tuple(gap[:2]) in self._known_empty_gaps
+
+    def add_known_empty_gap(self, gap):
+        self._known_empty_gaps.add(tuple(gap[:2]))
+
+    def save_known_empty_gaps(self):
+        tmp_filename = '{}.{}.tmp'.format(self._known_empty_gaps_filename, os.getpid())
+        with open(tmp_filename, 'w') as f:
+            json.dump({"empty_gaps": sorted(self._known_empty_gaps)}, f)
+        os.replace(tmp_filename, self._known_empty_gaps_filename)
+
+    def merge(self, utc_timestamps, ohlcv):
+        '''Rewrites the file with its candles and the given ones (UTC epoch seconds), in time order and without
+        duplicates (the first stored candle of a time wins).
+        '''
+        all_timestamps = np.concatenate([self._utc_timestamps, np.asarray(utc_timestamps, dtype=np.int64)])
+        all_ohlcv = np.concatenate([self._ohlcv, np.asarray(ohlcv, dtype=np.float64).reshape(5, -1)], axis=1)
+        _, first_idx = np.unique(all_timestamps, return_index=True)
+        MarketDataBinaryCache.rewrite(self._csv_filename, to_store_timestamps(all_timestamps[first_idx] * 1000), all_ohlcv[:, first_idx])
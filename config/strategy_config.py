@@ -13,6 +13,11 @@ class AppConfig(object):
             "STEP2_ENABLE_FILTERING": False,
             "STEP1_ENABLE_EQUITYCURVE_IMG_GENERATION": True,
             "DRAW_EQUITYCURVE_IMG_X_AXIS_TRADES": True,      # True: generating equity curve images with number of closed trades as x-axis, False: use closed trade dates as x-axis
+            "RESULTS_STORE_FORMAT": "csv",                   # Format of the WFO steps results files: "csv" or "parquet" (requires the optional pyarrow package, see requirements.txt)
+            "STEP1_DEFERRED_STATS": True,                    # True: Monte Carlo simulation and equity curve data points are calculated only for the rows left after filtering
+            "MONTECARLO_SIMS_NUMBER": 1000,                  # Number of Monte Carlo simulations (trade order permutations) per backtest
+            "MONTECARLO_RANDOM_SEED": 0,                     # Seed of the Monte Carlo random generator, None: non-reproducible simulations
+            "MONTECARLO_MAX_CHUNK_ELEMENTS": 4000000,        # Max size (simulations x trades) of the matrix simulated at once
         }
 
     _DEFAULT_STRATEGY_PARAMS_DICT = {
@@ -668,6 +673,26 @@ class AppConfig(object):
     def is_global_equitycurve_img_x_axis_trades(cls):
         return cls._GLOBAL_STRATEGY_PARAMS_DICT["DRAW_EQUITYCURVE_IMG_X_AXIS_TRADES"]
 
+    @classmethod
+    def get_global_results_store_format(cls):
+        return cls._GLOBAL_STRATEGY_PARAMS_DICT["RESULTS_STORE_FORMAT"]
+
+    @classmethod
+    def is_global_step1_deferred_stats(cls):
+        return cls._GLOBAL_STRATEGY_PARAMS_DICT["STEP1_DEFERRED_STATS"]
+
+    @classmethod
+    def get_global_montecarlo_sims_number(cls):
+        return cls._GLOBAL_STRATEGY_PARAMS_DICT["MONTECARLO_SIMS_NUMBER"]
+
+    @classmethod
+    def get_global_montecarlo_random_seed(cls):
+        return cls._GLOBAL_STRATEGY_PARAMS_DICT["MONTECARLO_RANDOM_SEED"]
+
+    @classmethod
+    def get_global_montecarlo_max_chunk_elements(cls):
+        return cls._GLOBAL_STRATEGY_PARAMS_DICT["MONTECARLO_MAX_CHUNK_ELEMENTS"]
+
     @classmethod
     def get_step1_strategy_params(cls, strategy_enum):
         return cls._STEP1_STRATEGY_PARAMS_DICT[strategy_enum]
@@ -17,7 +17,7 @@ do
         echo "Downloading market data for $exchange/$symbol/$timeframe..."
         current_date_time="`date '+%Y-%m-%d - %H:%M:%S'`"
         echo "Started: $current_date_time... "
-        python ccxt_market_data.py -s $symbol -e $exchange -t $timeframe
+        python ccxt_market_data.py -s $symbol -e $exchange -t $timeframe --update
         current_date_time="`date '+%Y-%m-%d - %H:%M:%S'`"
         echo "Finished: $current_date_time."
     done
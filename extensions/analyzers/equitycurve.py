@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8; py-indent-offset:4 -*-
+###############################################################################
+#
+# Copyright (C) 2019 Alex
+#
+###############################################################################
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import json
+import numpy as np
+from model.linreg import OnlineLinearRegression
+
+__all__ = ['EquityCurveAccumulator']
+
+
+class EquityCurveAccumulator(object):
+    '''Append-only record of the net profits of the closed trades.
+
+    Dates (as ``yymmddHHMM`` integer keys), net profits and running equity are kept in
+    preallocated NumPy buffers which grow by doubling. Monthly net profit buckets (keyed by
+    the integer month index ``year * 12 + month - 1``) and the linear regression sums of the
+    equity curve are updated as the trades are added, so nothing has to be recalculated from
+    the whole series at the end of the run.
+
+    A trade closed at the same datetime as the previous one replaces its net profit, and
+    equity curve points with the same date key are merged (the last equity value wins).
+    '''
+
+    INITIAL_CAPACITY = 256
+
+    def __init__(self, cash):
+        self._cash = cash
+        self._size = 0
+        self._last_dtnum = None
+        self._date_keys = np.empty(self.INITIAL_CAPACITY, dtype=np.int64)
+        self._netprofits = np.empty(self.INITIAL_CAPACITY, dtype=np.float64)
+        self._equity = np.empty(self.INITIAL_CAPACITY, dtype=np.float64)
+        self._cash_equity = np.empty(self.INITIAL_CAPACITY, dtype=np.float64)
+        self._regression = OnlineLinearRegression()
+        self._month_indices = []
+        self._month_begin_equity = []
+        self._month_end_equity = []
+        self._month_closed = []
+        self._month_won = []
+
+    def __len__(self):
+        return self._size
+
+    @staticmethod
+    def get_date_key(dt):
+        return (dt.year % 100) * 100000000 + dt.month * 1000000 + dt.day * 10000 + dt.hour * 100 + dt.minute
+
+    @staticmethod
+    def get_month_index(dt):
+        return dt.year * 12 + dt.month - 1
+
+    def grow(self):
+        capacity = 2 * len(self._netprofits)
+        for name in ['_date_keys', '_netprofits', '_equity', '_cash_equity']:
+            buf = getattr(self, name)
+            new_buf = np.empty(capacity, dtype=buf.dtype)
+            new_buf[:self._size] = buf[:self._size]
+            setattr(self, name, new_buf)
+
+    def add_trade(self, dtnum, dt, netprofit):
+        month_idx = self.get_month_index(dt)
+        if not self._month_indices or self._month_indices[-1] != month_idx:
+            begin_equity = float(self._cash_equity[self._size - 1]) if self._size > 0 else self._cash
+            self._month_indices.append(month_idx)
+            self._month_begin_equity.append(begin_equity)
+            self._month_end_equity.append(begin_equity)
+            self._month_closed.append(0)
+            self._month_won.append(0)
+        self._month_closed[-1] += 1
+        self._month_won[-1] += int(netprofit >= 0.0)
+
+        if self._size > 0 and dtnum == self._last_dtnum:
+            self.replace_last_netprofit(netprofit)
+        else:
+            self.append_netprofit(dtnum, self.get_date_key(dt), netprofit)
+        self._month_end_equity[-1] = float(self._cash_equity[self._size - 1])
+
+    def append_netprofit(self, dtnum, date_key, netprofit):
+        if self._size == len(self._netprofits):
+            self.grow()
+        i = self._size
+        prev_equity = self._equity[i - 1] if i > 0 else 0
+        prev_cash_equity = self._cash_equity[i - 1] if i > 0 else self._cash
+        is_same_point = i > 0 and self._date_keys[i - 1] == date_key
+        self._date_keys[i] = date_key
+        self._netprofits[i] = netprofit
+        self._equity[i] = prev_equity + netprofit
+        self._cash_equity[i] = prev_cash_equity + netprofit
+        self._size += 1
+        self._last_dtnum = dtnum
+        if is_same_point:
+            self._regression.replace_last(self._equity[i])
+        else:
+            self._regression.add(self._equity[i])
+
+    def replace_last_netprofit(self, netprofit):
+        i = self._size - 1
+        self._netprofits[i] = netprofit
+        self._equity[i] = (self._equity[i - 1] if i > 0 else 0) + netprofit
+        self._cash_equity[i] = (self._cash_equity[i - 1] if i > 0 else self._cash) + netprofit
+        self._regression.replace_last(self._equity[i])
+
+    def get_netprofits(self):
+        return self._netprofits[:self._size]
+
+    def get_equity(self):
+        return self._equity[:self._size]
+
+    def get_date_keys(self):
+        return self._date_keys[:self._size]
+
+    @staticmethod
+    def to_equitycurve_data_dict(date_keys, equity):
+        equity_values = np.rint(equity).astype(np.int64)
+        return dict(zip(np.asarray(date_keys).tolist(), equity_values.tolist()))
+
+    @classmethod
+    def to_equitycurve_data_str(cls, date_keys, netprofits):
+        '''Builds the equity curve JSON from raw trade net profits (as returned by a ``deferstats`` analyzer).'''
+        return json.dumps(cls.to_equitycurve_data_dict(date_keys, np.cumsum(netprofits)))
+
+    def get_equitycurve_data_dict(self):
+        return self.to_equitycurve_data_dict(self.get_date_keys(), self.get_equity())
+
+    def get_equitycurve_data_str(self):
+        return json.dumps(self.get_equitycurve_data_dict())
+
+    def get_linreg_stats(self):
+        return self._regression.get_stats()
+
+    def get_monthly_netprofits(self):
+        '''Returns a list of (year, month, closed trades, won trades, net profit, net profit %), one per month with closed trades.'''
+        result = []
+        for month_idx, begin_equity, end_equity, closed, won in zip(self._month_indices, self._month_begin_equity, self._month_end_equity, self._month_closed, self._month_won):
+            year, month = divmod(month_idx, 12)
+            monthly_pnl = end_equity - begin_equity
+            monthly_pnl_pct = (monthly_pnl * 100 / begin_equity) if begin_equity != 0 else 0
+            result.append((year, month + 1, closed, won, monthly_pnl, monthly_pnl_pct))
+        return result
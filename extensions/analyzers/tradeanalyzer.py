@@ -13,10 +13,8 @@ from backtrader import Analyzer
 from backtrader.utils import AutoOrderedDict, AutoDict
 from backtrader.utils.py3 import MAXINT
 from calendar import monthrange
-import json
 from montecarlo.montecarlo import MonteCarloSimulator
-import pandas as pd
-from model.linreg import LinearRegressionCalculator
+from extensions.analyzers.equitycurve import EquityCurveAccumulator
 
 __all__ = ['TVTradeAnalyzer']
 
@@ -27,6 +25,7 @@ class TVTradeAnalyzer(Analyzer):
     '''
     params = (
         ('cash', 0),
+        ('deferstats', False),  # True: skip Monte Carlo and equity curve serialization, return raw trade net profits instead
     )
 
     def create_analysis(self):
@@ -37,29 +36,17 @@ class TVTradeAnalyzer(Analyzer):
         self.buyandholdcalcbegin = False
         self.buyandholdnumshares = 0
         self.buyandholdstartvalue = 0
-        self.netprofits_data = AutoOrderedDict()
+        self.equitycurve = EquityCurveAccumulator(self.p.cash)
         self.skip_trade_update_flag = False
 
     def set_netprofit_value(self, value):
-        self.netprofits_data[self.get_currentdate()] = value
+        self.equitycurve.add_trade(self.data.datetime[0], self.get_currentdate(), value)
 
     def get_equitycurve_data_dict(self):
-        equity = 0
-        result = {}
-        for date, netprofit in self.netprofits_data.items():
-            date_key = int(date.strftime('%y%m%d%H%M'))
-            equity += netprofit
-            result[date_key] = round(equity)
-        return result
+        return self.equitycurve.get_equitycurve_data_dict()
 
     def get_equitycurve_data_str(self):
-        equity = 0
-        result = {}
-        for date, netprofit in self.netprofits_data.items():
-            date_key = int(date.strftime('%y%m%d%H%M'))
-            equity += netprofit
-            result[date_key] = round(equity)
-        return json.dumps(result)
+        return self.equitycurve.get_equitycurve_data_str()
 
     def get_currentdate(self):
         return bt.num2date(self.data.datetime[0])
@@ -77,54 +64,21 @@ class TVTradeAnalyzer(Analyzer):
     def get_month_num_days(self, year, month):
         return monthrange(year, month)[1]
 
-    def get_monthly_stats_entry(self, curr_month_daterange_str):
-        trades = self.rets
-
-        entry = trades.monthly_stats[curr_month_daterange_str]
-        if len(entry) == 0:
-            entry = trades.monthly_stats[curr_month_daterange_str] = AutoOrderedDict()
-        return entry
-
-    def check_next_month(self, prev_datetime, curr_datetime):
-        months_diff = (curr_datetime.year - prev_datetime.year) * 12 + (curr_datetime.month - prev_datetime.month)
-        return months_diff >= 1
-
-    def update_tradenums_monthly_stats(self, trade):
-        if trade.status == trade.Closed:
-            curr_month_daterange_str = self.get_currentmonth_daterange()
-            curr_month_arr = self.get_monthly_stats_entry(curr_month_daterange_str)
-            curr_month_arr.total.closed += 1
-
-            won = int(trade.pnlcomm >= 0.0)
-            curr_month_arr.won.total += won
-
     def update_netprofit_monthly_stats(self):
-        npd_list = list(self.netprofits_data.items())
-        if len(npd_list) > 0:
-            monthbegin_date = npd_list[0][0]
-            monthbegin_equity_val = self.p.cash
-            curr_equity_date = None
-            curr_equity_val = self.p.cash
-            for npd in npd_list:
-                if curr_equity_date and self.check_next_month(monthbegin_date, npd[0]) is True:
-                    monthbegin_date = npd[0]
-                    monthbegin_equity_val = curr_equity_val
-
-                curr_equity_date = npd[0]
-                curr_equity_val += npd[1]
-
-                monthly_pnl = curr_equity_val - monthbegin_equity_val
-                monthly_pnl_pct = (monthly_pnl * 100 / monthbegin_equity_val) if monthbegin_equity_val != 0 else 0
-                curr_month_daterange_str = self.get_month_daterange(curr_equity_date)
-                curr_month_arr = self.get_monthly_stats_entry(curr_month_daterange_str)
-                curr_month_arr.pnl.netprofit.total = monthly_pnl
-                curr_month_arr.pnl.netprofit.pct = monthly_pnl_pct
+        trades = self.rets
+        for year, month, closed, won, monthly_pnl, monthly_pnl_pct in self.equitycurve.get_monthly_netprofits():
+            curr_month_daterange_str = self.getdaterange(year, month, 1, year, month, self.get_month_num_days(year, month))
+            curr_month_arr = trades.monthly_stats[curr_month_daterange_str] = AutoOrderedDict()
+            curr_month_arr.total.closed = closed
+            curr_month_arr.won.total = won
+            curr_month_arr.pnl.netprofit.total = monthly_pnl
+            curr_month_arr.pnl.netprofit.pct = monthly_pnl_pct
 
     def update_equitycurve_data(self):
         trades = self.rets
-        trades.total.equity.equitycurvedata = self.get_equitycurve_data_str()
-        equity_curve_data_dict = self.get_equitycurve_data_dict()
-        lr_stats = LinearRegressionCalculator.calculate(equity_curve_data_dict)
+        if self.p.deferstats is False:
+            trades.total.equity.equitycurvedata = self.get_equitycurve_data_str()
+        lr_stats = self.equitycurve.get_linreg_stats()
         trades.total.equity.stats.angle = lr_stats.angle
         trades.total.equity.stats.slope = lr_stats.slope
         trades.total.equity.stats.intercept = lr_stats.intercept
@@ -133,11 +87,15 @@ class TVTradeAnalyzer(Analyzer):
         trades.total.equity.stats.p_value = lr_stats.p_value
         trades.total.equity.stats.std_err = lr_stats.std_err
 
+    def update_raw_equitycurve_data(self):
+        trades = self.rets
+        trades.total.equity.netprofits = self.equitycurve.get_netprofits().copy()
+        trades.total.equity.datekeys = self.equitycurve.get_date_keys().copy()
+
     def update_mcsimulation_data(self):
         trades = self.rets
-        if self.netprofits_data and len(self.netprofits_data) > 0:
-            netprofits_series = pd.Series(list(self.netprofits_data.values()))
-            mcsimulation = self.mcsimulator.calculate(netprofits_series, self.p.cash)
+        if len(self.equitycurve) > 0:
+            mcsimulation = self.mcsimulator.calculate(self.equitycurve.get_netprofits(), self.p.cash)
             trades.total.mcsimulation.risk_of_ruin = mcsimulation.risk_of_ruin
             trades.total.mcsimulation.median_dd = mcsimulation.median_dd
             trades.total.mcsimulation.median_return = mcsimulation.median_return
@@ -181,16 +139,13 @@ class TVTradeAnalyzer(Analyzer):
         trades.len.tradebarsratio_pct = 100 * trades.len.total / trades.total.barsnumber
 
     def print_debug_info(self):
-        print("!!!!! self.netprofits_data={}\n".format(self.netprofits_data))
         print("All Trades:")
-        npd_list = list(self.netprofits_data.items())
         prev_equity_val = self.p.cash
         curr_equity_val = self.p.cash
-        for npd in npd_list:
-            curr_equity_date = npd[0]
-            curr_equity_val += npd[1]
+        for date_key, netprofit in zip(self.equitycurve.get_date_keys(), self.equitycurve.get_netprofits()):
+            curr_equity_val += netprofit
             pnl_pct = ((curr_equity_val - prev_equity_val) * 100 / prev_equity_val) if prev_equity_val != 0 else 0
-            print("Trade closed. Date = {}, Net Profit = {}, curr_equity_val = {}, Net Profit(Pnl %) = {}".format(curr_equity_date, npd[1], curr_equity_val, pnl_pct))
+            print("Trade closed. Date = {}, Net Profit = {}, curr_equity_val = {}, Net Profit(Pnl %) = {}".format(date_key, netprofit, curr_equity_val, pnl_pct))
             prev_equity_val = curr_equity_val
         print("Data in total.equity={}".format(vars(self.rets.total.equity)))
 
@@ -201,7 +156,10 @@ class TVTradeAnalyzer(Analyzer):
     def stop(self):
         self.update_netprofit_monthly_stats()
         self.update_equitycurve_data()
-        self.update_mcsimulation_data()
+        if self.p.deferstats is True:
+            self.update_raw_equitycurve_data()
+        else:
+            self.update_mcsimulation_data()
         #self.print_debug_info()
         super(TVTradeAnalyzer, self).stop()
         self.rets._close()
@@ -286,7 +244,6 @@ class TVTradeAnalyzer(Analyzer):
             trades.pnl.netprofit.total = trades.pnl.grossprofit.total + trades.pnl.grossloss.total
             trades.total.profitfactor = abs(trades.pnl.grossprofit.total / trades.pnl.grossloss.total) if trades.pnl.grossloss.total != 0 else 0
             self.set_netprofit_value(trade.pnlcomm)
-            self.update_tradenums_monthly_stats(trade)
 
             # Long/Short statistics
             for tname in ['long', 'short']:
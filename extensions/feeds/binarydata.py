@@ -0,0 +1,352 @@
+#!/usr/bin/env python
+# -*- coding: utf-8; py-indent-offset:4 -*-
+###############################################################################
+#
+# Copyright (C) 2019 Alex
+#
+###############################################################################
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import backtrader as bt
+from backtrader.linebuffer import LineBuffer
+from array import array
+from datetime import datetime, time, timedelta
+import numpy as np
+import pandas as pd
+import os
+
+__all__ = ['MarketDataBinaryCache', 'BinaryOHLCVData', 'WindowedFeedFactory']
+
+
+class MarketDataBinaryCache(object):
+    '''Columnar binary copy of a ``./marketdata/<exchange>/<symbol>/<tf>/*.csv`` file.
+
+    The CSV is converted once into two ``.npy`` files stored next to it:
+
+      - ``<name>.ts.npy``    - int64 UTC epoch seconds of each candle (sorted)
+      - ``<name>.ohlcv.npy`` - float64 array of shape (5, N): open, high, low, close, volume
+
+    Both files are opened memory-mapped, so taking a date window is a binary
+    search on the timestamp index plus a zero-copy slice of the columns. The
+    backtrader date numbers of the whole history are computed once per process
+    (``get_dtnums()``) and sliced the same way.
+    '''
+
+    CSV_DTFORMAT = "%Y-%m-%dT%H:%M:%S"
+    CSV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+    _CACHE = {}
+
+    def __init__(self, csv_filename, timestamps, ohlcv):
+        self.csv_filename = csv_filename
+        self.timestamps = timestamps
+        self.ohlcv = ohlcv
+        self._dtnums = None
+
+    @classmethod
+    def get_timestamps_filename(cls, csv_filename):
+        return '{}.ts.npy'.format(os.path.splitext(csv_filename)[0])
+
+    @classmethod
+    def get_ohlcv_filename(cls, csv_filename):
+        return '{}.ohlcv.npy'.format(os.path.splitext(csv_filename)[0])
+
+    @classmethod
+    def is_up_to_date(cls, csv_filename):
+        ts_filename = cls.get_timestamps_filename(csv_filename)
+        ohlcv_filename = cls.get_ohlcv_filename(csv_filename)
+        if not os.path.exists(ts_filename) or not os.path.exists(ohlcv_filename):
+            return False
+        csv_mtime = os.path.getmtime(csv_filename)
+        return os.path.getmtime(ts_filename) >= csv_mtime and os.path.getmtime(ohlcv_filename) >= csv_mtime
+
+    @classmethod
+    def save(cls, csv_filename, timestamps, ohlcv):
+        ts_filename = cls.get_timestamps_filename(csv_filename)
+        ohlcv_filename = cls.get_ohlcv_filename(csv_filename)
+        # Write to temporary files first so that concurrent runs never map a half-written cache
+        ts_tmp_filename = '{}.{}.tmp'.format(ts_filename, os.getpid())
+        ohlcv_tmp_filename = '{}.{}.tmp'.format(ohlcv_filename, os.getpid())
+        with open(ohlcv_tmp_filename, 'wb') as f:
+            np.save(f, np.ascontiguousarray(ohlcv, dtype=np.float64))
+        with open(ts_tmp_filename, 'wb') as f:
+            np.save(f, np.ascontiguousarray(timestamps, dtype=np.int64))
+        os.replace(ohlcv_tmp_filename, ohlcv_filename)
+        os.replace(ts_tmp_filename, ts_filename)
+
+    @classmethod
+    def convert(cls, csv_filename):
+        # Parsed exactly, as float() of the CSV feeds does: the default pandas parser can be 1 ulp off
+        df = pd.read_csv(csv_filename, float_precision='round_trip')
+        timestamps = pd.to_datetime(df["Timestamp"], format=cls.CSV_DTFORMAT).values.astype('datetime64[s]').astype(np.int64)
+        ohlcv = df[cls.CSV_COLUMNS].values.astype(np.float64).T
+        order = np.argsort(timestamps, kind='mergesort')
+        if not np.all(order == np.arange(len(order))):
+            timestamps = timestamps[order]
+            ohlcv = ohlcv[:, order]
+        cls.save(csv_filename, timestamps, ohlcv)
+
+    @classmethod
+    def format_csv_timestamps(cls, timestamps):
+        # "%Y-%m-%dT%H:%M:%S" for all the rows at once
+        return np.datetime_as_string(np.asarray(timestamps, dtype=np.int64).astype('datetime64[s]'), unit='s')
+
+    @classmethod
+    def format_csv(cls, timestamps, ohlcv, header):
+        df = pd.DataFrame(np.asarray(ohlcv, dtype=np.float64).T, columns=cls.CSV_COLUMNS)
+        df.insert(0, "Timestamp", cls.format_csv_timestamps(timestamps))
+        return df.to_csv(header=header, index=False).encode()
+
+    @classmethod
+    def get_last_timestamps(cls, csv_filename):
+        '''Returns the timestamps of the last candles of the CSV file (at least the last one, if any), reading its tail only.'''
+        if not os.path.exists(csv_filename):
+            return []
+        with open(csv_filename, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            tail_start = max(0, f.tell() - 4096)
+            f.seek(tail_start)
+            lines = f.read().decode().split()
+        # The first line of the tail may be cut
+        lines = lines[1:] if tail_start > 0 and len(lines) > 1 else lines
+        return [cls.to_epoch(line.split(",")[0]) for line in lines if not line.startswith("Timestamp")]
+
+    @classmethod
+    def get_last_timestamp(cls, csv_filename):
+        '''Returns the timestamp of the last candle of the CSV file (None if there is none), reading its tail only.'''
+        last_timestamps = cls.get_last_timestamps(csv_filename)
+        return last_timestamps[-1] if len(last_timestamps) > 0 else None
+
+    @classmethod
+    def append(cls, csv_filename, timestamps, ohlcv, drop_not_newer=True):
+        '''Appends candles to the CSV file. The candles not newer than the last one of the file are dropped,
+        so appending the same candles again (e.g. after a crash) changes nothing; a caller which knows the
+        UTC time of the candles drops them itself instead (``drop_not_newer=False``), as the local timestamps
+        repeat an hour when DST ends. The rows are written with a single write() and the binary cache is
+        extended as well when it was up to date, so that it is not converted from the CSV again.
+        '''
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        last_timestamp = cls.get_last_timestamp(csv_filename)
+        if last_timestamp is not None and drop_not_newer:
+            is_newer = timestamps > last_timestamp
+            timestamps = timestamps[is_newer]
+            ohlcv = np.asarray(ohlcv)[:, is_newer]
+        if len(timestamps) == 0:
+            return
+        is_new_file = not os.path.exists(csv_filename)
+        was_up_to_date = is_new_file or cls.is_up_to_date(csv_filename)
+
+        content = cls.format_csv(timestamps, ohlcv, is_new_file)
+        with open(csv_filename, 'ab') as f:
+            size = f.tell()
+            try:
+                f.write(content)
+                f.flush()
+            except BaseException:
+                f.truncate(size)
+                raise
+
+        if was_up_to_date:
+            if is_new_file:
+                all_timestamps, all_ohlcv = timestamps, ohlcv
+            else:
+                all_timestamps = np.concatenate([np.load(cls.get_timestamps_filename(csv_filename)), timestamps])
+                all_ohlcv = np.concatenate([np.load(cls.get_ohlcv_filename(csv_filename)), ohlcv], axis=1)
+            if np.any(np.diff(all_timestamps[-len(timestamps) - 1:]) < 0):
+                # The repeated hour of the end of DST: the cache is sorted by timestamp, as convert() does
+                order = np.argsort(all_timestamps, kind='mergesort')
+                all_timestamps, all_ohlcv = all_timestamps[order], all_ohlcv[:, order]
+            cls.save(csv_filename, all_timestamps, all_ohlcv)
+        cls._CACHE.pop(csv_filename, None)
+
+    @classmethod
+    def rewrite(cls, csv_filename, timestamps, ohlcv):
+        '''Replaces the content of the CSV file with the candles, in the given order (the order of time: the local
+        timestamps repeat an hour when DST ends). The binary cache is sorted by timestamp, as ``convert()`` does.
+        '''
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        ohlcv = np.asarray(ohlcv, dtype=np.float64)
+        tmp_filename = '{}.{}.tmp'.format(csv_filename, os.getpid())
+        with open(tmp_filename, 'wb') as f:
+            f.write(cls.format_csv(timestamps, ohlcv, True))
+        os.replace(tmp_filename, csv_filename)
+        order = np.argsort(timestamps, kind='mergesort')
+        cls.save(csv_filename, timestamps[order], ohlcv[:, order])
+        cls._CACHE.pop(csv_filename, None)
+
+    @classmethod
+    def load(cls, csv_filename):
+        if not cls.is_up_to_date(csv_filename):
+            print("Converting market data into binary cache: {}".format(csv_filename))
+            cls.convert(csv_filename)
+            cls._CACHE.pop(csv_filename, None)
+
+        cached = cls._CACHE.get(csv_filename)
+        if cached is None:
+            timestamps = np.load(cls.get_timestamps_filename(csv_filename), mmap_mode='r')
+            ohlcv = np.load(cls.get_ohlcv_filename(csv_filename), mmap_mode='r')
+            cached = cls(csv_filename, timestamps, ohlcv)
+            cls._CACHE[csv_filename] = cached
+        return cached
+
+    @classmethod
+    def to_epoch(cls, dt):
+        return int(np.datetime64(dt, 's').astype(np.int64))
+
+    def get_window_indices(self, fromdate, todate):
+        from_idx = int(np.searchsorted(self.timestamps, self.to_epoch(fromdate), side='left'))
+        to_idx = int(np.searchsorted(self.timestamps, self.to_epoch(todate), side='right'))
+        return from_idx, to_idx
+
+    def get_window(self, fromdate, todate):
+        from_idx, to_idx = self.get_window_indices(fromdate, todate)
+        return self.timestamps[from_idx:to_idx], self.ohlcv[:, from_idx:to_idx]
+
+    def get_dtnums(self):
+        if self._dtnums is None:
+            self._dtnums = BinaryOHLCVData.timestamps_to_dtnums(self.timestamps)
+        return self._dtnums
+
+    def get_window_view(self, fromdate, todate):
+        from_idx, to_idx = self.get_window_indices(fromdate, todate)
+        return self.get_dtnums()[from_idx:to_idx], self.ohlcv[:, from_idx:to_idx]
+
+
+class BinaryOHLCVData(bt.feed.DataBase):
+    '''Data feed which serves candles straight from NumPy arrays (usually a
+    window of a ``MarketDataBinaryCache``) without any text parsing.
+
+    ``dataname`` keeps the path of the original CSV file, as strategies derive
+    the symbol name from it.
+
+    When preloading into unbounded line buffers (no filters, no ``tzinput``) the
+    candles between ``fromdate`` and ``todate`` are copied into the lines in bulk
+    instead of bar by bar.
+
+    Params:
+      - ``timestamps`` - int64 UTC epoch seconds of each candle
+      - ``dtnums``     - backtrader date numbers of each candle, used instead of ``timestamps``
+      - ``ohlcv``      - float64 array of shape (5, N): open, high, low, close, volume
+    '''
+
+    # backtrader's date2num() of 1970-01-01 00:00:00
+    _EPOCH_NUM = 719163.0
+    _SECONDS_PER_DAY = 86400.0
+    # backtrader's default session start/end times, applied to the fromdate/todate given as dates
+    _DEFAULT_SESSIONSTART = time.min
+    _DEFAULT_SESSIONEND = time(23, 59, 59, 999990)
+
+    params = (
+        ('timestamps', None),
+        ('dtnums', None),
+        ('ohlcv', None),
+    )
+
+    @classmethod
+    def timestamps_to_dtnums(cls, timestamps):
+        return cls._EPOCH_NUM + np.asarray(timestamps, dtype=np.float64) / cls._SECONDS_PER_DAY
+
+    @classmethod
+    def to_session_datetime(cls, dt, sessiontime):
+        '''A date (without time) as backtrader takes it for ``fromdate``/``todate``: at the session start/end time.'''
+        if hasattr(dt, 'hour'):
+            return dt
+        return datetime.combine(dt, sessiontime)
+
+    @classmethod
+    def from_csv_cache(cls, csv_filename, fromdate, todate, **kwargs):
+        cache = MarketDataBinaryCache.load(csv_filename)
+        # The window holds the same bars as the feed accepts: a todate date includes the candles of that whole day
+        dtnums, ohlcv = cache.get_window_view(
+            cls.to_session_datetime(fromdate, kwargs.get('sessionstart') or cls._DEFAULT_SESSIONSTART),
+            cls.to_session_datetime(todate, kwargs.get('sessionend') or cls._DEFAULT_SESSIONEND))
+        return cls(dataname=csv_filename, dtnums=dtnums, ohlcv=ohlcv, fromdate=fromdate, todate=todate, **kwargs)
+
+    def start(self):
+        super(BinaryOHLCVData, self).start()
+        if self.p.dtnums is not None:
+            self._dtnums = np.asarray(self.p.dtnums, dtype=np.float64)
+        else:
+            self._dtnums = self.timestamps_to_dtnums(self.p.timestamps)
+        self._columns = [np.asarray(self.p.ohlcv[i]) for i in range(5)]
+        self._idx = 0
+        self._size = len(self._dtnums)
+
+    def _load(self):
+        idx = self._idx
+        if idx >= self._size:
+            return False
+
+        lines = self.lines
+        opens, highs, lows, closes, volumes = self._columns
+        lines.datetime[0] = self._dtnums[idx]
+        lines.open[0] = opens[idx]
+        lines.high[0] = highs[idx]
+        lines.low[0] = lows[idx]
+        lines.close[0] = closes[idx]
+        lines.volume[0] = volumes[idx]
+        lines.openinterest[0] = 0.0
+        self._idx = idx + 1
+        return True
+
+    def can_bulk_preload(self):
+        if self._filters or self._ffilters or self._tzinput or self._barstack or self._barstash:
+            return False
+        return all(line.mode == LineBuffer.UnBounded for line in self.lines)
+
+    def preload(self):
+        if not self.can_bulk_preload():
+            super(BinaryOHLCVData, self).preload()
+            return
+
+        # Same bars load() would accept: skip the ones before fromdate, stop at the first one after todate
+        dtnums = self._dtnums[self._idx:]
+        start = self._idx + int(np.searchsorted(dtnums, self.fromdate, side='left'))
+        end = self._idx + int(np.searchsorted(dtnums, self.todate, side='right'))
+        end = max(start, end)
+        opens, highs, lows, closes, volumes = self._columns
+        lines = self.lines
+        values_by_line = [
+            (lines.datetime, self._dtnums[start:end]),
+            (lines.open, opens[start:end]),
+            (lines.high, highs[start:end]),
+            (lines.low, lows[start:end]),
+            (lines.close, closes[start:end]),
+            (lines.volume, volumes[start:end]),
+            (lines.openinterest, np.zeros(end - start)),
+        ]
+        for line, values in values_by_line:
+            chunk = array(str('d'))
+            chunk.frombytes(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+            line.array.extend(chunk)
+            line.idx += len(chunk)
+            line.lencount += len(chunk)
+        self._idx = self._size
+
+        self._last()
+        self.home()
+
+
+class WindowedFeedFactory(object):
+    '''Builds the feeds of the date ranges (e.g. the training and testing ranges of WFO cycles) of a
+    market data file. Every feed is a view of the history kept by ``MarketDataBinaryCache`` for the
+    whole process, padded with ``WARMUP_PERIOD`` of earlier candles for the indicators to warm up
+    and ``LOOKAHEAD_PERIOD`` of later candles: nothing is read or parsed again per range.
+
+    The padded dates are taken as backtrader takes dates: the range ends with the last candle of the
+    ``todate`` day, as in the ``GenericCSVData`` feeds the steps used to build.
+    '''
+
+    WARMUP_PERIOD = timedelta(days=50)
+    LOOKAHEAD_PERIOD = timedelta(days=2)
+
+    @classmethod
+    def build(cls, csv_filename, fromdate, todate, timeframe, compression):
+        return BinaryOHLCVData.from_csv_cache(
+            csv_filename,
+            fromdate=fromdate - cls.WARMUP_PERIOD,
+            todate=todate + cls.LOOKAHEAD_PERIOD,
+            timeframe=timeframe,
+            compression=compression
+        )
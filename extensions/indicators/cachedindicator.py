@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8; py-indent-offset:4 -*-
+###############################################################################
+#
+# Copyright (C) 2019 Alex
+#
+###############################################################################
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import backtrader as bt
+from array import array
+import itertools
+import numpy as np
+
+__all__ = ['IndicatorCache', 'CachedIndicator']
+
+
+class IndicatorCache(object):
+    '''Per-process memoization of single-line indicator values.
+
+    Entries are keyed by (data feed id, data length, source line, indicator class, params).
+    During an optimization every parameter combination which uses the same indicator on the
+    same preloaded data feed gets a copy of the values computed by the first one.
+    '''
+
+    _CACHE = {}
+    _FEED_IDS = itertools.count(1)
+
+    @classmethod
+    def get_feed_id(cls, data):
+        # Tag the feed object itself: id() values may be reused by later feeds in the same process
+        feed_id = getattr(data, '_indicator_cache_feed_id', None)
+        if feed_id is None:
+            feed_id = next(cls._FEED_IDS)
+            data._indicator_cache_feed_id = feed_id
+        return feed_id
+
+    @classmethod
+    def get_key(cls, data, line_name, indicator, indparams):
+        return (cls.get_feed_id(data), data.buflen(), line_name, indicator, tuple(sorted(indparams.items())))
+
+    @classmethod
+    def get(cls, key):
+        return cls._CACHE.get(key)
+
+    @classmethod
+    def put(cls, key, values, minperiod):
+        cls._CACHE[key] = (values, minperiod)
+
+    @classmethod
+    def cleanall(cls):
+        cls._CACHE = {}
+
+    @classmethod
+    def cleanfeed(cls, data):
+        '''Drops the entries of one data feed, e.g. once a long-lived worker is done with it.'''
+        feed_id = getattr(data, '_indicator_cache_feed_id', None)
+        if feed_id is not None:
+            cls._CACHE = {key: value for key, value in cls._CACHE.items() if key[0] != feed_id}
+
+    @classmethod
+    def build(cls, indicator, data, line_name=None, **indparams):
+        '''Returns a ``CachedIndicator`` equivalent of ``indicator(data[.line_name], **indparams)``.
+
+        Live feeds keep growing, so for them the regular indicator is returned.
+        '''
+        source = getattr(data, line_name) if line_name else data
+        if data.islive():
+            return indicator(source, **indparams)
+        key = cls.get_key(data, line_name, indicator, indparams)
+        return CachedIndicator(source, indicator=indicator, indparams=indparams, cachekey=key)
+
+
+class CachedIndicator(bt.Indicator):
+    '''Exposes the values of a single-line indicator kept in ``IndicatorCache``.
+
+    On a cache miss the wrapped indicator is calculated as a sub-indicator and its values are
+    stored in the cache once calculated. On a cache hit no indicator is calculated at all and
+    the values (and the minimum period) are copied from the cache.
+    '''
+
+    lines = ('value',)
+
+    params = (
+        ('indicator', None),
+        ('indparams', None),
+        ('cachekey', None),
+    )
+
+    def __init__(self):
+        self._cached = IndicatorCache.get(self.p.cachekey)
+        if self._cached is None:
+            self._inner = self.p.indicator(self.data, **self.p.indparams)
+        else:
+            self._inner = None
+            self.lines.value.setminperiod(self._cached[1])
+
+    def copy_from_cache(self, start, end):
+        chunk = array(str('d'))
+        chunk.frombytes(self._cached[0][start:end].tobytes())
+        self.lines.value.array[start:end] = chunk
+
+    def preonce(self, start, end):
+        self.once(start, end)
+
+    def once(self, start, end):
+        if self._inner is None:
+            self.copy_from_cache(start, end)
+            return
+
+        src = self._inner.lines[0].array
+        self.lines.value.array[start:end] = src[start:end]
+
+        if end == self.buflen():
+            values = np.array(src, dtype=np.float64)
+            IndicatorCache.put(self.p.cachekey, values, self._inner._minperiod)
+
+    def next(self):
+        if self._inner is None:
+            self.lines.value[0] = self._cached[0][len(self) - 1]
+        else:
+            self.lines.value[0] = self._inner.lines[0][0]
@@ -51,6 +51,9 @@ class BacktestModel(object):
         row = BacktestReportRow(run_key, analyzer_data, equity_curve_data, montecarlo_data)
         self._report_rows.append(row)
 
+    def get_report_rows(self):
+        return self._report_rows
+
     def get_monthly_stats_column_names(self):
         return self._monthly_stats_column_names
 
@@ -200,6 +203,10 @@ class BacktestReportRow(object):
         self.montecarlo_data = montecarlo_data
         self.equity_curve_report_data = BacktestEquityCurveReportData(run_key, analyzer_data, equity_curve_data.data)
 
+    def update_equity_curve_data(self, data):
+        self.equity_curve_data.data = data
+        self.equity_curve_report_data.equitycurvedata = data
+
     def get_row_data(self):
         result = [
             self.run_key.strategyid,
@@ -3,6 +3,8 @@ from .common import BacktestAnalyzerData
 from .common import EquityCurveData
 from .common import MonteCarloData
 from wfo.wfo_helper import WFOHelper
+from montecarlo.montecarlo import MonteCarloSimulator
+from extensions.analyzers.equitycurve import EquityCurveAccumulator
 
 
 class BacktestModelGenerator(object):
@@ -123,6 +125,9 @@ class BacktestModelGenerator(object):
                 equity_curve_data.rsquaredvalue = round(ta_analysis.total.equity.stats.r_squared, 3) if self.exists(ta_analysis, ['total', 'equity', 'stats', 'r_squared']) else 0
                 equity_curve_data.pvalue = round(ta_analysis.total.equity.stats.p_value, 3) if self.exists(ta_analysis, ['total', 'equity', 'stats', 'p_value']) else 0
                 equity_curve_data.stderr = round(ta_analysis.total.equity.stats.std_err, 3) if self.exists(ta_analysis, ['total', 'equity', 'stats', 'std_err']) else 0
+                if self.exists(ta_analysis, ['total', 'equity']) and 'netprofits' in ta_analysis.total.equity:
+                    equity_curve_data.netprofits = ta_analysis.total.equity.netprofits
+                    equity_curve_data.datekeys = ta_analysis.total.equity.datekeys
 
                 montecarlo_data = MonteCarloData()
                 montecarlo_data.mc_riskofruin_pct   = self.get_pct_fmt(100 * ta_analysis.total.mcsimulation.risk_of_ruin) if self.exists(ta_analysis, ['total', 'mcsimulation', 'risk_of_ruin']) else "0.0%"
@@ -133,3 +138,26 @@ class BacktestModelGenerator(object):
                     model.add_result_row(run_key, analyzer_data, equity_curve_data, montecarlo_data)
 
         return model
+
+    def postprocess_model_data(self, model):
+        '''Calculates the statistics deferred by the analyzers (``deferstats``): the equity curve data points and the
+        Monte Carlo simulation. Called after the model has been filtered, so only the remaining rows are processed.
+        '''
+        mcsimulator = MonteCarloSimulator()
+        for report_row in model.get_report_rows():
+            equity_curve_data = report_row.equity_curve_data
+            if equity_curve_data.netprofits is None:
+                continue
+
+            netprofits = equity_curve_data.netprofits
+            report_row.update_equity_curve_data(EquityCurveAccumulator.to_equitycurve_data_str(equity_curve_data.datekeys, netprofits))
+            if len(netprofits) > 0:
+                mcsimulation = mcsimulator.calculate(netprofits, report_row.analyzer_data.startcash)
+                montecarlo_data = report_row.montecarlo_data
+                montecarlo_data.mc_riskofruin_pct   = self.get_pct_fmt(100 * mcsimulation.risk_of_ruin)
+                montecarlo_data.mc_mediandd_pct     = self.get_pct_fmt(100 * mcsimulation.median_dd)
+                montecarlo_data.mc_medianreturn_pct = self.get_pct_fmt(100 * mcsimulation.median_return)
+            equity_curve_data.netprofits = None
+            equity_curve_data.datekeys = None
+
+        return model
@@ -88,6 +88,8 @@ class EquityCurveData(object):
         self.rsquaredvalue = None
         self.pvalue = None
         self.stderr = None
+        self.netprofits = None  # Raw trade net profits and their date keys, until the deferred statistics are calculated
+        self.datekeys = None
 
 
 class MonteCarloData(object):
@@ -144,6 +146,9 @@ class WFOTestingDataList(object):
     def add_wfo_testing_data(self, wfo_testing_data):
         self._data_list.append(wfo_testing_data)
 
+    def get_wfo_testing_data_arr(self):
+        return self._data_list
+
     def get_wfo_cycles_list(self):
         data = self._data_list[0]
         return list(data.wfo_cycles_dict.values())
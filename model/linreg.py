@@ -1,6 +1,4 @@
 from scipy import stats
-import numpy as np
-from sklearn import preprocessing
 import math
 
 
@@ -23,31 +21,86 @@ class LinearRegressionStats(object):
         self.std_err = std_err
 
 
+class OnlineLinearRegression(object):
+    '''Linear regression of equity values against their point number (1, 2, 3, ...), updated one
+    point at a time from running sums.
+
+    Equity values are rounded to integers, so the sums are kept as exact Python integers. The
+    results are the same as ``scipy.stats.linregress`` gives for the whole series; the angle is
+    the one of the regression of the L2-normalized series (sklearn's ``preprocessing.normalize``).
+    '''
+
+    def __init__(self):
+        self.n = 0
+        self.sum_x = 0
+        self.sum_y = 0
+        self.sum_xy = 0
+        self.sum_xx = 0
+        self.sum_yy = 0
+        self._last_y = None
+
+    def add(self, y):
+        y = int(round(float(y)))
+        self.n += 1
+        x = self.n
+        self.sum_x += x
+        self.sum_y += y
+        self.sum_xy += x * y
+        self.sum_xx += x * x
+        self.sum_yy += y * y
+        self._last_y = y
+
+    def replace_last(self, y):
+        y = int(round(float(y)))
+        x = self.n
+        old_y = self._last_y
+        self.sum_y += y - old_y
+        self.sum_xy += x * (y - old_y)
+        self.sum_yy += y * y - old_y * old_y
+        self._last_y = y
+
+    def get_stats(self):
+        n = self.n
+        if n <= 1:
+            return LinearRegressionStats(0, 0, 0, 0, 0, 0, 0)
+
+        # n^2 times the (biased) variances/covariance - exact integers
+        sxx = n * self.sum_xx - self.sum_x * self.sum_x
+        syy = n * self.sum_yy - self.sum_y * self.sum_y
+        sxy = n * self.sum_xy - self.sum_x * self.sum_y
+
+        slope = sxy / sxx
+        intercept = (self.sum_y - slope * self.sum_x) / n
+        if syy == 0:
+            r_value = math.nan if sxy == 0 else 0.0
+        else:
+            r_value = max(-1.0, min(1.0, sxy / math.sqrt(sxx * syy)))
+        r_squared = math.copysign(r_value * r_value, r_value)
+
+        if n == 2:
+            p_value = 1.0 if syy == 0 else 0.0
+            std_err = 0.0
+        else:
+            df = n - 2
+            tiny = 1.0e-20
+            t = r_value * math.sqrt(df / ((1.0 - r_value + tiny) * (1.0 + r_value + tiny)))
+            p_value = float(2 * stats.t.sf(abs(t), df))
+            std_err = math.sqrt((1 - r_value * r_value) * syy / sxx / df)
+
+        # Scaling x and y by their L2 norms scales the slope by norm(x) / norm(y)
+        norm_y = math.sqrt(self.sum_yy)
+        slope_norm = slope * math.sqrt(self.sum_xx) / norm_y if norm_y != 0 else 0
+        angle = math.degrees(math.atan(slope_norm))
+        return LinearRegressionStats(angle, slope, intercept, r_value, r_squared, p_value, std_err)
+
+
 class LinearRegressionCalculator(object):
     def __init__(self):
         pass
 
     @staticmethod
     def calculate(equity_curve_data_dict):
-        counter = 1
-        equity_curve_data_points = {}
-        for date, equity in equity_curve_data_dict.items():
-            equity_curve_data_points[counter] = round(equity)
-            counter += 1
-
-        x_arr = list(equity_curve_data_points.keys())
-        y_arr = list(equity_curve_data_points.values())
-        if len(x_arr) > 1:
-            #print("!!! netprofits_data={}".format(netprofits_data))
-            #print("!!! y_arr={}".format(y_arr))
-            slope, intercept, r_value, p_value, std_err = stats.linregress(x_arr, y_arr)
-            r_squared = np.sign(r_value) * r_value * r_value
-
-            x_arr_norm = preprocessing.normalize([x_arr])[0]
-            y_arr_norm = preprocessing.normalize([y_arr])[0]
-            slope_norm, intercept_norm, r_value_norm, p_value_norm, std_err_norm = stats.linregress(x_arr_norm, y_arr_norm)
-            angle = math.degrees(math.atan(slope_norm))
-            #print("angle={}, slope={}, intercept={}, r_value={}, p_value={}, std_err={}".format(angle, slope, intercept, r_value, p_value, std_err))
-            return LinearRegressionStats(angle, slope, intercept, r_value, r_squared, p_value, std_err)
-        else:
-            return LinearRegressionStats(0, 0, 0, 0, 0, 0, 0)
+        regression = OnlineLinearRegression()
+        for equity in equity_curve_data_dict.values():
+            regression.add(equity)
+        return regression.get_stats()
@@ -0,0 +1,257 @@
+from config.strategy_config import AppConfig
+from model.reports_common import ColumnName
+import pandas as pd
+import numpy as np
+import json
+import time
+import csv
+import os
+
+RESULTS_STORE_FORMAT_CSV = "csv"
+RESULTS_STORE_FORMAT_PARQUET = "parquet"
+
+
+class ResultsStore(object):
+    '''A results file of one step (results rows or equity curve rows).
+
+    ``set_header()`` is called once before the first ``append()``; every ``append()`` adds
+    a batch of rows (model report rows, as produced by ``get_model_data_arr()`` and the like).
+    ``read()`` returns a DataFrame indexed by ``index_columns``, optionally restricted to the
+    rows matching ``filters`` ({column name: value}).
+    '''
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._header = None
+
+    def exists(self):
+        return os.path.exists(self.filename)
+
+    def reset(self):
+        pass
+
+    def set_header(self, header_names):
+        self._header = list(header_names)
+
+    def append(self, rows):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def get_size(self):
+        '''Returns a marker of the rows written so far (JSON-serializable), for ``truncate()``.'''
+        return None
+
+    def truncate(self, size):
+        '''Removes the rows appended after ``get_size()`` returned ``size``.'''
+        pass
+
+    def read(self, index_columns, filters=None):
+        return None
+
+
+class CsvResultsStore(ResultsStore):
+
+    def __init__(self, filename):
+        super().__init__(filename)
+        self._is_new_file = None
+        self._ofile = None
+        self._writer = None
+
+    def open(self):
+        if self._ofile is None:
+            self._is_new_file = not self.exists()
+            self._ofile = open(self.filename, "a")
+            self._writer = csv.writer(self._ofile, delimiter=',', quotechar='"', quoting=csv.QUOTE_ALL)
+
+    def reset(self):
+        self.close()
+        if self.exists():
+            os.remove(self.filename)
+
+    def set_header(self, header_names):
+        super().set_header(header_names)
+        self.open()
+        if self._is_new_file is True:
+            self._writer.writerow(self._header)
+            self._is_new_file = False
+
+    def append(self, rows):
+        self.open()
+        for row in rows:
+            self._writer.writerow(row)
+
+    def flush(self):
+        if self._ofile is not None:
+            self._ofile.flush()
+
+    def close(self):
+        if self._ofile is not None:
+            self._ofile.close()
+            self._ofile = None
+            self._writer = None
+
+    def get_size(self):
+        # The file size in bytes, None if there is no file (its header is not written yet)
+        self.flush()
+        return os.path.getsize(self.filename) if self.exists() else None
+
+    def truncate(self, size):
+        self.close()
+        if size is None:
+            if self.exists():
+                os.remove(self.filename)
+        elif self.exists():
+            os.truncate(self.filename, size)
+
+    def read(self, index_columns, filters=None):
+        df = pd.read_csv(self.filename)
+        if filters:
+            for column_name, value in filters.items():
+                df = df[df[column_name] == value]
+        return df.set_index(index_columns)
+
+
+class ParquetResultsStore(ResultsStore):
+    '''Stores results as a Parquet dataset: a ``<name>.parquet`` folder with one part file per
+    ``append()``, named after the time it was written, so that the parts are read back in the order
+    they were appended. Integer/float columns are typed, the equity curve points JSON is split into
+    a list<int64> column of date keys and a list<float64> column of equity values. Reads push
+    the ``filters`` down to the Parquet reader.
+
+    Requires the optional ``pyarrow`` package.
+    '''
+
+    EQUITY_CURVE_KEYS_COLUMN = '{} - Dates'.format(ColumnName.EQUITY_CURVE_DATA_POINTS)
+    EQUITY_CURVE_VALUES_COLUMN = '{} - Values'.format(ColumnName.EQUITY_CURVE_DATA_POINTS)
+
+    INT_COLUMNS = {
+        ColumnName.WFO_CYCLE_ID,
+        ColumnName.WFO_CYCLE_TRAINING_ID,
+        ColumnName.WFO_TRAINING_PERIOD,
+        ColumnName.WFO_TESTING_PERIOD,
+        ColumnName.NUM_WFO_CYCLES,
+        ColumnName.TOTAL_CLOSED_TRADES,
+        ColumnName.TRADES_NUM_SL_COUNT,
+        ColumnName.TRADES_NUM_TSL_COUNT,
+        ColumnName.TSL_MOVED_COUNT,
+        ColumnName.TRADES_NUM_TP_COUNT,
+        ColumnName.TRADES_NUM_TTP_COUNT,
+        ColumnName.TTP_MOVED_COUNT,
+        ColumnName.TRADES_NUM_TB_COUNT,
+        ColumnName.TB_MOVED_COUNT,
+        ColumnName.TRADES_NUM_DCA_TRIGGERED_COUNT,
+        ColumnName.MAX_DRAWDOWN_LENGTH,
+    }
+
+    def __init__(self, filename):
+        super().__init__('{}.parquet'.format(os.path.splitext(filename)[0]))
+        self._last_part_time_ns = 0
+
+    @classmethod
+    def is_number(cls, value):
+        return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_))
+
+    def get_field_type(self, pa, column_name, values):
+        if column_name in self.INT_COLUMNS:
+            return pa.int64()
+        non_null_values = [v for v in values if v is not None]
+        if non_null_values and all(self.is_number(v) for v in non_null_values):
+            return pa.float64()
+        return pa.string()
+
+    def to_arrow_table(self, rows):
+        import pyarrow as pa
+
+        columns = list(zip(*rows)) if rows else [[] for _ in self._header]
+        arrays = []
+        fields = []
+        for column_name, values in zip(self._header, columns):
+            if column_name == ColumnName.EQUITY_CURVE_DATA_POINTS:
+                points = [json.loads(v) if v else {} for v in values]
+                arrays.append(pa.array([[int(k) for k in p.keys()] for p in points], type=pa.list_(pa.int64())))
+                fields.append(pa.field(self.EQUITY_CURVE_KEYS_COLUMN, pa.list_(pa.int64())))
+                arrays.append(pa.array([[float(v) for v in p.values()] for p in points], type=pa.list_(pa.float64())))
+                fields.append(pa.field(self.EQUITY_CURVE_VALUES_COLUMN, pa.list_(pa.float64())))
+                continue
+
+            field_type = self.get_field_type(pa, column_name, values)
+            if field_type == pa.string():
+                values = [str(v) if v is not None else None for v in values]
+            arrays.append(pa.array(values, type=field_type))
+            fields.append(pa.field(column_name, field_type))
+        return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+    def reset(self):
+        if self.exists():
+            for name in os.listdir(self.filename):
+                os.remove(os.path.join(self.filename, name))
+
+    def get_size(self):
+        # The names of the part files
+        return sorted(name for name in os.listdir(self.filename) if name.endswith('.parquet')) if self.exists() else []
+
+    def truncate(self, size):
+        for name in set(self.get_size()) - set(size or []):
+            os.remove(os.path.join(self.filename, name))
+
+    def get_part_filename(self):
+        # The clock may not tick between two appends: the part times of a store only go up
+        self._last_part_time_ns = max(time.time_ns(), self._last_part_time_ns + 1)
+        return os.path.join(self.filename, 'part-{:020d}-{}.parquet'.format(self._last_part_time_ns, os.getpid()))
+
+    def append(self, rows):
+        import pyarrow.parquet as pq
+
+        rows = list(rows)
+        if len(rows) == 0:
+            return
+        os.makedirs(self.filename, exist_ok=True)
+        pq.write_table(self.to_arrow_table(rows), self.get_part_filename())
+
+    @classmethod
+    def format_equity_value(cls, value):
+        return int(value) if float(value).is_integer() else value
+
+    def restore_equity_curve_column(self, df):
+        if self.EQUITY_CURVE_KEYS_COLUMN not in df.columns:
+            return df
+        position = df.columns.get_loc(self.EQUITY_CURVE_KEYS_COLUMN)
+        points = [json.dumps({str(k): self.format_equity_value(v) for k, v in zip(keys, values)})
+                  for keys, values in zip(df[self.EQUITY_CURVE_KEYS_COLUMN], df[self.EQUITY_CURVE_VALUES_COLUMN])]
+        df = df.drop(columns=[self.EQUITY_CURVE_KEYS_COLUMN, self.EQUITY_CURVE_VALUES_COLUMN])
+        df.insert(position, ColumnName.EQUITY_CURVE_DATA_POINTS, points)
+        return df
+
+    def read(self, index_columns, filters=None):
+        import pyarrow.parquet as pq
+
+        pq_filters = [(column_name, "==", value) for column_name, value in filters.items()] if filters else None
+        # Parts are read one by one: a column which was empty in one run may have a different type in another
+        part_filenames = sorted(os.path.join(self.filename, name) for name in os.listdir(self.filename) if name.endswith('.parquet')) if self.exists() else []
+        if len(part_filenames) == 0:
+            return pd.DataFrame(columns=self._header or index_columns).set_index(index_columns)
+        df = pd.concat([pq.read_table(part_filename, filters=pq_filters).to_pandas() for part_filename in part_filenames], ignore_index=True)
+        df = self.restore_equity_curve_column(df)
+        return df.set_index(index_columns)
+
+
+class ResultsStoreFactory(object):
+
+    @classmethod
+    def create(cls, filename, store_format=None):
+        store_format = store_format or AppConfig.get_global_results_store_format()
+        if store_format == RESULTS_STORE_FORMAT_PARQUET:
+            return ParquetResultsStore(filename)
+        return CsvResultsStore(filename)
+
+    @classmethod
+    def open(cls, filename):
+        '''Returns the store of an existing results file (``ResultsStore.filename``), whatever the configured format.'''
+        if os.path.isdir(filename):
+            return ParquetResultsStore(filename)
+        return CsvResultsStore(filename)
@@ -1,6 +1,8 @@
+from config.strategy_config import AppConfig
+import numpy as np
 import pandas as pd
 
-DEFAULT_SIMS_NUMBER = 10
+DEFAULT_SIMS_NUMBER = 1000
 DEFAULT_RUIN_VALUE_PCT = 30
 
 
@@ -14,34 +16,63 @@ class MonteCarloSimulation(object):
 
 
 class MonteCarloSimulator(object):
+    '''Simulates the equity curves of random reorderings of the trades' net profits.
 
-    def __init__(self):
-        None
+    The first simulation is the original order of the trades, every other one is a permutation
+    drawn with a seeded NumPy ``Generator.permuted``. The simulations are calculated as an
+    (n_sims x n_trades) matrix: cumulative sums, final profits and max drawdowns are computed
+    for all the rows at once. When the matrix would exceed ``max_chunk_elements`` it is processed
+    in chunks of rows, only the per-simulation totals and drawdowns are kept.
+    '''
 
-    def calculate(self, series, startcash):
+    def __init__(self, num_sims=None, seed=None, max_chunk_elements=None):
+        self._num_sims = num_sims or AppConfig.get_global_montecarlo_sims_number() or DEFAULT_SIMS_NUMBER
+        self._seed = seed if seed is not None else AppConfig.get_global_montecarlo_random_seed()
+        self._max_chunk_elements = max_chunk_elements or AppConfig.get_global_montecarlo_max_chunk_elements()
+
+    def get_chunk_rows(self, num_trades):
+        return max(1, min(self._num_sims, self._max_chunk_elements // max(1, num_trades)))
 
-        if not isinstance(series, pd.Series):
-            raise ValueError("Data must be a Pandas Series")
+    def simulate(self, netprofits):
+        '''Returns two arrays of length n_sims: the final profit and the lowest point of the equity curve of every simulation.'''
+        rng = np.random.default_rng(self._seed)
+        num_trades = len(netprofits)
+        if num_trades == 0:
+            return np.zeros(self._num_sims), np.zeros(self._num_sims)
+        chunk_rows = self.get_chunk_rows(num_trades)
+        totals = np.empty(self._num_sims, dtype=np.float64)
+        lows = np.empty(self._num_sims, dtype=np.float64)
+        for start in range(0, self._num_sims, chunk_rows):
+            end = min(start + chunk_rows, self._num_sims)
+            sims = np.tile(netprofits, (end - start, 1))
+            if start == 0:
+                sims[1:] = rng.permuted(sims[1:], axis=1)
+            else:
+                sims = rng.permuted(sims, axis=1)
+            np.cumsum(sims, axis=1, out=sims)
+            totals[start:end] = sims[:, -1]
+            lows[start:end] = sims.min(axis=1)
+        return totals, lows
 
-        results = [series.values]
-        for i in range(1, DEFAULT_SIMS_NUMBER):
-            results.append(series.sample(frac=1).values)
+    def calculate(self, series, startcash):
 
-        df = pd.DataFrame(results).T
-        df.rename(columns={0: 'original'}, inplace=True)
+        if isinstance(series, pd.Series):
+            netprofits = series.to_numpy(dtype=np.float64)
+        elif isinstance(series, np.ndarray):
+            netprofits = series.astype(np.float64, copy=False)
+        else:
+            raise ValueError("Data must be a Pandas Series or a NumPy array")
 
-        cumsum = df.cumsum()
-        total = cumsum[-1:].T
-        dd = cumsum.min()[cumsum.min() < 0]
+        totals, lows = self.simulate(netprofits)
+        dd = lows[lows < 0]
         ruin_value = startcash * DEFAULT_RUIN_VALUE_PCT / 100.0
-        total_median = total.median().values[0]
-        dd_median = dd.median()
+        total_median = float(np.median(totals))
+        dd_median = float(np.median(dd)) if len(dd) > 0 else np.nan
 
-        risk_of_ruin = len(dd[dd <= -ruin_value]) / DEFAULT_SIMS_NUMBER
+        risk_of_ruin = int(np.count_nonzero(dd <= -ruin_value)) / self._num_sims
         median_dd = dd_median / startcash
         median_profit = total_median
         median_return = total_median / startcash
         return_to_dd = abs(median_return / median_dd)
 
         return MonteCarloSimulation(risk_of_ruin, median_dd, median_profit, median_return, return_to_dd)
-
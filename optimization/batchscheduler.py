@@ -0,0 +1,207 @@
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from common.marketdatacatalog import MarketDataCatalog
+from datetime import datetime
+from model.resultsstore import ResultsStoreFactory
+from optimization.optimizer import ProcessPoolOptimizer, WorkerCerebroCache, _run_strategy
+import json
+import os
+
+
+class BatchJob(object):
+    '''One optimization run of a step (WFO Step 1 / Backtesting) for a strategy, symbol, timeframe
+    and WFO cycle. Only the step class, its parsed arguments and the cycle travel to the workers:
+    each worker builds (and keeps) the job's cerebro itself the first time it gets a chunk of it.
+    '''
+
+    def __init__(self, step_class, args, startcash, wfo_cycles, wfo_cycle_info):
+        self.step_class = step_class
+        self.args = args
+        self.startcash = startcash
+        self.wfo_cycles = wfo_cycles
+        self.wfo_cycle_info = wfo_cycle_info
+        self.key = '{}/{}/{}/{}/{}/{}'.format(step_class.__name__, args.strategy, args.exchange, args.symbol, args.timeframe, wfo_cycle_info.wfo_cycle_id)
+        # Set by prepare() in the parent process only
+        self.step = None
+        self.strategy_params = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['step'] = None
+        state['strategy_params'] = None
+        return state
+
+    def has_market_data(self):
+        filename = self.step_class().get_input_filename(self.args)
+        return MarketDataCatalog.has_data(filename, self.wfo_cycle_info.training_start_date, self.wfo_cycle_info.training_end_date)
+
+    def prepare(self):
+        self.step = self.step_class()
+        strategy_enum = self.step.get_strategy_enum(self.args)
+        self.step.init_params(strategy_enum, self.args, self.startcash, self.wfo_cycle_info)
+        self.step.init_output_files(self.args)
+        self.step.update_params(self.wfo_cycle_info)
+        self.step.enqueue_strategies(strategy_enum)
+        self.strategy_params = self.step.get_strategy_params_grid()
+
+
+def _run_job_chunk(job, params_chunk):
+    step = job.step_class()
+    cerebro = WorkerCerebroCache.get(job.key, step.build_cerebro, job.args, job.startcash, job.wfo_cycle_info)
+    strategy_class = step.get_strategy_enum(job.args).value.clazz
+    results = []
+    for params in params_chunk:
+        results.extend(_run_strategy(cerebro, strategy_class, params))
+    return results
+
+
+class BatchManifest(object):
+    '''Checkpoint of a batch run: the keys of the jobs whose results are already written, and the job
+    whose results are being written with the size of the results stores before it (``ResultsStore.get_size()``).
+    Saved as JSON before and after the results of every finished job are written, so that an interrupted
+    batch resumes where it stopped and the rows of a job interrupted while written are removed first.
+    '''
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._completed = set()
+        self._writing = None
+        if os.path.exists(filename):
+            with open(filename, "r") as f:
+                state = json.load(f)
+            self._completed = set(state.get("completed", []))
+            self._writing = state.get("writing")
+
+    def is_completed(self, job_key):
+        return job_key in self._completed
+
+    def get_writing(self):
+        return self._writing
+
+    def set_writing(self, job_key, store_sizes):
+        self._writing = {"job": job_key, "stores": store_sizes}
+        self.save()
+
+    def set_completed(self, job_key):
+        self._completed.add(job_key)
+        self._writing = None
+        self.save()
+
+    def clear_writing(self):
+        self._writing = None
+        self.save()
+
+    def save(self):
+        tmp_filename = '{}.{}.tmp'.format(self.filename, os.getpid())
+        with open(tmp_filename, "w") as f:
+            json.dump({"completed": sorted(self._completed), "writing": self._writing}, f, indent=1)
+        os.replace(tmp_filename, self.filename)
+
+
+class BatchScheduler(object):
+    '''Runs the parameter grids of many jobs in one long-lived pool of worker processes.
+
+    The grids are split into chunks the same way ``ProcessPoolOptimizer`` does and the chunks of
+    all the jobs are queued one after another: an idle worker picks up the next chunk whatever job
+    it belongs to, so the tail of a job overlaps with the start of the next ones and no core waits
+    for a job to finish. Workers keep the preloaded cerebro of the last few jobs and the market data
+    binary cache (memory-mapped) for their whole life.
+
+    Results are written by the parent process in job order (``BatchJob.step.save_results()``)
+    and every written job is recorded in the ``BatchManifest``. The rows of a job which was being
+    written when the batch was interrupted are removed before it is run again.
+    '''
+
+    CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+    def __init__(self, maxcpus, manifest):
+        self._maxcpus = max(1, maxcpus or 1)
+        self._manifest = manifest
+        self._chunker = ProcessPoolOptimizer(self._maxcpus)
+        self._num_runs = 0
+        self._num_processed = 0
+        self._tstart = None
+
+    def get_chunks(self, jobs):
+        for job_idx, job in enumerate(jobs):
+            for chunk in self._chunker.get_chunks(len(job.strategy_params)):
+                yield job_idx, chunk
+
+    def print_progress(self, num_jobs_done, num_jobs):
+        elapsed = (datetime.now() - self._tstart).total_seconds()
+        eta = elapsed / self._num_processed * (self._num_runs - self._num_processed) if self._num_processed > 0 else 0
+        print('!! Batch: jobs={}/{}, runs={}/{}, elapsed={}s, ETA={}s'.format(
+            num_jobs_done, num_jobs, self._num_processed, self._num_runs, round(elapsed), round(eta)))
+
+    def rollback_interrupted_job(self):
+        writing = self._manifest.get_writing()
+        if writing is None:
+            return
+        print("Removing the results of {} written partly by an interrupted batch run".format(writing["job"]))
+        for filename, size in writing["stores"].items():
+            ResultsStoreFactory.open(filename).truncate(size)
+        self._manifest.clear_writing()
+
+    def save_job_results(self, job, run_results):
+        self._manifest.set_writing(job.key, {store.filename: store.get_size() for store in job.step.get_results_stores()})
+        job.step.save_results(job.wfo_cycles, job.wfo_cycle_info, run_results, job.args)
+        self._manifest.set_completed(job.key)
+
+    def run(self, jobs):
+        '''Runs the prepared jobs (``BatchJob.prepare()``) which are not completed yet according to the manifest.'''
+        self.rollback_interrupted_job()
+        jobs = [job for job in jobs if not self._manifest.is_completed(job.key)]
+        num_jobs = len(jobs)
+        self._num_runs = sum(len(job.strategy_params) for job in jobs)
+        self._num_processed = 0
+        self._tstart = datetime.now()
+
+        job_results = [[None] * len(job.strategy_params) for job in jobs]
+        job_pending = [len(job.strategy_params) for job in jobs]
+        next_to_save = 0
+
+        def on_chunk_done(job_idx, chunk, results):
+            job_results[job_idx][chunk.start:chunk.stop] = [[result] for result in results]
+            job_pending[job_idx] -= len(chunk)
+            self._num_processed += len(chunk)
+
+        def save_finished_jobs(next_idx):
+            while next_idx < num_jobs and job_pending[next_idx] == 0:
+                job = jobs[next_idx]
+                print("\nWriting results of {}".format(job.key))
+                self.save_job_results(job, job_results[next_idx])
+                job_results[next_idx] = None
+                next_idx += 1
+            return next_idx
+
+        chunks = self.get_chunks(jobs)
+        if self._maxcpus == 1:
+            for job_idx, chunk in chunks:
+                job = jobs[job_idx]
+                on_chunk_done(job_idx, chunk, _run_job_chunk(job, [job.strategy_params[idx] for idx in chunk]))
+                next_to_save = save_finished_jobs(next_to_save)
+                self.print_progress(next_to_save, num_jobs)
+        else:
+            max_in_flight = self._maxcpus * self.CHUNKS_IN_FLIGHT_PER_WORKER
+            with ProcessPoolExecutor(max_workers=self._maxcpus) as executor:
+                in_flight = {}
+                chunks_left = True
+                while chunks_left or in_flight:
+                    while chunks_left and len(in_flight) < max_in_flight:
+                        item = next(chunks, None)
+                        if item is None:
+                            chunks_left = False
+                            break
+                        job_idx, chunk = item
+                        job = jobs[job_idx]
+                        future = executor.submit(_run_job_chunk, job, [job.strategy_params[idx] for idx in chunk])
+                        in_flight[future] = item
+
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job_idx, chunk = in_flight.pop(future)
+                        on_chunk_done(job_idx, chunk, future.result())
+                    next_to_save = save_finished_jobs(next_to_save)
+                    self.print_progress(next_to_save, num_jobs)
+
+        # Jobs with an empty grid have no chunks at all
+        save_finished_jobs(next_to_save)
@@ -0,0 +1,84 @@
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+
+
+class ChainExecutor(object):
+    '''Runs chains of dependent stages in one pool of worker processes.
+
+    A chain provides:
+
+      - ``get_next_stage()`` - the tasks of its next stage, as ``(function, args)`` tuples, or None
+        once the chain is complete. It is called again only after every task of the previous
+        stage has finished;
+      - ``on_stage_done(results)`` - receives the results of the stage's tasks, in task order.
+
+    Stages of the same chain run one after another, while the stages of different chains run
+    concurrently: as soon as a chain's stage is done its next stage is queued behind whatever
+    the other chains have queued, so the workers stay busy. The task functions must be importable
+    by the worker processes.
+    '''
+
+    def __init__(self, maxcpus):
+        self._maxcpus = max(1, maxcpus or 1)
+        self._num_stages_done = 0
+        self._tstart = None
+
+    def print_progress(self, num_chains_done, num_chains):
+        elapsed = (datetime.now() - self._tstart).total_seconds()
+        print('!! Finished stages={}, chains={}/{}, elapsed={}s'.format(self._num_stages_done, num_chains_done, num_chains, round(elapsed)))
+
+    def run_sequentially(self, chains):
+        for chain_idx, chain in enumerate(chains):
+            tasks = chain.get_next_stage()
+            while tasks is not None:
+                chain.on_stage_done([function(*args) for function, args in tasks])
+                self._num_stages_done += 1
+                tasks = chain.get_next_stage()
+            self.print_progress(chain_idx + 1, len(chains))
+
+    def run(self, chains):
+        self._num_stages_done = 0
+        self._tstart = datetime.now()
+        if self._maxcpus == 1:
+            self.run_sequentially(chains)
+            return
+
+        with ProcessPoolExecutor(max_workers=self._maxcpus) as executor:
+            pending = {}
+            stage_results = [None] * len(chains)
+            stage_tasks_left = [0] * len(chains)
+            num_chains_done = 0
+
+            def submit_next_stage(chain_idx):
+                tasks = chains[chain_idx].get_next_stage()
+                while tasks is not None and len(tasks) == 0:
+                    chains[chain_idx].on_stage_done([])
+                    self._num_stages_done += 1
+                    tasks = chains[chain_idx].get_next_stage()
+                if tasks is None:
+                    return False
+                stage_results[chain_idx] = [None] * len(tasks)
+                stage_tasks_left[chain_idx] = len(tasks)
+                for task_idx, (function, args) in enumerate(tasks):
+                    pending[executor.submit(function, *args)] = (chain_idx, task_idx)
+                return True
+
+            for chain_idx in range(len(chains)):
+                if not submit_next_stage(chain_idx):
+                    num_chains_done += 1
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chain_idx, task_idx = pending.pop(future)
+                    stage_results[chain_idx][task_idx] = future.result()
+                    stage_tasks_left[chain_idx] -= 1
+                    if stage_tasks_left[chain_idx] > 0:
+                        continue
+
+                    chains[chain_idx].on_stage_done(stage_results[chain_idx])
+                    stage_results[chain_idx] = None
+                    self._num_stages_done += 1
+                    if not submit_next_stage(chain_idx):
+                        num_chains_done += 1
+                    self.print_progress(num_chains_done, len(chains))
@@ -0,0 +1,235 @@
+from concurrent.futures import ProcessPoolExecutor
+from backtrader.utils import AutoOrderedDict
+from collections import OrderedDict
+from extensions.indicators.cachedindicator import IndicatorCache
+from datetime import datetime
+import math
+
+# Analysis values read by BacktestModelGenerator.populate_model_data(): only these are shipped back from the workers
+COMPACT_ANALYSIS_PATHS = {
+    "ta": [
+        "processing_status",
+        "total.closed",
+        "total.profitfactor",
+        "total.buyandholdreturnpct",
+        "total.equity.equitycurvedata",
+        "total.equity.netprofits",
+        "total.equity.datekeys",
+        "total.equity.stats.angle",
+        "total.equity.stats.slope",
+        "total.equity.stats.intercept",
+        "total.equity.stats.r_value",
+        "total.equity.stats.r_squared",
+        "total.equity.stats.p_value",
+        "total.equity.stats.std_err",
+        "total.mcsimulation.risk_of_ruin",
+        "total.mcsimulation.median_dd",
+        "total.mcsimulation.median_return",
+        "sl.count",
+        "tsl.count",
+        "tsl.moved.count",
+        "tp.count",
+        "ttp.count",
+        "ttp.moved.count",
+        "tb.count",
+        "tb.moved.count",
+        "dca.triggered.count",
+        "pnl.netprofit.total",
+        "won.total",
+        "len.average",
+        "len.tradebarsratio_pct",
+        "monthly_stats",
+    ],
+    "sqn": [
+        "sqn",
+    ],
+    "dd": [
+        "max.drawdown",
+        "max.len",
+    ],
+}
+
+# Worker process state, set up once per worker by _init_worker()
+_worker_cerebro = None
+_worker_strategy_class = None
+_worker_strategy_params = None
+
+
+class CompactAnalyzer(object):
+    def __init__(self, analysis):
+        self._analysis = analysis
+
+    def get_analysis(self):
+        return self._analysis
+
+
+class CompactAnalyzers(object):
+    def __init__(self, analyses):
+        for name, analysis in analyses.items():
+            setattr(self, name, CompactAnalyzer(analysis))
+
+
+class CompactParams(object):
+    def __init__(self, params_dict):
+        self.__dict__.update(params_dict)
+
+
+class OptimizationResult(object):
+    '''Compact, picklable replacement of backtrader's OptReturn: strategy parameters plus
+    the analysis values needed to build the results model.
+    '''
+
+    def __init__(self, params_dict, analyses):
+        self.p = self.params = CompactParams(params_dict)
+        self.analyzers = CompactAnalyzers(analyses)
+
+    @classmethod
+    def get_value(cls, analysis, path):
+        value = analysis
+        for key in path.split("."):
+            if key not in value:
+                return None
+            value = value[key]
+        return value
+
+    @classmethod
+    def compact_analysis(cls, analysis, paths):
+        result = AutoOrderedDict()
+        for path in paths:
+            value = cls.get_value(analysis, path)
+            if value is None:
+                continue
+            target = result
+            keys = path.split(".")
+            for key in keys[:-1]:
+                target = target[key]
+            target[keys[-1]] = value
+        result._close()
+        return result
+
+    @classmethod
+    def from_strategy(cls, strategy):
+        analyses = {}
+        for name, paths in COMPACT_ANALYSIS_PATHS.items():
+            analyzer = getattr(strategy.analyzers, name)
+            analyses[name] = cls.compact_analysis(analyzer.get_analysis(), paths)
+        return cls(vars(strategy.params).copy(), analyses)
+
+
+def _preload_datas(cerebro):
+    # Same preparation Cerebro.run() does before handing work to its own multiprocessing pool:
+    # the datas are preloaded once and every strategy run afterwards reuses them (predata=True)
+    cerebro._event_stop = False
+    cerebro._dorunonce = cerebro.p.runonce
+    cerebro._dopreload = cerebro.p.preload
+    cerebro._exactbars = int(cerebro.p.exactbars)
+    cerebro._dooptimize = True
+    cerebro.runwriters = list()
+    cerebro.writers_csv = False
+    for data in cerebro.datas:
+        data.reset()
+        if cerebro._exactbars < 1:
+            data.extend(size=cerebro.p.lookahead)
+        data._start()
+        if cerebro._dopreload:
+            data.preload()
+
+
+class WorkerCerebroCache(object):
+    '''Preloaded cerebro instances of a long-lived worker process, keyed by the caller. Only the
+    ``MAX_SIZE`` most recently used ones are kept: the cached indicator values of the data feeds of
+    an evicted cerebro are dropped along with it.
+    '''
+
+    MAX_SIZE = 4
+
+    _CACHE = OrderedDict()
+
+    @classmethod
+    def get(cls, key, build_cerebro_fn, *args):
+        cerebro = cls._CACHE.get(key)
+        if cerebro is not None:
+            cls._CACHE.move_to_end(key)
+            return cerebro
+
+        cerebro = build_cerebro_fn(*args)
+        _preload_datas(cerebro)
+        cls._CACHE[key] = cerebro
+        while len(cls._CACHE) > cls.MAX_SIZE:
+            _, old_cerebro = cls._CACHE.popitem(last=False)
+            for data in old_cerebro.datas:
+                IndicatorCache.cleanfeed(data)
+        return cerebro
+
+
+def _run_strategy(cerebro, strategy_class, params):
+    results = [OptimizationResult.from_strategy(strategy) for strategy in cerebro([(strategy_class, (), params)])]
+    cerebro.runningstrats = []
+    return results
+
+
+def _init_worker(cerebro, strategy_class, strategy_params):
+    global _worker_cerebro, _worker_strategy_class, _worker_strategy_params
+    _preload_datas(cerebro)
+    _worker_cerebro = cerebro
+    _worker_strategy_class = strategy_class
+    _worker_strategy_params = strategy_params
+
+
+def _run_chunk(indices):
+    results = []
+    for idx in indices:
+        iterstrat = [(_worker_strategy_class, (), _worker_strategy_params[idx])]
+        for strategy in _worker_cerebro(iterstrat):
+            results.append(OptimizationResult.from_strategy(strategy))
+    return results
+
+
+class ProcessPoolOptimizer(object):
+    '''Runs a grid of strategy parameters against one configured Cerebro instance (datas, analyzers,
+    sizer, broker settings) using a pool of worker processes.
+
+    Each worker preloads the datas once and then receives chunks of indices into the parameter
+    grid. Only ``OptimizationResult`` objects travel back to the parent process. The returned
+    list has the same shape as ``Cerebro.run()`` with ``optreturn=True``: one list per run.
+    '''
+
+    CHUNKS_PER_WORKER = 4
+    MAX_CHUNK_SIZE = 32
+
+    def __init__(self, maxcpus):
+        self._maxcpus = max(1, maxcpus or 1)
+
+    def get_chunk_size(self, num_strategies):
+        chunk_size = math.ceil(num_strategies / float(self._maxcpus * self.CHUNKS_PER_WORKER))
+        return max(1, min(self.MAX_CHUNK_SIZE, chunk_size))
+
+    def get_chunks(self, num_strategies):
+        chunk_size = self.get_chunk_size(num_strategies)
+        return [range(start, min(start + chunk_size, num_strategies)) for start in range(0, num_strategies, chunk_size)]
+
+    def print_progress(self, tstart, num_processed, num_strategies):
+        elapsed = (datetime.now() - tstart).total_seconds()
+        eta = elapsed / num_processed * (num_strategies - num_processed) if num_processed > 0 else 0
+        print('!! Finished Batch Run={}/{}, elapsed={}s, ETA={}s'.format(num_processed, num_strategies, round(elapsed), round(eta)))
+
+    def run(self, cerebro, strategy_class, strategy_params):
+        num_strategies = len(strategy_params)
+        if num_strategies == 0:
+            return []
+
+        chunks = self.get_chunks(num_strategies)
+        num_workers = min(self._maxcpus, len(chunks))
+        tstart = datetime.now()
+        run_results = []
+        if num_workers == 1:
+            _init_worker(cerebro, strategy_class, strategy_params)
+            for chunk in chunks:
+                run_results.extend([result] for result in _run_chunk(chunk))
+                self.print_progress(tstart, chunk.stop, num_strategies)
+        else:
+            with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker, initargs=(cerebro, strategy_class, strategy_params)) as executor:
+                for chunk, results in zip(chunks, executor.map(_run_chunk, chunks)):
+                    run_results.extend([result] for result in results)
+                    self.print_progress(tstart, chunk.stop, num_strategies)
+        return run_results
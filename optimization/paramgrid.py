@@ -0,0 +1,104 @@
+from strategies.helper.validation import ParametersValidator
+import numpy as np
+import collections.abc
+import itertools
+
+string_types = str
+
+
+class ParameterGrid(object):
+    '''Lazy Cartesian product of strategy parameter values which never materializes the
+    parameter dicts.
+
+    Parameters checked by the validator (``ParametersValidator.CONSTRAINED_PARAMS``) are
+    split from the rest: their sub-grid is validated once up-front and only the valid index
+    combinations are kept (in lexicographic order). All the other parameters are free axes.
+    ``len()`` is the number of valid combinations times the size of the free sub-grid, and
+    random access by index walks the parameters in their order, narrowing down the range of
+    valid combinations, so the grid enumerates the parameter dicts in the same order as the
+    Cartesian product of all the values filtered by the validator.
+    '''
+
+    def __init__(self, params, validator=ParametersValidator.validate_params, constrained_keys=ParametersValidator.CONSTRAINED_PARAMS):
+        self._keys = list(params)
+        self._axes = self.iterize(params.values())
+        self._validator = validator
+        self._constrained_pos = [i for i, key in enumerate(self._keys) if key in constrained_keys]
+        self._free_pos = [i for i, key in enumerate(self._keys) if key not in constrained_keys]
+        self._free_count = 1
+        # The size of the free sub-grid of the parameters after each one
+        self._later_free_counts = [1] * len(self._keys)
+        for pos in reversed(range(len(self._keys))):
+            self._later_free_counts[pos] = self._free_count
+            if pos in self._free_pos:
+                self._free_count *= len(self._axes[pos])
+        valid_combos = self.compile_constraints()
+        self._valid_combos = np.array(valid_combos, dtype=np.int64).reshape(len(valid_combos), len(self._constrained_pos))
+
+    @staticmethod
+    def iterize(iterable):
+        niterable = list()
+        for elem in iterable:
+            if isinstance(elem, string_types):
+                elem = (elem,)
+            elif not isinstance(elem, collections.abc.Iterable):
+                elem = (elem,)
+            elif not isinstance(elem, collections.abc.Sequence):
+                elem = tuple(elem)
+
+            niterable.append(elem)
+
+        return niterable
+
+    def is_valid(self, params):
+        try:
+            return bool(self._validator(params))
+        except ValueError:
+            return False
+
+    def compile_constraints(self):
+        constrained_axes = [self._axes[i] for i in self._constrained_pos]
+        constrained_keys = [self._keys[i] for i in self._constrained_pos]
+        valid_combos = []
+        for combo in itertools.product(*[range(len(axis)) for axis in constrained_axes]):
+            params = {key: axis[value_idx] for key, axis, value_idx in zip(constrained_keys, constrained_axes, combo)}
+            if self.is_valid(params):
+                valid_combos.append(combo)
+        return valid_combos
+
+    def get_total_count(self):
+        total = 1
+        for axis in self._axes:
+            total *= len(axis)
+        return total
+
+    def __len__(self):
+        return len(self._valid_combos) * self._free_count
+
+    def __getitem__(self, idx):
+        size = len(self)
+        if idx < 0:
+            idx += size
+        if idx < 0 or idx >= size:
+            raise IndexError("Parameter grid index {} is out of range (size={})".format(idx, size))
+
+        # The valid combinations [lo, hi) have the values of the constrained parameters chosen so far
+        lo, hi = 0, len(self._valid_combos)
+        values = []
+        for pos, axis in enumerate(self._axes):
+            if pos in self._constrained_pos:
+                # The combinations of the range are sorted by the value of this parameter
+                column = self._valid_combos[lo:hi, self._constrained_pos.index(pos)]
+                bounds = np.searchsorted(column, np.arange(len(axis) + 1))
+                block_ends = bounds[1:] * self._later_free_counts[pos]
+                value_idx = int(np.searchsorted(block_ends, idx, side='right'))
+                idx -= int(bounds[value_idx]) * self._later_free_counts[pos]
+                lo, hi = lo + int(bounds[value_idx]), lo + int(bounds[value_idx + 1])
+            else:
+                value_idx, idx = divmod(idx, (hi - lo) * self._later_free_counts[pos])
+            values.append(axis[value_idx])
+        return dict(zip(self._keys, values))
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
@@ -0,0 +1,140 @@
+import backtrader as bt
+import numpy as np
+from datetime import datetime
+from extensions.analyzers.equitycurve import EquityCurveAccumulator
+from optimization.optimizer import _preload_datas
+from strategies.helper.validation import ParametersValidator
+from strategies.managers.fastexitsimulator import FastExitSimulator, StrategySignals, SIZER_MODE_FIXED_CASH, SIZER_MODE_PERCENT
+
+
+class SignalRecorderMixin(object):
+    '''Replaces the ``next()`` of a GenericStrategy: only ``calculate_signals()`` runs (no orders are
+    submitted) and the signal flags, date range flags and ATR(%) values of every bar are recorded
+    into a ``StrategySignals`` object, which is appended to ``signals_sink`` when the run stops.
+    '''
+
+    signals_sink = None
+
+    def start(self):
+        super().start()
+        self._signals = StrategySignals(self.data.buflen())
+
+    def next(self):
+        idx = len(self) - 1
+        signals = self._signals
+        if signals.first_bar < 0:
+            signals.first_bar = idx
+
+        self.calculate_signals()
+        self.set_current_dt_data()
+
+        signals.open_long[idx] = bool(self.is_open_long)
+        signals.close_long[idx] = bool(self.is_close_long)
+        signals.open_short[idx] = bool(self.is_open_short)
+        signals.close_short[idx] = bool(self.is_close_short)
+        signals.within_daterange[idx] = self.is_within_daterange()
+        signals.beyond_daterange[idx] = self.is_beyond_daterange()
+        signals.atr_pct[idx] = self.atr_tf_pct[0]
+
+    def stop(self):
+        signals = self._signals
+        num_bars = len(self)
+        signals.dtnums = np.array(self.data.datetime.array[:num_bars], dtype=np.float64)
+        signals.open = np.array(self.data.open.array[:num_bars], dtype=np.float64)
+        signals.high = np.array(self.data.high.array[:num_bars], dtype=np.float64)
+        signals.low = np.array(self.data.low.array[:num_bars], dtype=np.float64)
+        signals.close = np.array(self.data.close.array[:num_bars], dtype=np.float64)
+        signals.atr_pct = np.nan_to_num(signals.atr_pct[:num_bars])
+        for name in ['open_long', 'close_long', 'open_short', 'close_short', 'within_daterange', 'beyond_daterange']:
+            setattr(signals, name, getattr(signals, name)[:num_bars])
+        self.signals_sink.append(signals)
+
+
+class ScreeningResult(object):
+    def __init__(self, params, net_profit_to_maxdd, rvalue, netprofit, closed):
+        self.params = params
+        self.net_profit_to_maxdd = net_profit_to_maxdd
+        self.rvalue = rvalue
+        self.netprofit = netprofit
+        self.closed = closed
+
+
+class GridScreener(object):
+    '''Ranks a parameter grid without running the full event-driven engine for every combination.
+
+    The exit-mode parameters (``ParametersValidator.CONSTRAINED_PARAMS``) do not affect the signals
+    of a strategy, so the signals are recorded once per combination of the other parameters
+    and ``FastExitSimulator`` replays every exit-mode combination over them. The grid is ranked
+    the same way as ``BacktestModel.filter_wfo_training_top_results()`` (net profit to max
+    drawdown, then the r-value of the equity curve).
+
+    Strategies whose signals depend on their own position state are approximated, so the
+    top combinations are meant to be run again through the full engine.
+    '''
+
+    def __init__(self, cerebro, strategy_class, sizer_mode, lotsize, commission, risk):
+        self._cerebro = cerebro
+        self._strategy_class = strategy_class
+        self._recorder_class = type('{}SignalRecorder'.format(strategy_class.__name__), (SignalRecorderMixin, strategy_class), {'signals_sink': []})
+        self._simulator = FastExitSimulator(sizer_mode, lotsize, commission, risk)
+        self._signals_cache = {}
+
+    @classmethod
+    def get_sizer_mode(cls, lottype):
+        return SIZER_MODE_PERCENT if lottype == "Percentage" else SIZER_MODE_FIXED_CASH
+
+    @classmethod
+    def get_signals_key(cls, params):
+        return tuple((key, value) for key, value in params.items() if key not in ParametersValidator.CONSTRAINED_PARAMS)
+
+    def record_signals(self, params):
+        key = self.get_signals_key(params)
+        signals = self._signals_cache.get(key)
+        if signals is None:
+            sink = self._recorder_class.signals_sink
+            del sink[:]
+            self._cerebro([(self._recorder_class, (), params)])
+            self._cerebro.runningstrats = []
+            signals = sink.pop()
+            self._signals_cache[key] = signals
+        return signals
+
+    def get_metrics(self, signals, simulated_trades, startcash):
+        equitycurve = EquityCurveAccumulator(startcash)
+        max_drawdown = 0.0
+        max_value = startcash
+        value = startcash
+        exit_bars = simulated_trades.get_exit_bars()
+        for exit_bar, netprofit in zip(exit_bars, simulated_trades.get_netprofits()):
+            dtnum = signals.dtnums[exit_bar]
+            equitycurve.add_trade(dtnum, bt.num2date(dtnum), float(netprofit))
+            # Same drawdown as TVNetProfitDrawDown: the broker value at the trade close
+            value += float(netprofit)
+            if value < max_value:
+                max_drawdown = min(max_drawdown, 100.0 * (value - max_value) / max_value)
+            else:
+                max_value = value
+
+        netprofit = value - startcash
+        net_profit_pct = round(100 * netprofit / startcash, 2)
+        max_drawdown_pct = round(max_drawdown, 2)
+        net_profit_to_maxdd = round(net_profit_pct / abs(max_drawdown), 2) if max_drawdown_pct != 0 else 0
+        rvalue = round(equitycurve.get_linreg_stats().r_value, 3) if len(equitycurve) > 0 else 0
+        return net_profit_to_maxdd, rvalue, netprofit
+
+    def screen_params(self, params):
+        signals = self.record_signals(params)
+        simulated_trades = self._simulator.run(signals, params)
+        net_profit_to_maxdd, rvalue, netprofit = self.get_metrics(signals, simulated_trades, params.get("startcash"))
+        return ScreeningResult(params, net_profit_to_maxdd, rvalue, netprofit, len(simulated_trades))
+
+    def screen(self, strategy_params):
+        _preload_datas(self._cerebro)
+        tstart = datetime.now()
+        results = [self.screen_params(params) for params in strategy_params]
+        print('!! Screened {} parameter combinations ({} signal recordings) in {}s'.format(
+            len(results), len(self._signals_cache), round((datetime.now() - tstart).total_seconds())))
+        return sorted(results, key=lambda x: (x.net_profit_to_maxdd, x.rvalue), reverse=True)
+
+    def get_top_params(self, strategy_params, number_top):
+        return [result.params for result in self.screen(strategy_params)[:number_top]]
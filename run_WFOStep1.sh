@@ -67,19 +67,20 @@ run_WFO_training() {
     echo "********** Finished: $current_date_time"
 }
 
-for strategyid in "${arr_strategies[@]}"
-do
-    for symbol in "${arr_symbols[@]}"
-    do
-        for timeframe in "${arr_timeframes[@]}"
-        do
-            #pkill python
-            #run_Backtesting $runid $strategyid $symbol $timeframe
-
-            pkill python
-            run_WFO_training $runid $strategyid $symbol $timeframe
-        done
-    done
-done
+run_WFO_training_batch() {
+    _runid=${1}
+
+    echo "---------------------------------------------------------------------------------------------------"
+    echo "Running WFO Step 1: Training Cycles for ${arr_strategies[*]} / $exchange / ${arr_symbols[*]} / ${arr_timeframes[*]}"
+    current_date_time="`date '+%Y-%m-%d - %H:%M:%S'`"
+
+    echo "********** Started: $current_date_time"
+    python Batch_Runner.py --step wfo_step1 -y "${arr_strategies[@]}" -s "${arr_symbols[@]}" -t "${arr_timeframes[@]}" -r $_runid --startyear $startyear --startmonth $startmonth --startday $startday --num_wfo_cycles $num_wfo_cycles --wfo_training_period $wfo_training_period --wfo_testing_period $wfo_testing_period -e $exchange
+    current_date_time="`date '+%Y-%m-%d - %H:%M:%S'`"
+    echo "********** Finished: $current_date_time"
+}
+
+# All strategy/symbol/timeframe combinations run in one pool of worker processes; an interrupted run resumes from its checkpoint manifest
+run_WFO_training_batch $runid
 
 ./run_backtest_analyzer.sh ${1}
\ No newline at end of file
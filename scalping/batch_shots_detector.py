@@ -0,0 +1,143 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from scalping.shots_detector import ShotsDetector
+import argparse
+import copy
+import os
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Batch Shots Detector')
+
+    parser.add_argument('-u', '--ultrashortmode',
+                        action='store_true',
+                        help=('Ultra-short mode flag'))
+
+    parser.add_argument('-e', '--exchange',
+                        type=str,
+                        required=True,
+                        help='The exchange name')
+
+    parser.add_argument('-f', '--future',
+                        action='store_true',
+                        help=('Is instrument of future type?'))
+
+    parser.add_argument('-b', '--moonbot',
+                        action='store_true',
+                        help=('Is MoonBot working mode? Otherwise it is MT mode.'))
+
+    parser.add_argument('-q', '--quoteasset',
+                        type=str,
+                        default="USDT",
+                        help=('Quote asset of the symbol list written by get_symbols.py'))
+
+    parser.add_argument('--symbols',
+                        type=str,
+                        nargs='+',
+                        help=('The symbols to process instead of the symbol list written by get_symbols.py'))
+
+    parser.add_argument('--exclude',
+                        type=str,
+                        nargs='+',
+                        default=[],
+                        help=('The symbols to skip'))
+
+    parser.add_argument('-x', '--maxcpus',
+                        type=int,
+                        default=os.cpu_count(),
+                        help='The max number of CPUs to use for processing')
+
+    parser.add_argument('--debug',
+                        action='store_true',
+                        help=('Print Debugs'))
+
+    return parser.parse_args()
+
+
+def get_symbol_args(args, symbol):
+    symbol_args = copy.copy(args)
+    symbol_args.symbol = symbol
+    return symbol_args
+
+
+def _detect_symbol_shots(args, symbol):
+    print("\nProcessing {}: ... ".format(symbol))
+    return ShotsDetector().detect_shots(get_symbol_args(args, symbol))
+
+
+class BatchShotsDetector(object):
+    '''Detects the shots of a list of symbols (by default the one written by get_symbols.py) in a pool
+    of worker processes, one symbol per task. Each worker reads the tick data of its symbol from the
+    columnar store (``TickDataStore``).
+
+    The parent process writes the shots of every symbol into the shots file of the exchange in the
+    order of the symbol list, so the file is the same as the one of a run of shots_detector.py for each
+    symbol one after another.
+    '''
+
+    def __init__(self, maxcpus):
+        self._maxcpus = max(1, maxcpus or 1)
+
+    def whereAmI(self):
+        return os.path.dirname(os.path.realpath(__import__("__main__").__file__))
+
+    def get_symbols_filename(self, args):
+        symbol_type_str = "future" if args.future else "spot"
+        return '{}/symbols_{}_{}.txt'.format(self.whereAmI(), symbol_type_str, args.quoteasset.lower())
+
+    def get_symbols(self, args):
+        if args.symbols:
+            symbols = args.symbols
+        else:
+            with open(self.get_symbols_filename(args), "r") as f:
+                symbols = [line.strip() for line in f]
+        return [symbol for symbol in symbols if symbol and symbol not in args.exclude]
+
+    def get_results(self, args, symbols):
+        '''Yields the symbols with their shots (None if there is no trade data or the detection failed), in order.'''
+        if self._maxcpus == 1:
+            for symbol in symbols:
+                yield symbol, self.get_result(lambda: _detect_symbol_shots(args, symbol), symbol)
+        else:
+            with ProcessPoolExecutor(max_workers=min(self._maxcpus, len(symbols))) as executor:
+                futures = [executor.submit(_detect_symbol_shots, args, symbol) for symbol in symbols]
+                for symbol, future in zip(symbols, futures):
+                    yield symbol, self.get_result(future.result, symbol)
+
+    def get_result(self, result_func, symbol):
+        try:
+            return result_func()
+        except (Exception, SystemExit) as e:
+            print("**** Exception during detecting shots for {} symbol: {}".format(symbol, e))
+            return None
+
+    def run(self, args):
+        symbols = self.get_symbols(args)
+        if len(symbols) == 0:
+            print("*** No symbols to process! Exiting.")
+            return
+
+        tstart = datetime.now()
+        detector = ShotsDetector()
+        num_shots = 0
+        skipped_symbols = []
+        for symbol, shots_list in self.get_results(args, symbols):
+            if shots_list is None:
+                skipped_symbols.append(symbol)
+                continue
+            detector.write_to_file(get_symbol_args(args, symbol), shots_list)
+            num_shots += len(shots_list)
+
+        if len(skipped_symbols) > 0:
+            print("\n*** No shots detected (no trade data or errors) for {} symbols: {}".format(len(skipped_symbols), " ".join(skipped_symbols)))
+        print("\nDetected {} shots for {} symbols in {}s".format(num_shots, len(symbols) - len(skipped_symbols), round((datetime.now() - tstart).total_seconds())))
+
+
+def main():
+    args = parse_args()
+    batch = BatchShotsDetector(args.maxcpus)
+    batch.run(args)
+
+
+if __name__ == '__main__':
+    main()
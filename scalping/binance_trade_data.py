@@ -1,13 +1,15 @@
 import ccxt
 from datetime import datetime
 import argparse
-import pandas as pd
+import numpy as np
 import time
 import pytz
 import csv
 import os
 from ccxt.base.errors import NetworkError, ExchangeError
 from functools import wraps
+from scalping.reference_series import ReferenceSeries
+from scalping.tick_data_enrichment import TickDataEnricher, to_local_datetime_strings
 
 USE_DELTA_SIGN = False
 
@@ -18,6 +20,7 @@ SMA_1_LEN = 3
 SMA_2_LEN = 20
 SMA_3_LEN = 40
 
+DELTA_MINUTES = [5, 15, 60]
 DELTAS_ROUNDING_PRECISION = 0.01
 
 DEFAULT_NUM_RETRIES = 20
@@ -55,8 +58,6 @@ def parse_args():
 
 class BinanceTradeDataDownloader(object):
     def __init__(self):
-        self.deltas_cache = {60: 0, 15: 0, 5: 0}
-        self.btc_deltas_cache = {60: 0, 15: 0, 5: 0}
         self.w_exchange = None
         self.s_exchange = None
 
@@ -106,19 +107,20 @@ class BinanceTradeDataDownloader(object):
     def fetch_ohlcv(self, symbol, timeframe, timestamp, api_limit):
         return self.s_exchange.fetch_ohlcv(symbol, timeframe, timestamp, api_limit)
 
-    def get_btc_ohlcv_data(self, start_timestamp, end_timestamp):
+    def get_btc_ohlcv_data_filename(self):
         dirname = self.whereAmI()
         btc_data_basepath = '{}/../marketdata/{}/{}/{}'.format(dirname, EXCHANGE_STR, "BTCUSDT", "1m")
-        btc_data_filename = '{}/OHLCV-{}-{}-{}.csv'.format(btc_data_basepath, EXCHANGE_STR, "BTCUSDT", "1m")
         os.makedirs(btc_data_basepath, exist_ok=True)
+        return '{}/OHLCV-{}-{}-{}.csv'.format(btc_data_basepath, EXCHANGE_STR, "BTCUSDT", "1m")
+
+    def get_btc_ohlcv_data(self, start_timestamp, end_timestamp):
+        btc_data_filename = self.get_btc_ohlcv_data_filename()
 
         try:
-            df = pd.read_csv(btc_data_filename).set_index('Timestamp')
-            first_row_timestamp = df.head(1).index.values[0]
-            last_row_timestamp  = df.tail(1).index.values[0]
-            if start_timestamp >= first_row_timestamp and end_timestamp <= last_row_timestamp:
+            btc_series = ReferenceSeries.load(btc_data_filename)
+            if btc_series is not None and btc_series.covers(start_timestamp, end_timestamp):
                 print("There is an existing OHLC [SPOT] BTC/USDT data in the file. Data will be reused.")
-                return df
+                return btc_series
             else:
                 print("!!! There is no OHLC [SPOT] BTC/USDT data in the file. Data will be downloaded.")
 
@@ -139,113 +141,11 @@ class BinanceTradeDataDownloader(object):
             if len(data) > 0 and len(trades) > 1:
                 del data[-1]
 
-        for t in data:
-            dt = datetime.fromtimestamp(int(t[0] / 1000)).strftime("%Y-%m-%dT%H:%M:%S")
-            t.insert(1, dt)
-
-        header = ['Timestamp', 'Datetime', 'Open', 'High', 'Low', 'Close', 'Volume']
-        df = pd.DataFrame(data, columns=header).set_index('Timestamp')
+        datetimes = to_local_datetime_strings(np.array([t[0] for t in data], dtype=np.int64)).tolist()
         # Save it
-        df.to_csv(btc_data_filename)
+        btc_series = ReferenceSeries.write(btc_data_filename, data, datetimes)
         print("Saved BTCUSDT 1m OHLC candles into {}\n".format(btc_data_filename))
-        return df
-
-    def sma(self, arr, index, len):
-        if index < len:
-            return 0
-        s = 0
-        for ii in range(len):
-            s = s + arr[index - ii]["price"]
-        return s / len
-
-    def calculate_delta_pct(self, arr, index, timestamp_start, timestamp_end):
-        end_price = arr[index]["price"]
-        min_v = end_price
-        max_v = end_price
-        ct = timestamp_end
-        ci = index
-
-        c_price = end_price
-        while ct >= timestamp_start:
-            ci = ci - 1
-            ct = arr[ci]["timestamp"]
-            c_price = arr[ci]["price"]
-            if c_price > max_v:
-                max_v = c_price
-            if c_price < min_v:
-                min_v = c_price
-
-        if USE_DELTA_SIGN:
-            delta_sign = 1 if c_price <= end_price else -1
-        else:
-            delta_sign = 1
-
-        return delta_sign * 100 * (max_v - min_v) / min_v
-
-    def calculate_btc_delta_pct(self, btc_df, btc_timestamp_start, btc_timestamp_end):
-        btc_delta_rows_df = btc_df.loc[(btc_df.index >= btc_timestamp_start) & (btc_df.index < btc_timestamp_end)]
-
-        if len(btc_delta_rows_df) == 0:
-            return 0
-
-        first_row = btc_delta_rows_df.head(1)
-        first_low = first_row["Low"].values[0]
-        first_high = first_row["High"].values[0]
-        min_v = first_low
-        max_v = first_high
-
-        c_low = first_low
-        c_high = first_high
-        for index, row in btc_delta_rows_df.iterrows():
-            c_low = row["Low"]
-            c_high = row["High"]
-            if c_high > max_v:
-                max_v = c_high
-            if c_low < min_v:
-                min_v = c_low
-
-        if USE_DELTA_SIGN:
-            delta_sign = -1 if c_low < first_low and c_high < first_high else 1
-        else:
-            delta_sign = 1
-
-        return delta_sign * 100 * (max_v - min_v) / min_v
-
-    def get_instrument_delta(self, arr, index, delta_minutes):
-        timestamp0 = arr[0]["timestamp"]
-        timestamp_curr = arr[index]["timestamp"]
-        diff_mins = (timestamp_curr - timestamp0) / (60 * 1000)
-        curr_tick_mins = int(timestamp_curr / (60 * 1000))
-        if diff_mins < delta_minutes:
-            return 0
-
-        timestamp_prev = arr[index-1]["timestamp"]
-        prev_tick_mins = int(timestamp_prev / (60 * 1000))
-
-        if curr_tick_mins > prev_tick_mins:
-            delta_period_msec = delta_minutes * 60 * 1000
-            self.deltas_cache[delta_minutes] = self.calculate_delta_pct(arr, index, timestamp_curr - delta_period_msec, timestamp_curr)
-
-        return self.deltas_cache[delta_minutes]
-
-    def get_btc_delta(self, arr, index, btc_df, btc_delta_minutes):
-        timestamp0 = arr[0]["timestamp"]
-        timestamp_curr = arr[index]["timestamp"]
-        diff_mins = (timestamp_curr - timestamp0) / (60 * 1000)
-        curr_tick_mins = int(timestamp_curr / (60 * 1000))
-        if diff_mins < btc_delta_minutes:
-            return 0
-
-        timestamp_prev = arr[index-1]["timestamp"]
-        prev_tick_mins = int(timestamp_prev / (60 * 1000))
-
-        if curr_tick_mins > prev_tick_mins:
-            btc_delta_period_msec = btc_delta_minutes * 60 * 1000
-            btc_timestamp_start = int((timestamp_curr - btc_delta_period_msec) / (60 * 1000)) * 60 * 1000
-            btc_timestamp_end   = int(timestamp_curr / (60 * 1000)) * 60 * 1000
-            self.btc_deltas_cache[btc_delta_minutes] = self.calculate_btc_delta_pct(btc_df, btc_timestamp_start, btc_timestamp_end)
-
-        return self.btc_deltas_cache[btc_delta_minutes]
+        return btc_series
 
     def round_precision(self, val, precision):
         return round(round(val / precision) * precision, 8)
@@ -318,87 +218,72 @@ class BinanceTradeDataDownloader(object):
         end_utc_date = gmt3_tz.localize(end_utc_date, is_dst=True)
         end = int(end_utc_date.timestamp()) * 1000
 
-        timestamp = start
-        last_timestamp = None
-        data = []
-
         print("\n********** Started at {} **********\n".format(datetime.now().strftime("%Y-%m-%dT%H:%M:%S")))
         print("Downloading {}...\n".format(symbol))
 
-        btc_1m_ohlc_df = self.get_btc_ohlcv_data(start, end)
+        btc_1m_series = self.get_btc_ohlcv_data(start, end)
+        enricher = TickDataEnricher(btc_1m_series, [SMA_1_LEN, SMA_2_LEN, SMA_3_LEN], DELTA_MINUTES, USE_DELTA_SIGN)
+
+        header = ['ID', 'Timestamp', 'Trade ID', 'Datetime', 'Side', 'Price', 'Amount', 'isBuyerMaker', 'SMA{}'.format(SMA_1_LEN), 'SMA{}'.format(SMA_2_LEN), 'SMA{}'.format(SMA_3_LEN), 'd5m', 'd15m', 'd1H', 'dBTC5m', 'dBTC15m', 'dBTC1H']
+
+        # Every page of trades is written as soon as it is downloaded
+        filename = self.get_tick_data_filename(output_path, symbol_out)
+        with open(filename, "w") as ofile:
+            writer = csv.writer(ofile, delimiter=',', quotechar='"', quoting=csv.QUOTE_ALL)
+            writer.writerow(header)
+            for trades in self.fetch_trades_pages(instrument, symbol_out, start, end, is_future):
+                writer.writerows(self.get_csv_rows(enricher, trades))
+                ofile.flush()
+
+        print("Downloaded {} records!\n".format(enricher.num_trades))
+        print("Written {} rows into {}".format(enricher.num_trades, filename))
+
+    def round_deltas(self, deltas):
+        # A delta keeps its value for a minute: round each distinct value once
+        values, inverse = np.unique(deltas, return_inverse=True)
+        rounded = [self.round_precision(value, DELTAS_ROUNDING_PRECISION) for value in values.tolist()]
+        return [rounded[i] for i in inverse.tolist()]
+
+    def get_csv_rows(self, enricher, trades):
+        timestamps = [trade["timestamp"] for trade in trades]
+        prices = [trade["price"] for trade in trades]
+        columns = enricher.enrich(np.array(timestamps, dtype=np.int64), np.array(prices, dtype=np.float64))
+        datetimes = to_local_datetime_strings(np.array(timestamps, dtype=np.int64)).tolist()
+
+        fmt_float = self.fmt_float
+        csv_columns = [
+            columns["index"].tolist(),
+            timestamps,
+            [trade["id"] for trade in trades],
+            ["{}.{:03d}".format(dt, timestamp % 1000) for dt, timestamp in zip(datetimes, timestamps)],
+            [trade["side"] for trade in trades],
+            [fmt_float(price) for price in prices],
+            [fmt_float(trade["amount"]) for trade in trades],
+            [1 if trade["info"]["m"] is True else 0 for trade in trades],
+        ]
+        csv_columns.extend([fmt_float(round(value, 8)) for value in sma.tolist()] for sma in columns["sma"])
+        csv_columns.extend(self.round_deltas(deltas) for deltas in columns["deltas"])
+        csv_columns.extend(self.round_deltas(deltas) for deltas in columns["btc_deltas"])
+        return zip(*csv_columns)
+
+    def fetch_trades_pages(self, instrument, symbol_out, start, end, is_future):
+        timestamp = start
+        last_timestamp = None
 
         while timestamp <= end and timestamp != last_timestamp:
             print("Requesting {} {}: {} GMT+02:00".format("Future" if is_future else "Spot", symbol_out, datetime.fromtimestamp(int(timestamp/1000)).strftime("%Y-%m-%dT%H:%M:%S")))
             options = {'startTime': timestamp, 'limit': API_LIMIT}
             if not is_future:
                 options = {'startTime': timestamp, 'endTime': timestamp + 3600000}
-            t1 = int(datetime.now().timestamp() * 1000)
             trades = self.fetch_trades(instrument, None, None, options)
-            t2 = int(datetime.now().timestamp() * 1000)
-            # print("Request time: {} msec\n".format(t2-t1))
             last_timestamp = timestamp
             if len(trades) > 0:
                 timestamp = trades[-1]['timestamp'] + 1
-                data.extend(trades)
+                yield trades
             else:
                 timestamp = timestamp + 5 * 60 * 1000
                 print("Could not retrieve data on previous step. Trying with next timestamp={}".format(timestamp))
 
-        print("Downloaded {} records!\n".format(len(data)))
-
-        header = ['ID', 'Timestamp', 'Trade ID', 'Datetime', 'Side', 'Price', 'Amount', 'isBuyerMaker', 'SMA{}'.format(SMA_1_LEN), 'SMA{}'.format(SMA_2_LEN), 'SMA{}'.format(SMA_3_LEN), 'd5m', 'd15m', 'd1H', 'dBTC5m', 'dBTC15m', 'dBTC1H']
-        csv_rows = []
-
-        for index, data_row in enumerate(data):
-            sma1 = self.sma(data, index, SMA_1_LEN)
-            sma2 = self.sma(data, index, SMA_2_LEN)
-            sma3 = self.sma(data, index, SMA_3_LEN)
-
-            d5m  = self.get_instrument_delta(data, index, 5)
-            d15m = self.get_instrument_delta(data, index, 15)
-            d1h  = self.get_instrument_delta(data, index, 60)
-
-            dBTC5m  = self.get_btc_delta(data, index, btc_1m_ohlc_df, 5)
-            dBTC15m = self.get_btc_delta(data, index, btc_1m_ohlc_df, 15)
-            dBTC1h  = self.get_btc_delta(data, index, btc_1m_ohlc_df, 60)
-
-            csv_rows.append([   index,
-                                data_row["timestamp"],
-                                data_row["id"],
-                                "{}.{:03d}".format(datetime.fromtimestamp(int(data_row["timestamp"] / 1000)).strftime("%Y-%m-%dT%H:%M:%S"), data_row["timestamp"] % 1000),
-                                data_row["side"],
-                                self.fmt_float(data_row["price"]),
-                                self.fmt_float(data_row["amount"]),
-                                1 if data_row["info"]["m"] is True else 0,
-                                self.fmt_float(round(sma1, 8)),
-                                self.fmt_float(round(sma2, 8)),
-                                self.fmt_float(round(sma3, 8)),
-                                self.round_precision(d5m,  DELTAS_ROUNDING_PRECISION),
-                                self.round_precision(d15m, DELTAS_ROUNDING_PRECISION),
-                                self.round_precision(d1h,  DELTAS_ROUNDING_PRECISION),
-                                self.round_precision(dBTC5m,  DELTAS_ROUNDING_PRECISION),
-                                self.round_precision(dBTC15m, DELTAS_ROUNDING_PRECISION),
-                                self.round_precision(dBTC1h,  DELTAS_ROUNDING_PRECISION),
-                             ])
-
-        # Save it
-        filename = self.get_tick_data_filename(output_path, symbol_out)
-        ofile = open(filename, "w")
-        writer = csv.writer(ofile, delimiter=',', quotechar='"', quoting=csv.QUOTE_ALL)
-
-        # Print header
-        print_list = [header]
-        for row in print_list:
-            writer.writerow(row)
-
-        print_list = []
-        print_list.extend(csv_rows)
-        print("Writing {} rows...".format(len(print_list)))
-        for item in print_list:
-            writer.writerow(item)
-        ofile.flush()
-        ofile.close()
-
 
 def main():
     # Get arguments
@@ -2,11 +2,8 @@ import argparse
 import pandas as pd
 import numpy as np
 import os
-import itertools
-import collections
 import csv
-
-string_types = str
+from datetime import datetime
 
 STARTCASH = 100
 
@@ -64,16 +61,52 @@ IQR_MODE_IDEAL_TP_DISTANCE_RATIO = 0.33
 IQR_MODE_FUTURE_MIN_TP_PCT = 0.17
 IQR_MODE_SPOT_MIN_TP_PCT = 0.3
 
+SIMULATION_CHUNK_MAX_TRIALS = 2 ** 22
 
-class ShotTrialAnalyzer(object):
-    def __init__(self):
-        self.shot_trials_count = 0
-        self.shot_missed_count = 0
-        self.shot_triggered_sl_count = 0
-        self.shot_triggered_tp_count = 0
-        self.random_triggered_sl_count = 0
-        self.random_triggered_tp_count = 0
-        self.shot_trials_pnl_arr = []
+SIMULATION_ADAPTIVE_REFINEMENT_FLAG = False
+SIMULATION_COARSE_GRID_STEP_RATIO = 3
+SIMULATION_REFINED_TOP_COUNT = 5
+
+
+class SimulationGrid(object):
+    '''The feasible combinations of the simulation parameters: the product of their values, in the order
+    of itertools.product, without the combinations the constraints rule out. The constraints are applied
+    as a mask over the (sparse) meshgrid of the values, so the combinations are never enumerated one by
+    one and their number is known before the simulation starts.
+
+    A combination is referred to by its position in the grid.
+    '''
+
+    def __init__(self, names, values, mask):
+        self.names = names
+        self.values = values
+        self.shape = tuple(len(v) for v in values)
+        self._flat_indices = np.flatnonzero(mask)
+        self._axis_indices = np.unravel_index(self._flat_indices, self.shape)
+
+    def __len__(self):
+        return len(self._flat_indices)
+
+    def get_param_arrays(self, positions):
+        '''The value of every parameter for each of the combinations at the positions.'''
+        return [values[axis_idx[positions]] for values, axis_idx in zip(self.values, self._axis_indices)]
+
+    def get_coarse_positions(self, step_ratio):
+        '''Positions of the combinations of the grid that takes every ``step_ratio``-th value of each parameter.'''
+        is_coarse = np.ones(len(self), dtype=bool)
+        for axis_idx in self._axis_indices:
+            is_coarse &= axis_idx % step_ratio == 0
+        return np.flatnonzero(is_coarse)
+
+    def get_neighborhood_positions(self, positions, radius):
+        '''Positions of the combinations at most ``radius`` values away from one of the combinations at the positions, for every parameter.'''
+        is_near = np.zeros(len(self), dtype=bool)
+        for position in positions:
+            is_near_position = np.ones(len(self), dtype=bool)
+            for axis_idx in self._axis_indices:
+                is_near_position &= np.abs(axis_idx - axis_idx[position]) <= radius
+            is_near |= is_near_position
+        return np.flatnonzero(is_near)
 
 
 class ShotsPnlCalculator(object):
@@ -241,78 +274,109 @@ class ShotsPnlCalculator(object):
                 "sl": sl_val
             }
 
-    @staticmethod
-    def iterize(iterable):
-        niterable = list()
-        for elem in iterable:
-            if isinstance(elem, string_types):
-                elem = (elem,)
-            elif not isinstance(elem, collections.abc.Iterable):
-                elem = (elem,)
-
-            niterable.append(elem)
-
-        return niterable
-
     def get_sim_combinations(self, is_moonbot, is_future, shot_depth_list, shot_count_list):
         simulation_params = self.get_simulation_params(is_moonbot, is_future, shot_depth_list, shot_count_list)
-        kwargz = simulation_params
-        optkeys = list(simulation_params)
-        vals = self.iterize(kwargz.values())
-        optvals = itertools.product(*vals)
-        okwargs1 = map(zip, itertools.repeat(optkeys), optvals)
-        optkwargs = map(dict, okwargs1)
-        return list(optkwargs)
-
-    def calculate_shot_trials(self, is_moonbot, is_future, trial_analyzer, shot, param_arr):
-        trial_analyzer.shot_trials_pnl_arr = []
-        shot_depth = shot['shot_depth']
-        shot_bounce = shot['shot_bounce']
-        first_param = param_arr[0]
-        second_param = param_arr[1]
-        c_tp = param_arr[2]
-        c_sl = param_arr[3]
-        fees_pct = FUTURE_FEES_PCT if is_future else SPOT_FEES_PCT
+        names = list(simulation_params)
+        values = [np.atleast_1d(np.asarray(v, dtype=np.float64)) for v in simulation_params.values()]
+        mask = self.get_valid_combinations_mask(is_moonbot, *np.meshgrid(*values, indexing='ij', sparse=True))
+        return SimulationGrid(names, values, mask)
 
+    def get_valid_combinations_mask(self, is_moonbot, first_param, second_param, c_tp, c_sl):
         if is_moonbot:
-            trials_range = np.arange(0, (second_param - first_param) + 0.01, TRIAL_STEP_PCT)
+            is_valid = ~(second_param <= first_param) & ~(c_tp > (second_param / MAX_TP_TO_SHOT_RATIO))
         else:
-            trials_range = np.arange(0, second_param + TRIAL_STEP_PCT, TRIAL_STEP_PCT)
+            is_valid = ~(first_param <= second_param / 2) & ~(c_tp > ((first_param + second_param / 2) / MAX_TP_TO_SHOT_RATIO))
+        return is_valid & ~(c_sl / c_tp < MIN_RR_RATIO)
 
-        for trd in trials_range:
-            trial_analyzer.shot_trials_count += 1
-            if is_moonbot:
-                shot_trial_start = second_param - trd
-            else:
-                shot_trial_start = first_param + second_param / 2 - trd
-            shot_trial_end = shot_trial_start - shot_depth
-            if shot_trial_end > 0:  # Shot too short - limit order was not triggered. Skip this trial.
-                trial_analyzer.shot_missed_count += 1
+    def get_trials_counts(self, is_moonbot, first_param, second_param):
+        if is_moonbot:
+            trials_stops = (second_param - first_param) + 0.01
+        else:
+            trials_stops = second_param + TRIAL_STEP_PCT
+        stops, inverse = np.unique(trials_stops, return_inverse=True)
+        counts = np.array([len(np.arange(0, stop, TRIAL_STEP_PCT)) for stop in stops.tolist()], dtype=np.int64)
+        return counts[inverse.reshape(-1)]
+
+    def calculate_shots_pnl(self, is_moonbot, is_future, first_param, second_param, c_tp, c_sl, trials_counts, shot_depths, shot_bounces):
+        '''Average PnL of the trials of every shot for every combination of parameters (combinations x shots),
+        0 for a shot whose trials all missed. The trials of all the combinations, shots and trial offsets
+        are simulated at once as a (combinations x shots x trials) array:
+
+          - missed: the shot is too short, the limit order is not triggered;
+          - SL: the shot or its bounce reach the SL;
+          - TP: the bounce reaches the TP;
+          - otherwise a random price movement, counted as the closer of TP and SL.
+        '''
+        fees_pct = FUTURE_FEES_PCT if is_future else SPOT_FEES_PCT
+        trials = np.arange(np.max(trials_counts)) * TRIAL_STEP_PCT
+        trial_starts = (second_param if is_moonbot else first_param + second_param / 2)[:, None] - trials
+        in_range = np.arange(len(trials)) < trials_counts[:, None]
+
+        c_tp = c_tp[:, None, None]
+        c_sl = c_sl[:, None, None]
+        trial_ends = trial_starts[:, None, :] - shot_depths[:, None]
+        bounce_ends = trial_ends + shot_bounces[:, None]
+        is_sl = (trial_ends < -c_sl) | (bounce_ends < -c_sl)
+        is_tp = ~is_sl & ((bounce_ends >= c_tp) | (np.abs(c_tp - bounce_ends) <= np.abs(-c_sl - bounce_ends)))
+        trials_pnl = np.where(is_tp, c_tp - fees_pct, -(c_sl + fees_pct + SLIPPAGE_PCT))
+
+        # Every next trial of a shot starts lower, so its missed trials (if any) are the first ones
+        first_trial = np.sum(in_range[:, None, :] & (trial_ends > 0), axis=2)
+        trials_done = trials_counts[:, None] - first_trial
+
+        # The trials of a shot are averaged as one array row, like np.mean of the trials PnL list does
+        shots_pnl = np.zeros(trials_done.shape)
+        for length in np.unique(trials_done).tolist():
+            if length == 0:
                 continue
-            shot_bounce_end = shot_trial_end + shot_bounce
-            if shot_trial_end < -c_sl or shot_bounce_end < -c_sl:
-                # Shot has triggered SL
-                trial_pnl_pct = -(c_sl + fees_pct + SLIPPAGE_PCT)
-                trial_analyzer.shot_triggered_sl_count += 1
-            else:
-                if shot_bounce_end >= c_tp:
-                    # Shot has triggered TP
-                    trial_pnl_pct = c_tp - fees_pct
-                    trial_analyzer.shot_triggered_tp_count += 1
-                else:
-                    dist_to_tp_pct = abs(c_tp - shot_bounce_end)
-                    dist_to_sl_pct = abs(-c_sl - shot_bounce_end)
-                    if dist_to_tp_pct <= dist_to_sl_pct:
-                        # Random price movement - count as TP
-                        trial_pnl_pct = c_tp - fees_pct
-                        trial_analyzer.random_triggered_tp_count += 1
-                    else:
-                        # Random price movement - count as SL
-                        trial_pnl_pct = -(c_sl + fees_pct + SLIPPAGE_PCT)
-                        trial_analyzer.random_triggered_sl_count += 1
-
-            trial_analyzer.shot_trials_pnl_arr.append(trial_pnl_pct)
-        return trial_analyzer
+            c_idx, s_idx = np.nonzero(trials_done == length)
+            t_idx = first_trial[c_idx, s_idx][:, None] + np.arange(length)
+            shots_pnl[c_idx, s_idx] = np.mean(trials_pnl[c_idx[:, None], s_idx[:, None], t_idx], axis=1)
+        return shots_pnl
+
+    def simulate_combinations(self, is_moonbot, is_future, grid, positions, shot_depths, shot_bounces):
+        '''Total PnL of the shots for each of the combinations at the positions of the grid.'''
+        first_param, second_param, c_tp, c_sl = grid.get_param_arrays(positions)
+        trials_counts = self.get_trials_counts(is_moonbot, first_param, second_param)
+        total_pnls = np.zeros(len(positions))
+        if len(positions) == 0:
+            return total_pnls
+
+        # Combinations with the same number of trials are simulated together, to keep the padding of the trials axis small
+        sim_order = np.argsort(trials_counts, kind='stable')
+        chunk_size = max(1, SIMULATION_CHUNK_MAX_TRIALS // (len(shot_depths) * np.max(trials_counts)))
+        tstart = datetime.now()
+        for chunk_start in range(0, len(sim_order), chunk_size):
+            chunk = sim_order[chunk_start:chunk_start + chunk_size]
+            shots_pnl = self.calculate_shots_pnl(is_moonbot, is_future, first_param[chunk], second_param[chunk], c_tp[chunk], c_sl[chunk],
+                                                 trials_counts[chunk], shot_depths, shot_bounces)
+            # Summed one shot after another, like sum() of the shots PnL list does
+            total_pnls[chunk] = np.cumsum(shots_pnl, axis=1)[:, -1]
+
+            num_done = chunk_start + len(chunk)
+            elapsed = (datetime.now() - tstart).total_seconds()
+            eta = elapsed / num_done * (len(sim_order) - num_done)
+            print("{}/{}, elapsed={}s, ETA={}s".format(num_done, len(sim_order), round(elapsed), round(eta)))
+        return total_pnls
+
+    def simulate_refined_combinations(self, is_moonbot, is_future, grid, shot_depths, shot_bounces):
+        '''Simulates a coarse grid first, then all the combinations around its ``SIMULATION_REFINED_TOP_COUNT``
+        best ones. Returns the positions of the simulated combinations (sorted) and their total PnL. A local
+        search: the best combination of the full grid may lie away from the best ones of the coarse grid.
+        '''
+        coarse_positions = grid.get_coarse_positions(SIMULATION_COARSE_GRID_STEP_RATIO)
+        print("Simulating {} combinations of the coarse grid...".format(len(coarse_positions)))
+        coarse_pnls = self.simulate_combinations(is_moonbot, is_future, grid, coarse_positions, shot_depths, shot_bounces)
+
+        top_positions = coarse_positions[np.argsort(-coarse_pnls, kind='stable')[:SIMULATION_REFINED_TOP_COUNT]]
+        neighborhood = grid.get_neighborhood_positions(top_positions, SIMULATION_COARSE_GRID_STEP_RATIO - 1)
+        refined_positions = np.setdiff1d(neighborhood, coarse_positions)
+        print("Simulating {} combinations around the {} best ones of the coarse grid...".format(len(refined_positions), len(top_positions)))
+        refined_pnls = self.simulate_combinations(is_moonbot, is_future, grid, refined_positions, shot_depths, shot_bounces)
+
+        positions = np.concatenate([coarse_positions, refined_positions])
+        order = np.argsort(positions)
+        return positions[order], np.concatenate([coarse_pnls, refined_pnls])[order]
 
     def round_base(self, x, base, prec):
         return round(base * round(float(x)/base), prec)
@@ -328,63 +392,35 @@ class ShotsPnlCalculator(object):
         max_real_shot_depth = max(shot_depth_list)
 
         if WORKING_MODE == WORKING_MODE_BEST_PNL_SIMULATION:
-            combinations = self.get_sim_combinations(is_moonbot, is_future, shot_depth_list, shot_count_list)
-            for c_idx, c_dict in enumerate(combinations):
-                if c_idx % 100 == 0:
-                    print("{}/{}".format(c_idx, len(combinations)))
-                c_tp = c_dict["tp"]
-                c_sl = c_dict["sl"]
-                if is_moonbot:
-                    c_mshot_price_min = c_dict["MShotPriceMin"]
-                    c_mshot_price = c_dict["MShotPrice"]
-                    if c_mshot_price <= c_mshot_price_min:
-                        continue
-                    if c_tp > (c_mshot_price / MAX_TP_TO_SHOT_RATIO):
-                        continue
-                    if c_sl / c_tp < MIN_RR_RATIO:
-                        continue
-                    comb_params_arr = [c_mshot_price_min, c_mshot_price, c_tp, c_sl]
+            grid = self.get_sim_combinations(is_moonbot, is_future, shot_depth_list, shot_count_list)
+            print("Number of feasible parameter combinations: {}".format(len(grid)))
+
+            shots = [shot for index, shot_group in groups_df.iterrows() if shot_group["counts"] != 0
+                     for shot in shots_data_dict[shot_group["real_shot_depth"]]]
+            shot_depths = np.array([shot['shot_depth'] for shot in shots], dtype=np.float64)
+            shot_bounces = np.array([shot['shot_bounce'] for shot in shots], dtype=np.float64)
+
+            if len(shots) > 0 and len(grid) > 0:
+                if SIMULATION_ADAPTIVE_REFINEMENT_FLAG:
+                    positions, total_pnls = self.simulate_refined_combinations(is_moonbot, is_future, grid, shot_depths, shot_bounces)
                 else:
-                    c_distance = c_dict["distance"]
-                    c_buffer = c_dict["buffer"]
-                    if c_distance <= c_buffer / 2:
-                        continue
-                    if c_tp > ((c_distance + c_buffer / 2) / MAX_TP_TO_SHOT_RATIO):
-                        continue
-                    if c_sl / c_tp < MIN_RR_RATIO:
-                        continue
-                    comb_params_arr = [c_distance, c_buffer, c_tp, c_sl]
-
-                trial_analyzer = ShotTrialAnalyzer()
-                shot_pnl_arr = []
-
-                for index, shot_group in groups_df.iterrows():
-                    shot_depth = shot_group["real_shot_depth"]
-                    if shot_group["counts"] == 0:
-                        continue
-
-                    group_shots_list = shots_data_dict[shot_depth]
-                    for shot in group_shots_list:
-                        trial_analyzer = self.calculate_shot_trials(is_moonbot, is_future, trial_analyzer, shot, comb_params_arr)
-
-                        if trial_analyzer:
-                            if len(trial_analyzer.shot_trials_pnl_arr) > 0:
-                                shot_trials_pnl_avg = np.mean(trial_analyzer.shot_trials_pnl_arr)
-                                shot_pnl_arr.append(shot_trials_pnl_avg)
-                            else:
-                                shot_pnl_arr.append(0)
-
-                if len(shot_pnl_arr) > 0:
-                    total_pnl = sum(shot_pnl_arr)
+                    positions = np.arange(len(grid))
+                    total_pnls = self.simulate_combinations(is_moonbot, is_future, grid, positions, shot_depths, shot_bounces)
+
+                first_param, second_param, c_tp, c_sl = grid.get_param_arrays(positions)
+                trials_counts = self.get_trials_counts(is_moonbot, first_param, second_param)
+                for idx in range(len(positions)):
+                    comb_params_arr = [first_param[idx], second_param[idx], c_tp[idx], c_sl[idx]]
+                    total_pnl = total_pnls[idx]
                     distance_r = (comb_params_arr[1] + comb_params_arr[1] - comb_params_arr[0]) if is_moonbot else (comb_params_arr[0] + comb_params_arr[1])
                     distance_rating = self.round_base(round(distance_r * RATING_VALUE_DENOMINATOR), DEFAULT_BIN_ROUND_BASE, 0)
                     profit_rating = self.round_base(round(total_pnl * RATING_VALUE_DENOMINATOR), DEFAULT_BIN_ROUND_BASE, 0)
-                    trials_count = trial_analyzer.shot_trials_count
+                    trials_count = int(trials_counts[idx]) * len(shots)
 
                     arr = [round(comb_params_arr[0], 2),
                            round(comb_params_arr[1], 2),
-                           round(c_tp, 2),
-                           round(c_sl, 2),
+                           round(comb_params_arr[2], 2),
+                           round(comb_params_arr[3], 2),
                            max_real_shot_depth,
                            distance_rating,
                            profit_rating,
@@ -0,0 +1,144 @@
+import pandas as pd
+import numpy as np
+import os
+
+MSEC_PER_MINUTE = 60 * 1000
+
+
+class ReferenceSeries(object):
+    '''OHLC candles of a reference instrument (e.g. BTC/USDT 1m), used by the scalping tools for the
+    market context of a symbol (the dBTC* deltas).
+
+    The ``OHLCV-<exchange>-<symbol>-<tf>.csv`` file is converted once into two ``.npy`` files stored
+    next to it:
+
+      - ``<name>.ts.npy``  - int64 UTC epoch milliseconds of each candle (sorted)
+      - ``<name>.hlc.npy`` - float64 array of shape (3, N): high, low, close
+
+    Both are opened memory-mapped and kept for the whole process, so a time range of candles is two
+    binary searches on the timestamps.
+    '''
+
+    CSV_COLUMNS = ["High", "Low", "Close"]
+
+    _CACHE = {}
+
+    def __init__(self, csv_filename, timestamps, hlc):
+        self.csv_filename = csv_filename
+        self.timestamps = timestamps
+        self.highs = hlc[0]
+        self.lows = hlc[1]
+        self.closes = hlc[2]
+
+    @classmethod
+    def get_timestamps_filename(cls, csv_filename):
+        return '{}.ts.npy'.format(os.path.splitext(csv_filename)[0])
+
+    @classmethod
+    def get_hlc_filename(cls, csv_filename):
+        return '{}.hlc.npy'.format(os.path.splitext(csv_filename)[0])
+
+    @classmethod
+    def is_up_to_date(cls, csv_filename):
+        ts_filename = cls.get_timestamps_filename(csv_filename)
+        hlc_filename = cls.get_hlc_filename(csv_filename)
+        if not os.path.exists(ts_filename) or not os.path.exists(hlc_filename):
+            return False
+        csv_mtime = os.path.getmtime(csv_filename)
+        return os.path.getmtime(ts_filename) >= csv_mtime and os.path.getmtime(hlc_filename) >= csv_mtime
+
+    @classmethod
+    def save(cls, csv_filename, timestamps, hlc):
+        ts_filename = cls.get_timestamps_filename(csv_filename)
+        hlc_filename = cls.get_hlc_filename(csv_filename)
+        # Write to temporary files first so that concurrent runs never map a half-written cache
+        ts_tmp_filename = '{}.{}.tmp'.format(ts_filename, os.getpid())
+        hlc_tmp_filename = '{}.{}.tmp'.format(hlc_filename, os.getpid())
+        with open(hlc_tmp_filename, 'wb') as f:
+            np.save(f, np.ascontiguousarray(hlc, dtype=np.float64))
+        with open(ts_tmp_filename, 'wb') as f:
+            np.save(f, np.ascontiguousarray(timestamps, dtype=np.int64))
+        os.replace(hlc_tmp_filename, hlc_filename)
+        os.replace(ts_tmp_filename, ts_filename)
+        cls._CACHE.pop(csv_filename, None)
+
+    @classmethod
+    def convert(cls, csv_filename):
+        df = pd.read_csv(csv_filename)
+        timestamps = df["Timestamp"].values.astype(np.int64)
+        hlc = df[cls.CSV_COLUMNS].values.astype(np.float64).T
+        order = np.argsort(timestamps, kind='mergesort')
+        cls.save(csv_filename, timestamps[order], hlc[:, order])
+
+    @classmethod
+    def load(cls, csv_filename):
+        '''Returns the series of the CSV file, or None if there is no such file.'''
+        if not os.path.exists(csv_filename):
+            return None
+        if not cls.is_up_to_date(csv_filename):
+            print("Converting reference series into binary cache: {}".format(csv_filename))
+            cls.convert(csv_filename)
+
+        cached = cls._CACHE.get(csv_filename)
+        if cached is None:
+            timestamps = np.load(cls.get_timestamps_filename(csv_filename), mmap_mode='r')
+            hlc = np.load(cls.get_hlc_filename(csv_filename), mmap_mode='r')
+            cached = cls(csv_filename, timestamps, hlc)
+            cls._CACHE[csv_filename] = cached
+        return cached
+
+    @classmethod
+    def write(cls, csv_filename, candles, datetimes):
+        '''Writes ccxt OHLCV candles (with the datetime strings of their timestamps) into the CSV file and its binary cache.'''
+        header = ['Timestamp', 'Datetime', 'Open', 'High', 'Low', 'Close', 'Volume']
+        df = pd.DataFrame([[candle[0], dt] + list(candle[1:6]) for candle, dt in zip(candles, datetimes)], columns=header).set_index('Timestamp')
+        df.to_csv(csv_filename)
+        hlc = df[cls.CSV_COLUMNS].values.astype(np.float64).T
+        cls.save(csv_filename, df.index.values.astype(np.int64), hlc)
+        return cls.load(csv_filename)
+
+    def covers(self, start_timestamp, end_timestamp):
+        return len(self.timestamps) > 0 and start_timestamp >= self.timestamps[0] and end_timestamp <= self.timestamps[-1]
+
+    def get_range_indices(self, start_timestamps, end_timestamps):
+        '''Indices [first, end) of the candles with start <= timestamp < end, for scalars or arrays of bounds.'''
+        first = np.searchsorted(self.timestamps, start_timestamps, side='left')
+        end = np.searchsorted(self.timestamps, end_timestamps, side='left')
+        return first, end
+
+    def get_range_delta_pct(self, timestamps_curr, delta_minutes, use_delta_sign=False):
+        '''High-low range (in %) of the candles of the ``delta_minutes`` whole minutes before the minute of
+        each timestamp (0 if there are none).
+        '''
+        timestamps_curr = np.asarray(timestamps_curr, dtype=np.int64)
+        result = np.zeros(len(timestamps_curr))
+        if len(timestamps_curr) == 0 or len(self.timestamps) == 0:
+            return result
+        start = (timestamps_curr - delta_minutes * MSEC_PER_MINUTE) // MSEC_PER_MINUTE * MSEC_PER_MINUTE
+        end = timestamps_curr // MSEC_PER_MINUTE * MSEC_PER_MINUTE
+        first, end = self.get_range_indices(start, end)
+        has_rows = end > first
+        first, last = first[has_rows], end[has_rows] - 1
+
+        max_v = window_reduce(np.maximum, self.highs, first, last + 1)
+        min_v = window_reduce(np.minimum, self.lows, first, last + 1)
+        delta_sign = np.ones(len(first))
+        if use_delta_sign:
+            is_down = (self.lows[last] < self.lows[first]) & (self.highs[last] < self.highs[first])
+            delta_sign[is_down] = -1
+        result[has_rows] = delta_sign * 100 * (max_v - min_v) / min_v
+        return result
+
+
+def window_reduce(ufunc, values, starts, ends):
+    '''``ufunc.reduce(values[start:end])`` of every (start, end) pair, with start < end, in one call.'''
+    if len(starts) == 0:
+        return np.empty(0)
+    # Only the values the windows cover are copied (with one more, as ends may point right after the last value)
+    lo = int(np.min(starts))
+    hi = int(np.max(ends))
+    covered = np.append(values[lo:hi], values[hi - 1])
+    indices = np.empty(2 * len(starts), dtype=np.int64)
+    indices[0::2] = starts
+    indices[1::2] = ends
+    return ufunc.reduceat(covered, indices - lo)[0::2]
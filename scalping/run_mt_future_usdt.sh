@@ -57,11 +57,21 @@ do
             continue
     fi
     # Download tick trade data for all symbols
-    python binance_trade_data.py -s $symbol -t $start_date -e $end_date $future_flag
+    cd ..
+    python -m scalping.binance_trade_data -s $symbol -t $start_date -e $end_date $future_flag
+    cd scalping
+done
 
-    # Detect shots information for all symbols
-    python shots_detector.py ${ultrashortmode} -e binance -s $symbol $future_flag $moonbot_flag
+# Detect shots information for all symbols in parallel
+cd ..
+python -m scalping.batch_shots_detector ${ultrashortmode} -e binance $future_flag $moonbot_flag --exclude ${excluded_symbols_regex}
+cd scalping
 
+for symbol in "${symbol_list[@]}"
+do
+    if printf "${excluded_symbols_regex}" | grep -q ${symbol}; then
+            continue
+    fi
     # Calculate best PnL for all the shots
     python calc_shots_pnl.py ${ultrashortmode} -e binance -s $symbol $future_flag $moonbot_flag
 done
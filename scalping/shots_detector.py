@@ -1,5 +1,7 @@
 import argparse
-import pandas as pd
+import numpy as np
+from scalping.reference_series import window_reduce
+from scalping.tick_data_store import TickDataStore
 import os
 import csv
 from datetime import datetime
@@ -67,10 +69,28 @@ class ShotBounceInfo(object):
         self.bounce_pct = bounce_pct
 
 
+class TradeDataIndex(object):
+    '''Columns of the trade data used by the detector, as NumPy arrays. The trades of a time range are
+    found by binary search on the timestamps (the trades are in time order).
+    '''
+
+    def __init__(self, tick_data):
+        self.timestamps = tick_data["Timestamp"]
+        self.datetimes = tick_data["Datetime"]
+        self.prices = tick_data["Price"]
+        self.bounce_smas = tick_data[FIND_BOUNCE_SMA_FIELD_NAME]
+
+    def get_range_indices(self, start_timestamps, end_timestamps):
+        '''Indices [first, end) of the trades with start <= timestamp <= end, for scalars or arrays of bounds.'''
+        first = np.searchsorted(self.timestamps, start_timestamps, side='left')
+        end = np.searchsorted(self.timestamps, end_timestamps, side='right')
+        return first, end
+
+
 class ShotsDetector(object):
     def __init__(self):
         self._trade_data_input_filename = None
-        self._trade_data_df = None
+        self._trade_data = None
 
     def parse_args(self):
         parser = argparse.ArgumentParser(description='Shots Detector')
@@ -117,12 +137,12 @@ class ShotsDetector(object):
         symbol_type_str = self.get_symbol_type_str(args)
         return '{}/../marketdata/tradedata/{}/{}/{}/{}-{}.csv'.format(dirname, args.exchange, symbol_type_str, args.symbol, args.exchange, args.symbol)
 
-    def read_csv_data(self, filepath):
+    def read_tick_data(self, filepath):
         try:
-            df = pd.read_csv(filepath, index_col=[0])
+            tick_data = TickDataStore.load(filepath)
         except Exception as e:
             return None
-        return df
+        return tick_data
 
     def calculate_depth_pct(self, price1, price2):
         return abs(100 * (price2 - price1) / price1)
@@ -136,14 +156,9 @@ class ShotsDetector(object):
         else:
             return val
 
-    def get_bounce_df_pct(self, lookup_window_df, shot_type, shot_end_price):
-        price_row = lookup_window_df["Price"]
-        bounce_price = price_row.mean()
-        if shot_type == "LONG":
-            bounce_pct = 100 * (bounce_price - shot_end_price) / shot_end_price
-        else:
-            bounce_pct = 100 * (shot_end_price - bounce_price) / shot_end_price
-        return bounce_pct
+    def get_bounce_window_pct(self, trades, first_idx, end_idx, shot_type, shot_end_price):
+        bounce_price = trades.prices[first_idx:end_idx].mean()
+        return self.get_bounce_pct(bounce_price, shot_type, shot_end_price)
 
     def get_bounce_pct(self, bounce_price, shot_type, shot_end_price):
         if shot_type == "LONG":
@@ -152,55 +167,47 @@ class ShotsDetector(object):
             bounce_pct = 100 * (shot_end_price - bounce_price) / shot_end_price
         return bounce_pct
 
-    def find_shot_bounce(self, df, group_timestamp, c_timestamp, c_price, shot_type, shot_end_price):
+    def find_shot_bounce(self, trades, group_timestamp, c_timestamp, c_price, shot_type, shot_end_price):
         if c_timestamp - group_timestamp > SHOT_BOUNCE_LOOKUP_START:
             c_timestamp_dt = self.to_datetime(c_timestamp)
             bounce_pct = self.get_bounce_pct(c_price, shot_type, shot_end_price)
             return ShotBounceInfo(c_timestamp, c_timestamp_dt, bounce_pct)
 
-        lookup_cycle = 0
+        # All the lookup windows [start, start + SHOT_BOUNCE_LOOKUP_WINDOW] of the total window at once
         total_window_start_msec = c_timestamp + SHOT_BOUNCE_LOOKUP_START
         total_window_end_msec = total_window_start_msec + SHOT_BOUNCE_LOOKUP_LIMIT
-        ct = total_window_start_msec
-        lookup_window_end = None
-        lookup_window_end_dt = None
-        lookup_window_df = None
-        last_known_price = c_price
-        while ct <= total_window_end_msec:
-            lookup_window_start = ct
-            lookup_window_start_dt = self.to_datetime(lookup_window_start)
-            lookup_window_end = ct + SHOT_BOUNCE_LOOKUP_WINDOW
-            lookup_window_end_dt = self.to_datetime(lookup_window_end)
-            lookup_window_df = df[(df['Timestamp'] >= lookup_window_start) & (df['Timestamp'] <= lookup_window_end)]
-            #print("Bounce: Lookup cycle={}, Lookup window=({},{}), Lookup dates=({},{}), duration={} msec. len(lookup_window_df)={}".format(
-            #    lookup_cycle, lookup_window_start, lookup_window_end, lookup_window_start_dt, lookup_window_end_dt,
-            #    lookup_window_end - lookup_window_start, len(lookup_window_df)))
-            if len(lookup_window_df) >= SHOT_BOUNCE_LOOKUP_WINDOW_MIN_TRADES:
-                sma_row = lookup_window_df[FIND_BOUNCE_SMA_FIELD_NAME]
-                sma_min = sma_row.min()
-                sma_max = sma_row.max()
-                sma_diff_pct = 9999 if sma_min == 0 else round(100 * (sma_max - sma_min) / sma_min, 3)
-                if sma_diff_pct <= SHOT_BOUNCE_SMA_DIFF_THRESHOLD:
-                    #print("Found interval with trade data. sma_min={}, sma_max={}, sma_diff_pct={}".format(sma_min, sma_max, sma_diff_pct))
-                    bounce_pct = self.get_bounce_df_pct(lookup_window_df, shot_type, shot_end_price)
-                    last_row = lookup_window_df.tail(1)
-                    return ShotBounceInfo(last_row["Timestamp"].values[0], last_row["Datetime"].values[0], bounce_pct)
-            else:
-                if(len(lookup_window_df) >= 1):
-                    last_known_price = lookup_window_df.tail(1)["Price"].values[0]
-
-            lookup_cycle = lookup_cycle + 1
-            ct = lookup_window_end + 1
+        window_starts = np.arange(total_window_start_msec, total_window_end_msec + 1, SHOT_BOUNCE_LOOKUP_WINDOW + 1)
+        window_ends = window_starts + SHOT_BOUNCE_LOOKUP_WINDOW
+        first_idx, end_idx = trades.get_range_indices(window_starts, window_ends)
+        counts = end_idx - first_idx
+
+        is_full = counts >= SHOT_BOUNCE_LOOKUP_WINDOW_MIN_TRADES
+        if np.any(is_full):
+            sma_min = window_reduce(np.minimum, trades.bounce_smas, first_idx[is_full], end_idx[is_full])
+            sma_max = window_reduce(np.maximum, trades.bounce_smas, first_idx[is_full], end_idx[is_full])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                sma_diff_pct = np.where(sma_min == 0, 9999, np.round(100 * (sma_max - sma_min) / sma_min, 3))
+            is_flat = sma_diff_pct <= SHOT_BOUNCE_SMA_DIFF_THRESHOLD
+            if np.any(is_flat):
+                w = np.flatnonzero(is_full)[np.argmax(is_flat)]
+                bounce_pct = self.get_bounce_window_pct(trades, first_idx[w], end_idx[w], shot_type, shot_end_price)
+                last_idx = end_idx[w] - 1
+                return ShotBounceInfo(trades.timestamps[last_idx], trades.datetimes[last_idx], bounce_pct)
 
         # If reached here then take the whole total window length and try to find an average price
-        lookup_window_df = df[(df['Timestamp'] >= total_window_start_msec) & (df['Timestamp'] <= total_window_end_msec)]
-        if len(lookup_window_df) > 0:
-            bounce_pct = self.get_bounce_df_pct(lookup_window_df, shot_type, shot_end_price)
-            last_trade = lookup_window_df.tail(1)
-            return ShotBounceInfo(last_trade["Timestamp"].values[0], last_trade["Datetime"].values[0], bounce_pct)
+        first, end = trades.get_range_indices(total_window_start_msec, total_window_end_msec)
+        if end > first:
+            bounce_pct = self.get_bounce_window_pct(trades, first, end, shot_type, shot_end_price)
+            return ShotBounceInfo(trades.timestamps[end - 1], trades.datetimes[end - 1], bounce_pct)
         else:
+            # The price of the last trade of the last window with too few trades to check the SMA
+            last_known_price = c_price
+            is_sparse = (counts >= 1) & ~is_full
+            if np.any(is_sparse):
+                last_known_price = trades.prices[end_idx[np.flatnonzero(is_sparse)[-1]] - 1]
+            lookup_window_end = window_ends[-1]
             bounce_pct = self.get_bounce_pct(last_known_price, shot_type, shot_end_price)
-            return ShotBounceInfo(lookup_window_end, lookup_window_end_dt, bounce_pct)
+            return ShotBounceInfo(lookup_window_end, self.to_datetime(lookup_window_end), bounce_pct)
 
     def to_datetime(self, timestamp):
         return "{}.{:03d}".format(datetime.fromtimestamp(int(timestamp / 1000)).strftime("%Y-%m-%dT%H:%M:%S"),
@@ -212,28 +219,56 @@ class ShotsDetector(object):
         else:
             return SHOT_DEPTH_SPOT_MIN_THRESHOLD_PCT_US_MODE if args.ultrashortmode else SHOT_DEPTH_MIN_THRESHOLD_PCT
 
-    def find_shots(self, args, df, groups_df):
+    def get_preshot_groups(self, tick_data):
+        '''Groups of trades sharing a timestamp, with more than PRESHOT_TRADES_MIN_NUMBER_THRESHOLD trades:
+        their timestamps, trade counts and the positions of their first and last trades.
+        '''
+        timestamps = tick_data["Timestamp"]
+        group_timestamps, first_idx, counts = np.unique(timestamps, return_index=True, return_counts=True)
+        _, last_idx_reversed = np.unique(timestamps[::-1], return_index=True)
+        last_idx = len(timestamps) - 1 - last_idx_reversed
+        is_preshot = counts > PRESHOT_TRADES_MIN_NUMBER_THRESHOLD
+        return {
+            "Timestamp": group_timestamps[is_preshot],
+            "counts": counts[is_preshot],
+            "first_idx": first_idx[is_preshot],
+            "last_idx": last_idx[is_preshot],
+        }
+
+    def get_sma_cross_indices(self, prices, smas):
+        '''Positions of the trades where the price crosses the SMA compared to the previous trade: upwards
+        (the end of a LONG shot) and downwards (the end of a SHORT shot).
+        '''
+        is_below = prices < smas
+        is_above = prices > smas
+        up_cross_idx = np.flatnonzero(is_below[:-1] & is_above[1:]) + 1
+        down_cross_idx = np.flatnonzero(is_above[:-1] & is_below[1:]) + 1
+        return up_cross_idx, down_cross_idx
+
+    def find_shots(self, args, tick_data, groups):
         symbol_name = args.symbol
         shots_list = []
         last_shot = None
-        idx = 0
-        for index, row in groups_df.iterrows():
+        trades = TradeDataIndex(tick_data)
+        timestamps = trades.timestamps
+        datetimes = trades.datetimes
+        prices = trades.prices
+        deltas = [tick_data[name] for name in ["d5m", "d15m", "d1H", "dBTC5m", "dBTC15m", "dBTC1H"]]
+        up_cross_idx, down_cross_idx = self.get_sma_cross_indices(prices, tick_data[DETECT_PRESHOT_SMA_FIELD_NAME])
+        shot_depth_min_threshold = self.get_shot_depth_min_threshold(args)
+
+        for idx in range(len(groups["Timestamp"])):
             if idx % 1000 == 0:
                 print("Processed {} pre-shots. Number of shots found: {}".format(idx, len(shots_list)))
-            idx = idx + 1
-            group_timestamp = row["Timestamp"]
-            group_datetime = row["Datetime"]
-            group_trade_count = row["counts"]
-            shot_trades_num = group_trade_count
-            trade_group_df = df[df['Timestamp'] == group_timestamp]
-            first_trade = trade_group_df.head(1)
-            last_trade = trade_group_df.tail(1)
-            first_price = first_trade["Price"].values[0]
-            last_price = last_trade["Price"].values[0]
+            group_timestamp = int(groups["Timestamp"][idx])
+            group_trade_count = int(groups["counts"][idx])
+            first_idx = groups["first_idx"][idx]
+            last_idx = groups["last_idx"][idx]
+            group_datetime = datetimes[first_idx]
+            first_price = prices[first_idx]
+            last_price = prices[last_idx]
             shot_type = "LONG" if last_price < first_price else "SHORT"
             preshot_depth_pct = self.calculate_depth_pct(first_price, last_price)
-            max_price_val = last_price
-            ci = last_trade.index.values[0]
 
             if not args.future and shot_type == "SHORT" and not ALLOW_SHORT_SHOTS_FLAG:
                 continue
@@ -241,60 +276,54 @@ class ShotsDetector(object):
             if last_shot and group_timestamp < last_shot.end_timestamp + LAST_FOUND_SHOT_ALLOWANCE_MSEC:
                 continue
 
-            if preshot_depth_pct >= PRESHOT_DEPTH_MIN_THRESHOLD_PCT:
-                try:
-                    while ci < len(df) - 1:
-                        ci = ci + 1
-                        shot_trades_num = shot_trades_num + 1
-                        p_trade = df.iloc[ci - 1]
-                        c_trade = df.iloc[ci]
-                        p_price = p_trade["Price"]
-                        p_sma   = p_trade[DETECT_PRESHOT_SMA_FIELD_NAME]
-                        c_timestamp = c_trade["Timestamp"]
-                        c_datetime  = c_trade["Datetime"]
-                        c_price     = c_trade["Price"]
-                        c_sma       = c_trade[DETECT_PRESHOT_SMA_FIELD_NAME]
-                        if shot_type == "LONG" and c_price < max_price_val or shot_type == "SHORT" and c_price > max_price_val:
-                            max_price_val = c_price
-                        if shot_type == "LONG" and p_price < p_sma and c_price > c_sma or shot_type == "SHORT" and p_price > p_sma and c_price < c_sma:
-                            shot_depth_pct = self.calculate_depth_pct(first_price, max_price_val)
-                            shot_depth_min_threshold = self.get_shot_depth_min_threshold(args)
-                            if shot_depth_pct >= shot_depth_min_threshold:
-                                shot_bounce_info = self.find_shot_bounce(df, group_timestamp, c_timestamp, c_price, shot_type, max_price_val)
-                                real_shot_depth = (shot_depth_pct + abs(shot_bounce_info.bounce_pct)) if shot_bounce_info.bounce_pct < 0 else shot_depth_pct
-                                shot = Shot(symbol_name,
-                                            False,
-                                            group_timestamp,
-                                            c_timestamp,
-                                            group_datetime,
-                                            c_datetime,
-                                            shot_trades_num - 1,
-                                            shot_type,
-                                            self.fmt_float(first_price),
-                                            self.fmt_float(max_price_val),
-                                            c_timestamp - group_timestamp + 1,
-                                            self.round_precision(shot_depth_pct, SHOT_ROUNDING_PRECISION),
-                                            self.round_precision(shot_depth_pct - preshot_depth_pct, SHOT_ROUNDING_PRECISION),
-                                            self.round_precision(shot_bounce_info.bounce_pct, SHOT_ROUNDING_PRECISION),
-                                            int(round(shot_bounce_info.bounce_pct * 100 / shot_depth_pct, 0)),
-                                            shot_bounce_info.datetime,
-                                            self.round_precision(real_shot_depth, SHOT_ROUNDING_PRECISION),
-                                            first_trade["d5m"].values[0],
-                                            first_trade["d15m"].values[0],
-                                            first_trade["d1H"].values[0],
-                                            first_trade["dBTC5m"].values[0],
-                                            first_trade["dBTC15m"].values[0],
-                                            first_trade["dBTC1H"].values[0]
-                                            )
-                                last_shot = shot
-                                shots_list.append(shot)
-                                break
-                            else:
-                                break
-                except Exception as e:
-                    print(e)
-                    print("**** Exception during collecting shots data for {} symbol! Exiting.".format(symbol_name))
-                    exit(-1)
+            if preshot_depth_pct < PRESHOT_DEPTH_MIN_THRESHOLD_PCT:
+                continue
+
+            # The shot ends on the first trade after the group where the price crosses the SMA back
+            cross_idx = up_cross_idx if shot_type == "LONG" else down_cross_idx
+            k = np.searchsorted(cross_idx, last_idx + 1, side='left')
+            if k == len(cross_idx):
+                continue
+            ci = cross_idx[k]
+            shot_prices = prices[last_idx:ci + 1]
+            max_price_val = shot_prices.min() if shot_type == "LONG" else shot_prices.max()
+            shot_trades_num = group_trade_count + (ci - last_idx)
+
+            shot_depth_pct = self.calculate_depth_pct(first_price, max_price_val)
+            if shot_depth_pct < shot_depth_min_threshold:
+                continue
+
+            try:
+                c_timestamp = timestamps[ci]
+                c_datetime = datetimes[ci]
+                c_price = prices[ci]
+                shot_bounce_info = self.find_shot_bounce(trades, group_timestamp, c_timestamp, c_price, shot_type, max_price_val)
+                real_shot_depth = (shot_depth_pct + abs(shot_bounce_info.bounce_pct)) if shot_bounce_info.bounce_pct < 0 else shot_depth_pct
+                shot = Shot(symbol_name,
+                            False,
+                            group_timestamp,
+                            c_timestamp,
+                            group_datetime,
+                            c_datetime,
+                            shot_trades_num - 1,
+                            shot_type,
+                            self.fmt_float(first_price),
+                            self.fmt_float(max_price_val),
+                            c_timestamp - group_timestamp + 1,
+                            self.round_precision(shot_depth_pct, SHOT_ROUNDING_PRECISION),
+                            self.round_precision(shot_depth_pct - preshot_depth_pct, SHOT_ROUNDING_PRECISION),
+                            self.round_precision(shot_bounce_info.bounce_pct, SHOT_ROUNDING_PRECISION),
+                            int(round(shot_bounce_info.bounce_pct * 100 / shot_depth_pct, 0)),
+                            shot_bounce_info.datetime,
+                            self.round_precision(real_shot_depth, SHOT_ROUNDING_PRECISION),
+                            *[values[first_idx] for values in deltas]
+                            )
+                last_shot = shot
+                shots_list.append(shot)
+            except Exception as e:
+                print(e)
+                print("**** Exception during collecting shots data for {} symbol! Exiting.".format(symbol_name))
+                exit(-1)
 
         return shots_list
 
@@ -434,12 +463,10 @@ class ShotsDetector(object):
 
         ofile.close()
 
-    def run(self):
+    def detect_shots(self, args):
+        '''Returns the shots of the symbol of the arguments, or None if there is no trade data for it.'''
         global SHOT_BOUNCE_LOOKUP_START
 
-        args = self.parse_args()
-        print("\nProcessing {}: ... ".format(args.symbol))
-
         if args.moonbot:
             SHOT_BOUNCE_LOOKUP_START = 1000
         else:
@@ -447,19 +474,27 @@ class ShotsDetector(object):
 
         self._trade_data_input_filename = self.get_tradedata_filename(args)
 
-        self._trade_data_df = self.read_csv_data(self._trade_data_input_filename)
-        if self._trade_data_df is None or self._trade_data_df.empty:
-            print("*** No trade data found! Exiting.")
-            exit(-1)
-        groups_df = self._trade_data_df.groupby(["Timestamp", "Datetime"]).size().reset_index(name='counts')
-        groups_df = groups_df[groups_df['counts'] > PRESHOT_TRADES_MIN_NUMBER_THRESHOLD]
-        print("Number of pre-shots: {}\nFiltering pre-shots...".format(len(groups_df)))
+        self._trade_data = self.read_tick_data(self._trade_data_input_filename)
+        if self._trade_data is None or len(self._trade_data) == 0:
+            return None
+        groups = self.get_preshot_groups(self._trade_data)
+        print("Number of pre-shots: {}\nFiltering pre-shots...".format(len(groups["Timestamp"])))
 
-        shots_list = self.find_shots(args, self._trade_data_df, groups_df)
+        shots_list = self.find_shots(args, self._trade_data, groups)
 
         shots_list = self.combine_multiple_shots(shots_list)
 
         print("Total number of shots: {}".format(len(shots_list)))
+        return shots_list
+
+    def run(self):
+        args = self.parse_args()
+        print("\nProcessing {}: ... ".format(args.symbol))
+
+        shots_list = self.detect_shots(args)
+        if shots_list is None:
+            print("*** No trade data found! Exiting.")
+            exit(-1)
 
         self.write_to_file(args, shots_list)
 
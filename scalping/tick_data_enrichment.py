@@ -0,0 +1,127 @@
+from datetime import datetime, timezone
+from scalping.reference_series import window_reduce
+import numpy as np
+
+MSEC_PER_MINUTE = 60 * 1000
+
+
+def rolling_sma(prices, positions, length):
+    '''SMA of the ``length`` prices up to each of the ``positions``. The prices are added one shifted
+    array at a time, newest first, so every value is the same float the trade by trade sum gives.
+    '''
+    result = np.zeros(len(positions))
+    for k in range(length):
+        result = result + prices[np.maximum(positions - k, 0)]
+    return result / length
+
+
+def forward_fill(values, mask, initial):
+    '''The value of the last row of ``mask`` up to every row, ``initial`` before the first one.'''
+    last_idx = np.maximum.accumulate(np.where(mask, np.arange(len(mask)), -1))
+    filled = np.full(len(mask), initial, dtype=np.float64)
+    has_value = last_idx >= 0
+    filled[has_value] = values[last_idx[has_value]]
+    return filled
+
+
+def to_local_datetime_strings(timestamps_msec):
+    '''"%Y-%m-%dT%H:%M:%S" local time of the whole seconds of the timestamps.'''
+    seconds = np.asarray(timestamps_msec, dtype=np.int64) // 1000
+    # The UTC offset of the local time zone only changes on whole minutes
+    minutes, inverse = np.unique(seconds // 60, return_inverse=True)
+    offsets = np.array([get_utc_offset_seconds(minute * 60) for minute in minutes.tolist()], dtype=np.int64)
+    return np.datetime_as_string((seconds + offsets[inverse]).astype('datetime64[s]'), unit='s')
+
+
+def get_utc_offset_seconds(timestamp):
+    return int((datetime.fromtimestamp(timestamp) - datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)).total_seconds())
+
+
+class TickDataEnricher(object):
+    '''Calculates the SMA and delta columns of the trades, page by page, with array operations.
+
+    - SMAs: 0 until more than ``length`` trades are seen;
+    - instrument deltas: high-low range (in %) of the trade prices of the last N minutes, together with
+      the last trade before them;
+    - BTC deltas: high-low range (in %) of the BTC 1m candles of the last N whole minutes.
+
+    The deltas are calculated on the first trade of every minute and kept until the next one; they are
+    0 during the first N minutes of the trades. Only the trades which the windows of the next page can
+    reach are kept between pages.
+    '''
+
+    def __init__(self, btc_series, sma_lengths, delta_minutes, use_delta_sign=False):
+        self.btc_series = btc_series
+        self.sma_lengths = sma_lengths
+        self.delta_minutes = delta_minutes
+        self.use_delta_sign = use_delta_sign
+        self.first_timestamp = None
+        self.num_trades = 0
+        self.deltas_cache = {minutes: 0.0 for minutes in delta_minutes}
+        self.btc_deltas_cache = {minutes: 0.0 for minutes in delta_minutes}
+        self._timestamps = np.empty(0, dtype=np.int64)
+        self._prices = np.empty(0, dtype=np.float64)
+
+    def get_price_delta_pct(self, timestamps, prices, positions, delta_minutes):
+        window_start = timestamps[positions] - delta_minutes * MSEC_PER_MINUTE
+        first = np.maximum(np.searchsorted(timestamps, window_start, side='left') - 1, 0)
+        max_v = window_reduce(np.maximum, prices, first, positions + 1)
+        min_v = window_reduce(np.minimum, prices, first, positions + 1)
+        delta_sign = np.ones(len(positions))
+        if self.use_delta_sign:
+            delta_sign[prices[first] > prices[positions]] = -1
+        return delta_sign * 100 * (max_v - min_v) / min_v
+
+    def get_delta_column(self, deltas_cache, delta_minutes, is_update, values, elapsed_msec):
+        column = forward_fill(values, is_update, deltas_cache[delta_minutes])
+        if np.any(is_update):
+            deltas_cache[delta_minutes] = column[-1]
+        column[elapsed_msec < delta_minutes * MSEC_PER_MINUTE] = 0
+        return column
+
+    def enrich(self, page_timestamps, page_prices):
+        '''Returns the columns of a page of trades: "index", "sma" (one array per SMA length), "deltas" and
+        "btc_deltas" (one array per delta minutes).
+        '''
+        page_timestamps = np.asarray(page_timestamps, dtype=np.int64)
+        page_prices = np.asarray(page_prices, dtype=np.float64)
+        num_history = len(self._timestamps)
+        timestamps = np.concatenate([self._timestamps, page_timestamps])
+        prices = np.concatenate([self._prices, page_prices])
+        positions = np.arange(num_history, len(timestamps))
+        index = self.num_trades + np.arange(len(page_timestamps))
+        if self.first_timestamp is None:
+            self.first_timestamp = int(page_timestamps[0])
+
+        smas = []
+        for length in self.sma_lengths:
+            sma = rolling_sma(prices, positions, length)
+            sma[index < length] = 0
+            smas.append(sma)
+
+        minutes = timestamps // MSEC_PER_MINUTE
+        prev_minutes = minutes[np.maximum(positions - 1, 0)]
+        is_new_minute = minutes[positions] > prev_minutes
+        elapsed_msec = page_timestamps - self.first_timestamp
+
+        deltas = []
+        btc_deltas = []
+        for delta_minutes in self.delta_minutes:
+            is_update = is_new_minute & (elapsed_msec >= delta_minutes * MSEC_PER_MINUTE)
+            update_positions = positions[is_update]
+            values = np.zeros(len(positions))
+            values[is_update] = self.get_price_delta_pct(timestamps, prices, update_positions, delta_minutes)
+            deltas.append(self.get_delta_column(self.deltas_cache, delta_minutes, is_update, values, elapsed_msec))
+
+            values = np.zeros(len(positions))
+            values[is_update] = self.btc_series.get_range_delta_pct(timestamps[update_positions], delta_minutes, self.use_delta_sign)
+            btc_deltas.append(self.get_delta_column(self.btc_deltas_cache, delta_minutes, is_update, values, elapsed_msec))
+
+        # Keep the trades the windows of the next page can start from
+        keep_from = np.searchsorted(timestamps, timestamps[-1] - max(self.delta_minutes) * MSEC_PER_MINUTE, side='left') - 1
+        keep_from = max(0, min(keep_from, len(timestamps) - max(self.sma_lengths)))
+        self._timestamps = timestamps[keep_from:]
+        self._prices = prices[keep_from:]
+        self.num_trades += len(page_timestamps)
+
+        return {"index": index, "sma": smas, "deltas": deltas, "btc_deltas": btc_deltas}
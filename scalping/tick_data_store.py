@@ -0,0 +1,78 @@
+import pandas as pd
+import numpy as np
+import shutil
+import os
+
+
+class TickDataStore(object):
+    '''Columnar store of the tick trade data of a symbol, as written by binance_trade_data.py.
+
+    The ``<exchange>-<symbol>.csv`` file is converted once into a ``<name>.columns`` directory next to
+    it, with one ``.npy`` file per CSV column (numbers as int64/float64, texts as fixed-width strings).
+    The columns are opened memory-mapped, so the processes of a batch only read the pages they touch
+    and the CSV is parsed once per download instead of once per tool.
+    '''
+
+    def __init__(self, csv_filename, columns):
+        self.csv_filename = csv_filename
+        self.columns = columns
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    @classmethod
+    def get_columns_dirname(cls, csv_filename):
+        return '{}.columns'.format(os.path.splitext(csv_filename)[0])
+
+    @classmethod
+    def get_column_filename(cls, dirname, name):
+        return '{}/{}.npy'.format(dirname, name)
+
+    @classmethod
+    def is_up_to_date(cls, csv_filename):
+        dirname = cls.get_columns_dirname(csv_filename)
+        return os.path.isdir(dirname) and os.path.getmtime(dirname) >= os.path.getmtime(csv_filename)
+
+    @classmethod
+    def convert(cls, csv_filename):
+        df = pd.read_csv(csv_filename)
+        dirname = cls.get_columns_dirname(csv_filename)
+        # Write into a temporary directory first so that a concurrent run never maps a half-written store
+        tmp_dirname = '{}.{}.tmp'.format(dirname, os.getpid())
+        os.makedirs(tmp_dirname, exist_ok=True)
+        for name in df.columns:
+            values = df[name].to_numpy()
+            if values.dtype.kind not in 'biuf':
+                values = values.astype(str)
+            np.save(cls.get_column_filename(tmp_dirname, name), values)
+        if os.path.exists(dirname):
+            shutil.rmtree(dirname)
+        os.replace(tmp_dirname, dirname)
+
+    @classmethod
+    def load(cls, csv_filename):
+        '''Returns the store of the CSV file, or None if there is no such file.'''
+        if not os.path.exists(csv_filename):
+            return None
+        if not cls.is_up_to_date(csv_filename):
+            print("Converting tick data into columnar store: {}".format(csv_filename))
+            cls.convert(csv_filename)
+
+        dirname = cls.get_columns_dirname(csv_filename)
+        columns = {}
+        for filename in sorted(os.listdir(dirname)):
+            name, ext = os.path.splitext(filename)
+            if ext == '.npy':
+                columns[name] = cls.load_column(cls.get_column_filename(dirname, name))
+        return cls(csv_filename, columns)
+
+    @classmethod
+    def load_column(cls, filename):
+        try:
+            return np.load(filename, mmap_mode='r')
+        except ValueError:
+            # The columns of a file without trades are empty, and older NumPy versions cannot map an empty array
+            return np.load(filename)
@@ -1,6 +1,7 @@
 import backtrader as bt
 import backtrader.indicators as btind
 from strategies.genericstrategy import GenericStrategy
+from extensions.indicators.cachedindicator import IndicatorCache
 
 
 class S002_AlexNoroSILAStrategy(GenericStrategy):
@@ -46,16 +47,16 @@ class S002_AlexNoroSILAStrategy(GenericStrategy):
         super().__init__()
 
         # WOW 1.0 method
-        self.lasthigh = btind.Highest(self.data.close, period=30)
-        self.lastlow = btind.Lowest(self.data.close, period=30)
+        self.lasthigh = IndicatorCache.build(btind.Highest, self.data, "close", period=30)
+        self.lastlow = IndicatorCache.build(btind.Lowest, self.data, "close", period=30)
         self.center = [0.0]
         self.trend1 = [0, 0]
         self.trend2 = [0, 0]
         self.WOWtrend = [0, 0]
 
         # BestMA 1.0 method
-        self.SMAOpen = bt.talib.SMA(self.data.open, timeperiod=30) #btind.MovingAverageSimple(self.data.open, period=30)
-        self.SMAClose = bt.talib.SMA(self.data.close, timeperiod=30) #btind.MovingAverageSimple(self.data.close, period=30)
+        self.SMAOpen = IndicatorCache.build(bt.talib.SMA, self.data, "open", timeperiod=30) #btind.MovingAverageSimple(self.data.open, period=30)
+        self.SMAClose = IndicatorCache.build(bt.talib.SMA, self.data, "close", timeperiod=30) #btind.MovingAverageSimple(self.data.close, period=30)
         self.BMAtrend = [0, 0]
 
         # BarColor 1.0 method
@@ -63,13 +64,13 @@ class S002_AlexNoroSILAStrategy(GenericStrategy):
         self.BARtrend = [0, 0]
 
         # SuperTrend mehtod
-        self.Atr3 = btind.AverageTrueRange(self.data, period=3)
+        self.Atr3 = IndicatorCache.build(btind.AverageTrueRange, self.data, period=3)
         self.TrendUp = [0, 0, 0]
         self.TrendDn = [0, 0, 0]
         self.SUPtrend = [0, 0]
 
         # DI method
-        self.TrueRange = btind.TrueRange(self.data)
+        self.TrueRange = IndicatorCache.build(btind.TrueRange, self.data)
         self.DirectionalMovementPlus = [0, 0]
         self.DirectionalMovementMinus = [0, 0]
         self.SmoothedTrueRange = [0.0, 0.0]
@@ -82,17 +83,17 @@ class S002_AlexNoroSILAStrategy(GenericStrategy):
         # TTS method(Trend Trader Strategy)
         # Start of HPotter's code
         # Andrew Abraham' idea
-        self.Atr1 = btind.AverageTrueRange(self.data, period=1)
+        self.Atr1 = IndicatorCache.build(btind.AverageTrueRange, self.data, period=1)
         self.avgTR = btind.WeightedMovingAverage(self.Atr1, period=21)
-        self.highestC = btind.Highest(self.data.high, period=21)
-        self.lowestC = btind.Lowest(self.data.low, period=21)
+        self.highestC = IndicatorCache.build(btind.Highest, self.data, "high", period=21)
+        self.lowestC = IndicatorCache.build(btind.Lowest, self.data, "low", period=21)
         self.ret = [0, 0]
         self.pos = [0, 0]
         # End of HPotter 's code
         self.TTStrend = [0, 0]
 
         # RSI method
-        self.RSI13 = btind.RSI(self.data.close, period=13, safediv=True)
+        self.RSI13 = IndicatorCache.build(btind.RSI, self.data, "close", period=13, safediv=True)
         self.RSItrend = [0, 0]
 
         # WTO("WaveTrend Oscilator") method by LazyBear
@@ -11,6 +11,8 @@ from strategies.managers.sltpmanager import SLTPManager
 from strategies.managers.trailingbuymanager import TrailingBuyManager
 from strategies.managers.dcamodemanager import DcaModeManager
 from strategies.helper.ococontext import OcoContext
+from strategies.helper.strategylogger import StrategyLogger
+from extensions.indicators.cachedindicator import IndicatorCache
 from bot.config.bot_strategy_config import BotStrategyConfig
 from strategies.processors.livetradingstrategyprocessor import LiveTradingStrategyProcessor
 from strategies.processors.backtestingstrategyprocessor import BacktestingStrategyProcessor
@@ -39,7 +41,9 @@ class GenericStrategy(bt.Strategy):
         self.gmt3_tz = None
         self.fromdt = None
         self.todt = None
-        self.currdt = None
+        self.fromdt_num = None
+        self.todt_num = None
+        self.currdt_num = None
 
         self.curtradeid = -1
         self.curr_position = 0
@@ -58,6 +62,7 @@ class GenericStrategy(bt.Strategy):
         self.tradeid = itertools.cycle(range(1, 10000000))
 
         self.strategyprocessor = StrategyProcessorFactory.build_strategy_processor(self, self.p.debug)
+        self.logger = StrategyLogger(self, self.strategyprocessor, self.p.debug)
         self.oco_context = OcoContext()
         self.sltpmanager = SLTPManager(self, self.oco_context)
         self.trailingbuymanager = TrailingBuyManager(self)
@@ -69,8 +74,8 @@ class GenericStrategy(bt.Strategy):
         self.skip_bar_flow_control_flag = False
         self.capital_stoploss_fired_flow_control_flag = False
 
-        self.atr_tf = btind.AverageTrueRange(self.data, period=ATR_LENGTH, movav=btind.MovAv.SMA)
-        self.sma_tf = btind.SimpleMovingAverage(self.data.close, period=ATR_LENGTH)
+        self.atr_tf = IndicatorCache.build(btind.AverageTrueRange, self.data, period=ATR_LENGTH, movav=btind.MovAv.SMA)
+        self.sma_tf = IndicatorCache.build(btind.SimpleMovingAverage, self.data, "close", period=ATR_LENGTH)
         self.atr_tf_pct = (self.atr_tf / self.sma_tf) * 100
 
     def islivedata(self):
@@ -79,8 +84,11 @@ class GenericStrategy(bt.Strategy):
     def is_atr_mode(self):
         return self.p.exitmode and self.p.exitmode != TradeExitMode.EXIT_MODE_DEFAULT
 
-    def log(self, txt, send_telegram_flag=False):
-        self.strategyprocessor.log(txt, send_telegram_flag)
+    def is_log_enabled(self):
+        return self.logger.is_enabled()
+
+    def log(self, txt, *args, send_telegram_flag=False):
+        self.logger.log(txt, args, send_telegram_flag)
 
     def check_arr_equal(self, arr, val, last_num):
         cmp_arr = arr[len(arr) - last_num:len(arr)]
@@ -150,6 +158,7 @@ class GenericStrategy(bt.Strategy):
         else:
             start_cash = BotStrategyConfig.get_instance().start_cash
         self.strategyprocessor.set_startcash(start_cash)
+        self.set_daterange_bounds()
 
     @abstractmethod
     def calculate_signals(self):
@@ -178,7 +187,7 @@ class GenericStrategy(bt.Strategy):
     def generic_signal_open_position(self, is_long):
         cash = self.broker.getcash()
         side_str = self.get_side_str(is_long)
-        self.log('!!! BEFORE - SIGNAL OPEN POSITION {} !!!, self.curr_position={}, cash={}'.format(side_str, self.curr_position, cash))
+        self.log('!!! BEFORE - SIGNAL OPEN POSITION {} !!!, self.curr_position={}, cash={}', side_str, self.curr_position, cash)
         self.curtradeid = next(self.tradeid)
         if is_long:
             base_order = self.strategyprocessor.open_long_position()
@@ -189,17 +198,17 @@ class GenericStrategy(bt.Strategy):
 
         self.position_avg_price = self.data.close[0]
         self.activate_trade_managers(self.curtradeid, self.position_avg_price, base_order.size, is_long)
-        self.log('!!! AFTER - SIGNAL OPEN POSITION {} !!!, self.curr_position={}, cash={}'.format(side_str, self.curr_position, cash))
+        self.log('!!! AFTER - SIGNAL OPEN POSITION {} !!!, self.curr_position={}, cash={}', side_str, self.curr_position, cash)
 
     def tb_signal_open_position(self, is_long):
         cash = self.broker.getcash()
         side_str = self.get_side_str(is_long)
         last_price = self.data.close[0]
 
-        self.log('!!! BEFORE - TRAILING-BUY MODE - START {} !!!'.format(side_str, self.curr_position, cash))
+        self.log('!!! BEFORE - TRAILING-BUY MODE - START {} !!!', side_str, self.curr_position, cash)
         self.curtradeid = next(self.tradeid)
         self.activate_trade_entry_managers(self.curtradeid, last_price, is_long)
-        self.log('!!! AFTER - TRAILING-BUY MODE - START {} !!!'.format(side_str, self.curr_position, cash))
+        self.log('!!! AFTER - TRAILING-BUY MODE - START {} !!!', side_str, self.curr_position, cash)
 
     def submit_base_order(self, is_long):
         order_size = self.dcamodemanager.get_desired_order_size(is_long)
@@ -210,8 +219,9 @@ class GenericStrategy(bt.Strategy):
             base_order = self.strategyprocessor.open_short_position(order_size)
             self.curr_position = -1
 
-        self.log('Submitted a new BASE order for DCA-MODE: is_long={}, base_order.ref={}, base_order.size={}, base_order.price={}, base_order.side={}'.format(
-            is_long, base_order.ref, base_order.size, base_order.price, base_order.ordtypename()))
+        if self.is_log_enabled():
+            self.log('Submitted a new BASE order for DCA-MODE: is_long={}, base_order.ref={}, base_order.size={}, base_order.price={}, base_order.side={}',
+                is_long, base_order.ref, base_order.size, base_order.price, base_order.ordtypename())
         return base_order
 
     def dcamode_signal_open_position(self, is_long):
@@ -219,30 +229,30 @@ class GenericStrategy(bt.Strategy):
         side_str = self.get_side_str(is_long)
         last_price = self.data.close[0]
 
-        self.log('!!! BEFORE - DCA MODE - START {} !!!'.format(side_str, self.curr_position, cash))
+        self.log('!!! BEFORE - DCA MODE - START {} !!!', side_str, self.curr_position, cash)
         self.curtradeid = next(self.tradeid)
 
-        self.log('DCA MODE: Submitting BASE order for tradeid={}, last_price={}, is_long={}'.format(self.curtradeid, last_price, is_long))
+        self.log('DCA MODE: Submitting BASE order for tradeid={}, last_price={}, is_long={}', self.curtradeid, last_price, is_long)
         base_order = self.submit_base_order(is_long)
 
         self.position_avg_price = last_price
         self.activate_trade_managers(self.curtradeid, self.position_avg_price, base_order.size, is_long)
         self.activate_trade_entry_managers(self.curtradeid, last_price, is_long)
 
-        self.log('!!! AFTER - DCA MODE - START {} !!!'.format(side_str, self.curr_position, cash))
+        self.log('!!! AFTER - DCA MODE - START {} !!!', side_str, self.curr_position, cash)
 
     def signal_close_position(self, is_long):
         cash = self.broker.getcash()
         side_str = self.get_side_str(is_long)
 
-        self.log('!!! BEFORE - SIGNAL CLOSE POSITION {} !!!, self.curr_position={}, cash={}'.format(side_str, self.curr_position, cash))
+        self.log('!!! BEFORE - SIGNAL CLOSE POSITION {} !!!, self.curr_position={}, cash={}', side_str, self.curr_position, cash)
         self.strategyprocessor.close_position()
         self.curr_position = 0
         self.position_avg_price = 0
         self.strategyprocessor.notify_analyzers()
         self.deactivate_entry_trade_managers()
         self.deactivate_trade_managers()
-        self.log('!!! AFTER - SIGNAL CLOSE POSITION {} !!!, self.curr_position={}, cash={}'.format(side_str, self.curr_position, cash))
+        self.log('!!! AFTER - SIGNAL CLOSE POSITION {} !!!, self.curr_position={}, cash={}', side_str, self.curr_position, cash)
 
     def exists(self, obj, chain):
         _key = chain.pop(0)
@@ -266,21 +276,24 @@ class GenericStrategy(bt.Strategy):
             else:
                 ta_analyzer.update_processing_status("Success")
 
-    def set_current_dt_data(self):
-        self.fromdt = datetime(self.p.fromyear, self.p.frommonth, self.p.fromday, 0, 0, 0)
-        self.todt = datetime(self.p.toyear, self.p.tomonth, self.p.today, 23, 59, 59)
-        self.currdt = self.data.datetime.datetime()
-
+    def set_daterange_bounds(self):
         self.gmt3_tz = pytz.timezone('Etc/GMT-3')
-        self.fromdt = pytz.utc.localize(self.fromdt)
-        self.todt = pytz.utc.localize(self.todt)
-        self.currdt = self.gmt3_tz.localize(self.currdt, is_dst=True)
+        self.fromdt = pytz.utc.localize(datetime(self.p.fromyear, self.p.frommonth, self.p.fromday, 0, 0, 0))
+        self.todt = pytz.utc.localize(datetime(self.p.toyear, self.p.tomonth, self.p.today, 23, 59, 59))
+
+        # The bar datetimes are GMT+3 while the date range is UTC: the bounds are converted once into
+        # the date numbers of the data feed, so every bar only compares two floats
+        self.fromdt_num = bt.date2num(self.fromdt.astimezone(self.gmt3_tz).replace(tzinfo=None))
+        self.todt_num = bt.date2num(self.todt.astimezone(self.gmt3_tz).replace(tzinfo=None))
+
+    def set_current_dt_data(self):
+        self.currdt_num = self.data.datetime[0]
 
     def is_within_daterange(self):
-        return self.fromdt < self.currdt < self.todt
+        return self.fromdt_num < self.currdt_num < self.todt_num
 
     def is_beyond_daterange(self):
-        return self.currdt > self.todt
+        return self.currdt_num > self.todt_num
 
     def execute_signals(self):
         # Trading
@@ -330,7 +343,7 @@ class GenericStrategy(bt.Strategy):
     def handle_capital_stoploss(self):
         unrealized_pl = round((self.broker.getvalue() - self.p.startcash) * 100 / self.p.startcash, 2)
         if not self.capital_stoploss_fired_flow_control_flag and unrealized_pl <= DEFAULT_CAPITAL_STOPLOSS_VALUE_PCT:
-            self.log("handle_capital_stoploss(): The Unrealized P/L of the strategy={}% has exceeded the Capital STOP-LOSS Value={}%. The strategy will be completed prematurely.".format(unrealized_pl, DEFAULT_CAPITAL_STOPLOSS_VALUE_PCT))
+            self.log("handle_capital_stoploss(): The Unrealized P/L of the strategy={}% has exceeded the Capital STOP-LOSS Value={}%. The strategy will be completed prematurely.", unrealized_pl, DEFAULT_CAPITAL_STOPLOSS_VALUE_PCT)
             if self.is_strategy_dca_mode_enabled():
                 ta_analyzer = self.analyzers.ta
                 ta_analyzer.skip_trade_update_flag = True
@@ -352,13 +365,13 @@ class GenericStrategy(bt.Strategy):
     def next(self):
         try:
             if self.skip_bar_flow_control_flag:
-                self.log("next(): skip_bar_flow_control_flag={}. Skip next() processing.".format(self.skip_bar_flow_control_flag))
+                self.log("next(): skip_bar_flow_control_flag={}. Skip next() processing.", self.skip_bar_flow_control_flag)
                 self.skip_bar_flow_control_flag = False
                 self.print_all_debug_info()
                 return
 
             if self.islivedata():
-                self.log("BEGIN next(): status={}".format(self.status))
+                self.log("BEGIN next(): status={}", self.status)
 
             if self.islivedata() and self.status != "LIVE":
                 self.log("%s - %.8f" % (self.status, self.data0.close[0]))
@@ -377,6 +390,7 @@ class GenericStrategy(bt.Strategy):
             self.print_all_debug_info()
         except Exception as e:
             self.is_error_condition = True
+            self.logger.dump()
             self.broker.cerebro.runstop()
             raise e
 
@@ -407,24 +421,24 @@ class GenericStrategy(bt.Strategy):
             self.strategyprocessor.notify_analyzers()
             return
 
-        self.log('notify_order() - order.ref={}, status={}, order.size={}, order.price={}, broker.cash={}, self.position.size = {}'.format(order.ref, order.getstatusname(), order.size, order.price, self.broker.getcash(), self.position.size))
+        if self.is_log_enabled():
+            self.log('notify_order() - order.ref={}, status={}, order.size={}, order.price={}, broker.cash={}, self.position.size = {}', order.ref, order.getstatusname(), order.size, order.price, self.broker.getcash(), self.position.size)
         if order.status in [bt.Order.Created, bt.Order.Submitted, bt.Order.Accepted]:
             return  # Await further notifications
 
         if order.status == order.Completed:
-            if order.isbuy():
-                buytxt = 'BUY COMPLETE, symbol={}, order.ref={}, {} - at {}'.format(self.get_data_symbol(self.data), order.ref, order.executed.price, bt.num2date(order.executed.dt))
-                self.log(buytxt, True)
-            else:
-                selltxt = 'SELL COMPLETE, symbol={}, order.ref={}, {} - at {}'.format(self.get_data_symbol(self.data), order.ref, order.executed.price, bt.num2date(order.executed.dt))
-                self.log(selltxt, True)
+            if self.is_log_enabled():
+                side_txt = 'BUY' if order.isbuy() else 'SELL'
+                self.log('{} COMPLETE, symbol={}, order.ref={}, {} - at {}', side_txt, self.get_data_symbol(self.data), order.ref, order.executed.price, bt.num2date(order.executed.dt), send_telegram_flag=True)
         elif order.status == order.Canceled:
-            self.log('Order has been Cancelled: Symbol {}, Status {}, order.ref={}'.format(self.get_data_symbol(self.data), order.getstatusname(), order.ref), True)
+            if self.is_log_enabled():
+                self.log('Order has been Cancelled: Symbol {}, Status {}, order.ref={}', self.get_data_symbol(self.data), order.getstatusname(), order.ref, send_telegram_flag=True)
         elif order.status in [order.Expired, order.Rejected]:
-            self.log('Order has been Expired/Rejected: Symbol {}, Status {}, order.ref={}'.format(self.get_data_symbol(self.data), order.getstatusname(), order.ref), True)
+            if self.is_log_enabled():
+                self.log('Order has been Expired/Rejected: Symbol {}, Status {}, order.ref={}', self.get_data_symbol(self.data), order.getstatusname(), order.ref, send_telegram_flag=True)
             self.curr_position = 0
         elif order.status == order.Margin:
-            self.log('notify_order() - ********** MARGIN CALL!! SKIP ORDER AND PREPARING FOR NEXT ORDERS!! **********', True)
+            self.log('notify_order() - ********** MARGIN CALL!! SKIP ORDER AND PREPARING FOR NEXT ORDERS!! **********', send_telegram_flag=True)
             self.is_margin_condition = True
             if self.position.size == 0:  # If margin call ocurred during opening a new position, just skip opened position and wait for next signals
                 self.curr_position = 0
@@ -442,61 +456,68 @@ class GenericStrategy(bt.Strategy):
         return round(100 * trade_close.pnlcomm / abs(trade_open.value), 2)
 
     def notify_trade(self, trade):
-        self.log('!!! BEGIN notify_trade() - id(self)={}, self.curr_position={}, trade.ref={}, self.broker.getcash()={}'.format(id(self), self.curr_position, trade.ref, round(self.broker.getcash(), 8)))
+        if self.is_log_enabled():
+            self.log('!!! BEGIN notify_trade() - id(self)={}, self.curr_position={}, trade.ref={}, self.broker.getcash()={}', id(self), self.curr_position, trade.ref, round(self.broker.getcash(), 8))
 
         if trade.justopened:
             self.tradesopen[trade.ref] = trade
-            self.log('TRADE JUST OPENED: trade.size={}, trade.ref={}, trade.value={}, trade.commission={}'.format(trade.size, trade.ref, round(trade.value, 8), round(trade.commission, 8)))
+            if self.is_log_enabled():
+                self.log('TRADE JUST OPENED: trade.size={}, trade.ref={}, trade.value={}, trade.commission={}', trade.size, trade.ref, round(trade.value, 8), round(trade.commission, 8))
 
         if trade.isclosed:
             self.tradesclosed[trade.ref] = trade
-            net_pnl_pct = self.calculate_net_pnl_pct(self.tradesopen[trade.ref], trade)
-            self.log('---------------------------- TRADE CLOSED --------------------------')
-            self.log("1: Data Name:                            {}".format(trade.data._name))
-            self.log("2: Bar Num:                              {}".format(len(trade.data)))
-            self.log("3: Current date:                         {}".format(self.data.datetime.date()))
-            self.log('4: Status:                               Trade Complete')
-            self.log('5: Ref:                                  {}'.format(trade.ref))
-            self.log('6: PNL GROSS:                            {}'.format(round(trade.pnl, 8)))
-            self.log('7: PNL NET:                              {}'.format(round(trade.pnlcomm, 8)))
-            self.log('8: PNL NET, %:                           {}%'.format(net_pnl_pct))
-            self.log('TRADE CLOSED: PNL GROSS={:.8f}, NET={:.8f}, NET%={}%'.format(trade.pnl, trade.pnlcomm, net_pnl_pct), True)
-            self.log('--------------------------------------------------------------------')
+            if self.is_log_enabled():
+                net_pnl_pct = self.calculate_net_pnl_pct(self.tradesopen[trade.ref], trade)
+                self.log('---------------------------- TRADE CLOSED --------------------------')
+                self.log("1: Data Name:                            {}", trade.data._name)
+                self.log("2: Bar Num:                              {}", len(trade.data))
+                self.log("3: Current date:                         {}", self.data.datetime.date())
+                self.log('4: Status:                               Trade Complete')
+                self.log('5: Ref:                                  {}', trade.ref)
+                self.log('6: PNL GROSS:                            {}', round(trade.pnl, 8))
+                self.log('7: PNL NET:                              {}', round(trade.pnlcomm, 8))
+                self.log('8: PNL NET, %:                           {}%', net_pnl_pct)
+                self.log('TRADE CLOSED: PNL GROSS={:.8f}, NET={:.8f}, NET%={}%', trade.pnl, trade.pnlcomm, net_pnl_pct, send_telegram_flag=True)
+                self.log('--------------------------------------------------------------------')
 
     def stop(self):
         self.set_processing_status()
+        self.logger.close()
 
     def print_atr_mode_log_state(self):
         if self.is_atr_mode():
-            self.log('self.atr_tf[0] = {}'.format(self.atr_tf[0]))
-            self.log('self.sma_tf[0] = {}'.format(self.sma_tf[0]))
-            self.log('self.atr_tf_pct[0] = {}%'.format(round(self.atr_tf_pct[0], 2)))
+            self.log('self.atr_tf[0] = {}', self.atr_tf[0])
+            self.log('self.sma_tf[0] = {}', self.sma_tf[0])
+            self.log('self.atr_tf_pct[0] = {}%', round(self.atr_tf_pct[0], 2))
 
     def print_all_debug_info(self):
+        if not self.is_log_enabled():
+            return
+
         self.log('---------------------- INSIDE NEXT DEBUG --------------------------')
         if not self.islivedata():
             ddanalyzer = self.analyzers.dd.get_analysis()
-            self.log('Drawdown: {}'.format(round(ddanalyzer.moneydown, 8)))
-            self.log('Drawdown, %: {}%'.format(round(ddanalyzer.drawdown, 8)))
-            self.log('self.broker.get_cash() = {}'.format(self.broker.get_cash()))
-            self.log('self.broker.get_value() = {}'.format(self.broker.get_value()))
-        self.log('self.curtradeid = {}'.format(self.curtradeid))
-        self.log('self.curr_position = {}'.format(self.curr_position))
-        self.log('self.position.size = {}'.format(self.position.size))
-        self.log('self.position.price = {}'.format(self.position.price))
-        self.log('self.position_avg_price = {}'.format(self.position_avg_price))
-        self.log('self.data.datetime[0] = {}'.format(self.data.datetime.datetime()))
-        self.log('self.data.open = {}'.format(self.data.open[0]))
-        self.log('self.data.high = {}'.format(self.data.high[0]))
-        self.log('self.data.low = {}'.format(self.data.low[0]))
-        self.log('self.data.close = {}'.format(self.data.close[0]))
+            self.log('Drawdown: {}', round(ddanalyzer.moneydown, 8))
+            self.log('Drawdown, %: {}%', round(ddanalyzer.drawdown, 8))
+            self.log('self.broker.get_cash() = {}', self.broker.get_cash())
+            self.log('self.broker.get_value() = {}', self.broker.get_value())
+        self.log('self.curtradeid = {}', self.curtradeid)
+        self.log('self.curr_position = {}', self.curr_position)
+        self.log('self.position.size = {}', self.position.size)
+        self.log('self.position.price = {}', self.position.price)
+        self.log('self.position_avg_price = {}', self.position_avg_price)
+        self.log('self.data.datetime[0] = {}', self.data.datetime.datetime())
+        self.log('self.data.open = {}', self.data.open[0])
+        self.log('self.data.high = {}', self.data.high[0])
+        self.log('self.data.low = {}', self.data.low[0])
+        self.log('self.data.close = {}', self.data.close[0])
 
         self.print_strategy_debug_info()
 
-        self.log('self.is_open_long = {}'.format(self.is_open_long))
-        self.log('self.is_close_long = {}'.format(self.is_close_long))
-        self.log('self.is_open_short = {}'.format(self.is_open_short))
-        self.log('self.is_close_short = {}'.format(self.is_close_short))
+        self.log('self.is_open_long = {}', self.is_open_long)
+        self.log('self.is_close_long = {}', self.is_close_long)
+        self.log('self.is_open_short = {}', self.is_open_short)
+        self.log('self.is_close_short = {}', self.is_close_short)
         self.print_atr_mode_log_state()
         self.sltpmanager.log_state()
         self.trailingbuymanager.log_state()
@@ -0,0 +1,98 @@
+import backtrader as bt
+from collections import deque
+import struct
+
+
+class StrategyLogger(object):
+    '''Lazily evaluated strategy log.
+
+    ``log(txt, args)`` takes a ``str.format()`` template and its arguments: nothing is formatted
+    unless a message is actually consumed. Messages go to up to three places:
+
+    - the strategy processor's ``log()`` (printed), when the strategy runs with ``debug``;
+    - a ring buffer of the last ``ring_size`` records, dumped by ``dump()`` after an error.
+      Records are formatted only when dumped. Arguments other than numbers and strings (e.g.
+      the OCO context) are converted to strings when recorded, as they may change later;
+    - a binary trace file: one record per message, read back with ``read_trace()``.
+
+    With none of them configured ``is_enabled()`` is False and ``log()`` returns immediately.
+    The ring buffer and the trace file are configured for all the strategies of the process
+    with ``configure()``.
+    '''
+
+    # Trace file record header: bar datetime (backtrader date number), message length in bytes
+    TRACE_RECORD_HEADER = struct.Struct('<dI')
+
+    SCALAR_TYPES = (int, float, str, type(None))
+
+    _ring_size = 0
+    _trace_filename = None
+
+    @classmethod
+    def configure(cls, ring_size=0, trace_filename=None):
+        cls._ring_size = ring_size or 0
+        cls._trace_filename = trace_filename
+
+    def __init__(self, strategy, strategyprocessor, debug):
+        self.strategy = strategy
+        self.strategyprocessor = strategyprocessor
+        self.debug = debug
+        self._ring = deque(maxlen=self._ring_size) if self._ring_size > 0 else None
+        self._trace_file = open(self._trace_filename, "ab") if self._trace_filename else None
+        self._enabled = bool(self.debug or self._ring is not None or self._trace_file is not None)
+
+    def is_enabled(self):
+        return self._enabled
+
+    @staticmethod
+    def format_message(txt, args):
+        return txt.format(*args) if args else txt
+
+    def get_dtnum(self):
+        return self.strategy.data.datetime[0] if len(self.strategy.data) else 0.0
+
+    def log(self, txt, args=(), send_telegram_flag=False):
+        if not self._enabled:
+            return
+
+        if self._ring is not None:
+            self._ring.append((self.get_dtnum(), txt, tuple(a if isinstance(a, self.SCALAR_TYPES) else str(a) for a in args)))
+
+        if self.debug or self._trace_file is not None:
+            message = self.format_message(txt, args)
+            if self._trace_file is not None:
+                self.write_trace_record(self.get_dtnum(), message)
+            if self.debug:
+                self.strategyprocessor.log(message, send_telegram_flag)
+
+    def write_trace_record(self, dtnum, message):
+        message_bytes = message.encode("utf-8")
+        self._trace_file.write(self.TRACE_RECORD_HEADER.pack(dtnum, len(message_bytes)))
+        self._trace_file.write(message_bytes)
+
+    def dump(self):
+        if self._ring is None:
+            return
+        print("---------------------- LAST {} LOG RECORDS ----------------------".format(len(self._ring)))
+        for dtnum, txt, args in self._ring:
+            print('%s  %s' % (bt.num2date(dtnum) if dtnum else None, self.format_message(txt, args)))
+        self._ring.clear()
+
+    def close(self):
+        if self._trace_file is not None:
+            self._trace_file.close()
+            self._trace_file = None
+        self._enabled = bool(self.debug or self._ring is not None)
+
+    @classmethod
+    def read_trace(cls, filename):
+        '''Yields the (datetime, message) records of a binary trace file.'''
+        header_size = cls.TRACE_RECORD_HEADER.size
+        with open(filename, "rb") as f:
+            while True:
+                header = f.read(header_size)
+                if len(header) < header_size:
+                    return
+                dtnum, length = cls.TRACE_RECORD_HEADER.unpack(header)
+                message = f.read(length).decode("utf-8")
+                yield bt.num2date(dtnum) if dtnum else None, message
@@ -3,6 +3,9 @@ from strategies.helper.constants import TradeExitMode
 
 class ParametersValidator(object):
 
+    # The only parameters validate_params() looks at
+    CONSTRAINED_PARAMS = ("needlong", "needshort", "exitmode", "sl", "tslflag", "tp", "ttpdist", "tbdist", "numdca", "dcainterval")
+
     @classmethod
     def validate_params(cls, params):
         if not params.get("needlong") and not params.get("needshort"):
@@ -85,12 +85,14 @@ class DcaModeManager(object):
         oco_order = self.get_oco_order()
         if is_long:
             dca_order = self.strategy.generic_buy(tradeid=tradeid, size=dca_size, price=dca_price, exectype=bt.Order.Limit, oco=oco_order)
-            self.strategy.log('Submitted a new DCA-MODE order (BUY LIMIT): tradeid={}, dca_size={}, dca_price={}, dca_order.ref={}, dca_order.size={}, dca_order.price={}, dca_order.side={}, oco_order.ref={}'.format(
-                tradeid, dca_size, dca_price, dca_order.ref, dca_order.size, dca_order.price, dca_order.ordtypename(), oco_order.ref))
+            if self.strategy.is_log_enabled():
+                self.strategy.log('Submitted a new DCA-MODE order (BUY LIMIT): tradeid={}, dca_size={}, dca_price={}, dca_order.ref={}, dca_order.size={}, dca_order.price={}, dca_order.side={}, oco_order.ref={}',
+                    tradeid, dca_size, dca_price, dca_order.ref, dca_order.size, dca_order.price, dca_order.ordtypename(), oco_order.ref)
         else:
             dca_order = self.strategy.generic_sell(tradeid=tradeid, size=dca_size, price=dca_price, exectype=bt.Order.Limit, oco=oco_order)
-            self.strategy.log('Submitted a new DCA-MODE order (SELL LIMIT): tradeid={}, dca_size={}, dca_price={}, dca_order.ref={}, dca_order.size={}, dca_order.price={}, dca_order.side={}, oco_order.ref={}'.format(
-                tradeid, dca_size, dca_price, dca_order.ref, dca_order.size, dca_order.price, dca_order.ordtypename(), oco_order.ref))
+            if self.strategy.is_log_enabled():
+                self.strategy.log('Submitted a new DCA-MODE order (SELL LIMIT): tradeid={}, dca_size={}, dca_price={}, dca_order.ref={}, dca_order.size={}, dca_order.price={}, dca_order.side={}, oco_order.ref={}',
+                    tradeid, dca_size, dca_price, dca_order.ref, dca_order.size, dca_order.price, dca_order.ordtypename(), oco_order.ref)
         return dca_order
 
     def submit_dca_orders(self, is_long, last_price, tradeid):
@@ -99,7 +101,7 @@ class DcaModeManager(object):
             order_price = self.get_desired_order_price(is_long, idx, last_price)
             new_order = self.submit_new_dca_order(is_long, tradeid, order_size, order_price)
             if new_order:
-                self.strategy.log('submit_dca_orders(): Submitted the new {} order, i={}, new_order.ref={}, is_long={}, last_price={}'.format("LONG" if is_long else "SHORT", idx, new_order.ref, is_long, last_price))
+                self.strategy.log('submit_dca_orders(): Submitted the new {} order, i={}, new_order.ref={}, is_long={}, last_price={}', "LONG" if is_long else "SHORT", idx, new_order.ref, is_long, last_price)
                 self.store_order(is_long, idx, new_order)
 
     def get_order_refs_str(self, orders):
@@ -123,12 +125,12 @@ class DcaModeManager(object):
             self.num_dca_orders_triggered = 0
             self.is_dca_activated = True
 
-            self.strategy.log("Activated DCA-MODE for self.tradeid={}, last_price={}, is_long={}".format(tradeid, last_price, is_long))
+            self.strategy.log("Activated DCA-MODE for self.tradeid={}, last_price={}, is_long={}", tradeid, last_price, is_long)
 
     def cancel_order(self, order):
         if self.is_dca_mode_activated() and order:
             self.strategy.cancel(order)
-            self.strategy.log("Cancelled the DCA order: order.ref={}".format(order.ref))
+            self.strategy.log("Cancelled the DCA order: order.ref={}", order.ref)
 
     def cancel_all_dca_orders(self):
         for i in range(0, self.strategy.p.numdca):
@@ -162,7 +164,7 @@ class DcaModeManager(object):
             if old_dca_order and old_dca_order.ref:
                 new_order = self.submit_new_dca_order(is_long, tradeid, old_dca_order.size, old_dca_order.price)
                 if new_order:
-                    self.strategy.log('submit_dca_orders(): Resubmitted the DCA {} order, i={}, old_dca_order.ref={}, new_order.ref={}, is_long={}'.format("LONG" if is_long else "SHORT", idx, old_dca_order.ref, new_order.ref, is_long))
+                    self.strategy.log('submit_dca_orders(): Resubmitted the DCA {} order, i={}, old_dca_order.ref={}, new_order.ref={}, is_long={}', "LONG" if is_long else "SHORT", idx, old_dca_order.ref, new_order.ref, is_long)
                     self.store_order(is_long, idx, new_order)
 
     def handle_order_completed(self, order):
@@ -170,8 +172,9 @@ class DcaModeManager(object):
             return False
 
         if self.is_dca_mode_enabled and self.is_dca_mode_activated() and order.status == order.Completed and self.check_order_is_stored(self.is_long_signal, order):
-            self.strategy.log('DcaModeManager.handle_order_completed(): order.ref={}, order.status={}, order.tradeid={}, order.price={}, order.size={}, order.side={}'.format(
-                order.ref, order.getstatusname(), order.tradeid, order.price, order.size, order.ordtypename(), self.num_dca_orders_triggered))
+            if self.strategy.is_log_enabled():
+                self.strategy.log('DcaModeManager.handle_order_completed(): order.ref={}, order.status={}, order.tradeid={}, order.price={}, order.size={}, order.side={}',
+                    order.ref, order.getstatusname(), order.tradeid, order.price, order.size, order.ordtypename(), self.num_dca_orders_triggered)
             self.strategy.curr_position = self.get_curr_position_size(order)
             self.strategy.position_avg_price = self.strategy.position.price
             idx = self.get_order_idx(order)
@@ -183,11 +186,12 @@ class DcaModeManager(object):
             self.strategy.activate_trade_managers(self.strategy.curtradeid, self.strategy.position.price, self.strategy.position.size, self.is_long_signal)
             dca_orders_count = self.get_dca_orders_count()
             if dca_orders_count > 0:
-                self.strategy.log("The number of active orders={}. All non-closed DCA-MODE orders will be resubmitted.".format(dca_orders_count))
+                self.strategy.log("The number of active orders={}. All non-closed DCA-MODE orders will be resubmitted.", dca_orders_count)
                 self.resubmit_dca_orders(self.is_long_signal, self.strategy.curtradeid)
 
-            self.strategy.log("The DCA-MODE order has been triggered and COMPLETED: self.strategy.curr_position={}, self.strategy.position_avg_price={}, self.num_dca_orders_triggered={}, self.get_dca_orders_count()={}".format(
-                self.strategy.curr_position, self.strategy.position_avg_price, self.num_dca_orders_triggered, self.get_dca_orders_count()))
+            if self.strategy.is_log_enabled():
+                self.strategy.log("The DCA-MODE order has been triggered and COMPLETED: self.strategy.curr_position={}, self.strategy.position_avg_price={}, self.num_dca_orders_triggered={}, self.get_dca_orders_count()={}",
+                    self.strategy.curr_position, self.strategy.position_avg_price, self.num_dca_orders_triggered, self.get_dca_orders_count())
             return True
         return False
 
@@ -202,6 +206,6 @@ class DcaModeManager(object):
 
     def log_state(self):
         if self.is_dca_mode_enabled:
-            self.strategy.log('DcaModeManager.num_dca_orders_triggered = {}'.format(self.num_dca_orders_triggered))
-            self.strategy.log('DcaModeManager.long_orders = [{}]'.format(self.get_order_refs_str(self.long_orders)))
-            self.strategy.log('DcaModeManager.short_orders = [{}]'.format(self.get_order_refs_str(self.short_orders)))
+            self.strategy.log('DcaModeManager.num_dca_orders_triggered = {}', self.num_dca_orders_triggered)
+            self.strategy.log('DcaModeManager.long_orders = [{}]', self.get_order_refs_str(self.long_orders))
+            self.strategy.log('DcaModeManager.short_orders = [{}]', self.get_order_refs_str(self.short_orders))
@@ -0,0 +1,513 @@
+import numpy as np
+from strategies.helper.constants import TradeExitMode
+from extensions.sizers.cashsizer import FixedCashSizer
+from .sltpmanager import MOVE_TRAILING_PRICE_DELTA_THRESHOLD_PCT
+
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# Numba reads module globals as compile-time constants
+CASH_SIZER_ADJUSTMENT_FACTOR = FixedCashSizer.ADJUSTMENT_FACTOR
+
+SIZER_MODE_FIXED_CASH = 0
+SIZER_MODE_PERCENT = 1
+
+EXIT_REASON_SIGNAL = 0
+EXIT_REASON_SL = 1
+EXIT_REASON_TSL = 2
+EXIT_REASON_TP = 3
+EXIT_REASON_TTP = 4
+EXIT_REASON_DATERANGE = 5
+
+# Columns of the trades array
+TRADE_ENTRY_BAR = 0
+TRADE_EXIT_BAR = 1
+TRADE_DIRECTION = 2
+TRADE_ENTRY_PRICE = 3
+TRADE_EXIT_PRICE = 4
+TRADE_SIZE = 5
+TRADE_PNL = 6
+TRADE_PNLCOMM = 7
+TRADE_EXIT_REASON = 8
+# 1 for a trade closed after TVTradeAnalyzer.skip_trade_update_flag was set: counted as closed, its P/L is not
+TRADE_SKIPPED = 9
+TRADE_NUM_COLUMNS = 10
+
+# Positions in the counters array: the same counts TVTradeAnalyzer collects
+COUNTER_SL = 0
+COUNTER_TSL = 1
+COUNTER_TSL_MOVED = 2
+COUNTER_TP = 3
+COUNTER_TTP = 4
+COUNTER_TTP_MOVED = 5
+COUNTER_TB = 6
+COUNTER_TB_MOVED = 7
+COUNTER_DCA_TRIGGERED = 8
+NUM_COUNTERS = 9
+
+
+@njit(cache=True)
+def _calc_low_side_pr(base_price, val_pct, is_long):
+    if is_long:
+        return round(base_price * (1 - val_pct / 100.0), 8)
+    else:
+        return round(base_price * (1 + val_pct / 100.0), 8)
+
+
+@njit(cache=True)
+def _calc_high_side_pr(base_price, val_pct, is_long):
+    if is_long:
+        return round(base_price * (1 + val_pct / 100.0), 8)
+    else:
+        return round(base_price * (1 - val_pct / 100.0), 8)
+
+
+@njit(cache=True)
+def _get_pct(value, atr_mode, atr_pct):
+    # SLTPCalculator: in ATR mode the parameter is a multiplier of the ATR(%)
+    return atr_pct * value if atr_mode else value
+
+
+@njit(cache=True)
+def _is_allow_trailing_move(price1, price2):
+    return abs(100 * (price1 - price2) / price2) >= MOVE_TRAILING_PRICE_DELTA_THRESHOLD_PCT
+
+
+@njit(cache=True)
+def _try_exec_stop(is_buy, price, popen, phigh, plow):
+    # Same fill rules as backtrader's BackBroker._try_exec_stop (no slippage): NaN if not executed
+    if is_buy:
+        if popen >= price:
+            return popen
+        if phigh >= price:
+            return price
+    else:
+        if popen <= price:
+            return popen
+        if plow <= price:
+            return price
+    return np.nan
+
+
+@njit(cache=True)
+def _try_exec_limit(is_buy, price, popen, phigh, plow):
+    # Same fill rules as backtrader's BackBroker._try_exec_limit: NaN if not executed
+    if is_buy:
+        if price >= popen:
+            return popen
+        if price >= plow:
+            return price
+    else:
+        if price <= popen:
+            return popen
+        if price <= phigh:
+            return price
+    return np.nan
+
+
+@njit(cache=True)
+def _get_order_size(sizer_mode, lotsize, risk, commission, value, next_open, last_close, sl_pct):
+    if sizer_mode == SIZER_MODE_PERCENT:
+        # VariablePercentSizer
+        return round(value / last_close * (lotsize / 100.0), 6)
+
+    # FixedCashSizer
+    if value <= lotsize * (1 + 2 * commission):
+        capital = round(value * CASH_SIZER_ADJUSTMENT_FACTOR, 8)
+    else:
+        capital = CASH_SIZER_ADJUSTMENT_FACTOR * lotsize
+    risk_pct = risk * 100
+    if risk_pct > 0 and sl_pct > 0 and risk_pct <= sl_pct:
+        return round(risk_pct / 100 * (capital / (sl_pct * next_open / 100)), 8)
+    return round(capital / next_open, 8)
+
+
+@njit(cache=True)
+def simulate_exit_managers(open_, high, low, close, atr_pct, open_long, close_long, open_short, close_short,
+                           within_daterange, beyond_daterange, first_bar,
+                           needlong, needshort, atr_mode, sl, tslflag, tp, ttpdist, tbdist, numdca, dcainterval,
+                           startcash, sizer_mode, lotsize, risk, commission, trades, counters):
+    '''Bar by bar simulation of GenericStrategy.execute_signals() and the SL/TSL/TP/TTP, TRAILING-BUY and
+    DCA-MODE managers over NumPy arrays. Orders submitted while processing bar i are checked against the
+    prices of bar i+1 onwards, using backtrader's broker fill rules. Closed trades are written into ``trades``
+    (one row per trade, see the TRADE_* columns) and the manager events into ``counters``.
+
+    Returns the number of closed trades.
+    '''
+    n = len(close)
+    num_trades = 0
+
+    sl_enabled = sl > 0
+    tsl_enabled = tslflag
+    tp_enabled = tp > 0
+    ttp_enabled = ttpdist > 0
+    tb_enabled = tbdist > 0
+    dca_enabled = numdca > 0 and dcainterval > 0
+
+    curr_position = 0
+    pos_size = 0.0
+    pos_price = 0.0
+    pos_comm = 0.0
+    entry_bar = -1
+    realized = 0.0
+    skip_trades = False
+    skip_bar = False
+
+    pend_close = False
+    pend_close_reason = EXIT_REASON_SIGNAL
+    pend_open_size = 0.0
+
+    # Bar at which an order was submitted, -1: no order
+    sl_active = False
+    sl_price = 0.0
+    sl_trailed_price = 0.0
+    sl_bar = -1
+    tp_active = False
+    ttp_active = False
+    tp_price = 0.0
+    tp_trailed_price = 0.0
+    ttp_price = 0.0
+    tp_bar = -1
+    tb_active = False
+    tb_is_long = False
+    tb_price = 0.0
+    tb_trailed_price = 0.0
+    tb_size = 0.0
+    tb_bar = -1
+    dca_active = False
+    dca_count = max(numdca, 1)
+    dca_prices = np.zeros(dca_count)
+    dca_bars = np.full(dca_count, -1)
+    dca_size = 0.0
+
+    for i in range(n):
+        # Broker: execute the orders submitted on the previous bars
+        if pend_close:
+            exit_price = open_[i]
+            exit_comm = abs(pos_size) * exit_price * commission
+            pnl = (exit_price - pos_price) * pos_size
+            pnlcomm = pnl - pos_comm - exit_comm
+            realized += pnlcomm
+            trades[num_trades, TRADE_ENTRY_BAR] = entry_bar
+            trades[num_trades, TRADE_EXIT_BAR] = i
+            trades[num_trades, TRADE_DIRECTION] = 1 if pos_size > 0 else -1
+            trades[num_trades, TRADE_ENTRY_PRICE] = pos_price
+            trades[num_trades, TRADE_EXIT_PRICE] = exit_price
+            trades[num_trades, TRADE_SIZE] = abs(pos_size)
+            trades[num_trades, TRADE_PNL] = pnl
+            trades[num_trades, TRADE_PNLCOMM] = pnlcomm
+            trades[num_trades, TRADE_EXIT_REASON] = pend_close_reason
+            trades[num_trades, TRADE_SKIPPED] = skip_trades
+            num_trades += 1
+            pos_size = 0.0
+            pos_comm = 0.0
+            pend_close = False
+
+        if pend_open_size != 0:
+            pos_size = pend_open_size
+            pos_price = open_[i]
+            pos_comm = abs(pos_size) * pos_price * commission
+            entry_bar = i
+            pend_open_size = 0.0
+
+        if pos_size != 0:
+            is_long = pos_size > 0
+            exit_price = np.nan
+            exit_reason = EXIT_REASON_SIGNAL
+            if sl_active and 0 <= sl_bar < i:
+                exit_price = _try_exec_stop(not is_long, sl_price, open_[i], high[i], low[i])
+                if not np.isnan(exit_price):
+                    exit_reason = EXIT_REASON_TSL if tsl_enabled else EXIT_REASON_SL
+                    counters[COUNTER_TSL if tsl_enabled else COUNTER_SL] += 1
+            if np.isnan(exit_price) and 0 <= tp_bar < i:
+                if ttp_active:
+                    exit_price = _try_exec_stop(not is_long, ttp_price, open_[i], high[i], low[i])
+                else:
+                    exit_price = _try_exec_limit(not is_long, tp_price, open_[i], high[i], low[i])
+                if not np.isnan(exit_price):
+                    exit_reason = EXIT_REASON_TTP if ttp_enabled else EXIT_REASON_TP
+                    counters[COUNTER_TTP if ttp_enabled else COUNTER_TP] += 1
+
+            if not np.isnan(exit_price):
+                exit_comm = abs(pos_size) * exit_price * commission
+                pnl = (exit_price - pos_price) * pos_size
+                pnlcomm = pnl - pos_comm - exit_comm
+                realized += pnlcomm
+                trades[num_trades, TRADE_ENTRY_BAR] = entry_bar
+                trades[num_trades, TRADE_EXIT_BAR] = i
+                trades[num_trades, TRADE_DIRECTION] = 1 if is_long else -1
+                trades[num_trades, TRADE_ENTRY_PRICE] = pos_price
+                trades[num_trades, TRADE_EXIT_PRICE] = exit_price
+                trades[num_trades, TRADE_SIZE] = abs(pos_size)
+                trades[num_trades, TRADE_PNL] = pnl
+                trades[num_trades, TRADE_PNLCOMM] = pnlcomm
+                trades[num_trades, TRADE_EXIT_REASON] = exit_reason
+                trades[num_trades, TRADE_SKIPPED] = skip_trades
+                num_trades += 1
+                pos_size = 0.0
+                pos_comm = 0.0
+                curr_position = 0
+                sl_active = False
+                sl_bar = -1
+                tp_active = False
+                ttp_active = False
+                tp_bar = -1
+                dca_active = False
+                dca_bars[:] = -1
+            elif dca_active:
+                dca_triggered = False
+                for k in range(numdca):
+                    if 0 <= dca_bars[k] < i:
+                        fill_price = _try_exec_limit(is_long, dca_prices[k], open_[i], high[i], low[i])
+                        if not np.isnan(fill_price):
+                            new_size = abs(pos_size) + dca_size
+                            pos_price = (pos_price * abs(pos_size) + fill_price * dca_size) / new_size
+                            pos_size = new_size if is_long else -new_size
+                            pos_comm += dca_size * fill_price * commission
+                            dca_bars[k] = -1
+                            counters[COUNTER_DCA_TRIGGERED] += 1
+                            dca_triggered = True
+                if dca_triggered:
+                    # SL/TP are re-activated from the average position price, the other DCA orders are resubmitted
+                    if sl_enabled:
+                        sl_price = _calc_low_side_pr(pos_price, _get_pct(sl, atr_mode, atr_pct[i]), is_long)
+                        sl_active = True
+                        sl_bar = i
+                    if tp_enabled:
+                        tp_price = _calc_high_side_pr(pos_price, _get_pct(tp, atr_mode, atr_pct[i]), is_long)
+                        tp_active = True
+                        tp_bar = i
+                    for k in range(numdca):
+                        if dca_bars[k] >= 0:
+                            dca_bars[k] = i
+                    skip_bar = True
+
+        if tb_active and 0 <= tb_bar < i:
+            fill_price = _try_exec_stop(tb_is_long, tb_price, open_[i], high[i], low[i])
+            if not np.isnan(fill_price):
+                pos_size = tb_size if tb_is_long else -tb_size
+                pos_price = fill_price
+                pos_comm = tb_size * fill_price * commission
+                entry_bar = i
+                curr_position = 1 if tb_is_long else -1
+                counters[COUNTER_TB] += 1
+                tb_active = False
+                tb_bar = -1
+                # The SL/TP targets are calculated from the order price
+                if sl_enabled:
+                    sl_price = _calc_low_side_pr(tb_price, _get_pct(sl, atr_mode, atr_pct[i]), tb_is_long)
+                    sl_active = True
+                    sl_bar = i
+                    if tsl_enabled:
+                        sl_trailed_price = tb_price
+                if tp_enabled:
+                    tp_price = _calc_high_side_pr(tb_price, _get_pct(tp, atr_mode, atr_pct[i]), tb_is_long)
+                    tp_active = True
+                    tp_bar = -1 if ttp_enabled else i
+                skip_bar = True
+
+        # Strategy: next()
+        if i < first_bar:
+            continue
+        if skip_bar:
+            skip_bar = False
+            continue
+
+        value = startcash + realized - pos_comm + pos_size * (close[i] - pos_price)
+        next_open = open_[i + 1] if i + 1 < n else close[i]
+        sl_pct = _get_pct(sl, atr_mode, atr_pct[i]) if sl_enabled else 0.0
+
+        is_allow_signals = not tp_active and not ttp_active and not tb_active and not dca_active
+        if is_allow_signals and within_daterange[i]:
+            for step in range(4):
+                # Same order as in GenericStrategy.execute_signals()
+                if step == 0 or step == 2:
+                    is_close = curr_position < 0 and close_short[i] if step == 0 else curr_position > 0 and close_long[i]
+                    if is_close:
+                        if pos_size != 0:
+                            pend_close = True
+                            pend_close_reason = EXIT_REASON_SIGNAL
+                        pend_open_size = 0.0
+                        curr_position = 0
+                        sl_active = False
+                        sl_bar = -1
+                        tp_active = False
+                        ttp_active = False
+                        tp_bar = -1
+                    continue
+
+                is_long = step == 1
+                if curr_position != 0 or is_long and not (needlong and open_long[i]) or not is_long and not (needshort and open_short[i]):
+                    continue
+
+                if tb_enabled:
+                    if not tb_active:
+                        tb_active = True
+                        tb_is_long = is_long
+                        tb_trailed_price = close[i]
+                        tb_price = _calc_high_side_pr(close[i], _get_pct(tbdist, atr_mode, atr_pct[i]), is_long)
+                        tb_size = _get_order_size(sizer_mode, lotsize, risk, commission, value, next_open, close[i], sl_pct)
+                        tb_bar = i
+                    continue
+
+                order_size = _get_order_size(sizer_mode, lotsize, risk, commission, value, next_open, close[i], sl_pct)
+                if dca_enabled:
+                    order_size = round(order_size / (1.0 * (numdca + 1)), 8)
+                    dca_size = order_size
+                    for k in range(numdca):
+                        price_bracket_pct = (k + 1) * dcainterval / 100.0
+                        dca_prices[k] = round(close[i] * (1 - price_bracket_pct), 8) if is_long else round(close[i] * (1 + price_bracket_pct), 8)
+                        dca_bars[k] = i
+                    dca_active = True
+                pend_open_size = order_size if is_long else -order_size
+                curr_position = 1 if is_long else -1
+                if sl_enabled:
+                    sl_price = _calc_low_side_pr(close[i], sl_pct, is_long)
+                    sl_active = True
+                    sl_bar = i
+                    if tsl_enabled:
+                        sl_trailed_price = close[i]
+                if tp_enabled:
+                    tp_price = _calc_high_side_pr(close[i], _get_pct(tp, atr_mode, atr_pct[i]), is_long)
+                    tp_active = True
+                    tp_bar = -1 if ttp_enabled else i
+
+        if beyond_daterange[i]:
+            if dca_enabled:
+                # TVTradeAnalyzer.skip_trade_update_flag
+                skip_trades = True
+            tb_active = False
+            tb_bar = -1
+            dca_active = False
+            dca_bars[:] = -1
+            if curr_position != 0:
+                if pos_size != 0:
+                    pend_close = True
+                    pend_close_reason = EXIT_REASON_DATERANGE
+                pend_open_size = 0.0
+                sl_active = False
+                sl_bar = -1
+                tp_active = False
+                ttp_active = False
+                tp_bar = -1
+            curr_position = 0
+
+        # Trade managers: move the trailing targets, activate TRAILING TAKE-PROFIT
+        is_long = curr_position > 0
+        last_price = close[i]
+        tsl_move_pending = tsl_enabled and sl_active and 0 <= sl_bar < i and _is_allow_trailing_move(last_price, sl_trailed_price) and \
+            (is_long and last_price > sl_trailed_price or not is_long and last_price < sl_trailed_price)
+        ttp_move_pending = ttp_active and 0 <= tp_bar < i and _is_allow_trailing_move(last_price, tp_trailed_price) and \
+            (is_long and last_price > tp_trailed_price or not is_long and last_price < tp_trailed_price)
+        if tsl_move_pending:
+            sl_trailed_price = last_price
+            sl_price = _calc_low_side_pr(last_price, _get_pct(sl, atr_mode, atr_pct[i]), is_long)
+            sl_bar = i
+            if tp_bar >= 0:
+                tp_bar = i
+            counters[COUNTER_TSL_MOVED] += 1
+        if ttp_move_pending:
+            tp_trailed_price = last_price
+            ttp_price = _calc_low_side_pr(last_price, _get_pct(ttpdist, atr_mode, atr_pct[i]), is_long)
+            tp_bar = i
+            if sl_active:
+                sl_bar = i
+            counters[COUNTER_TTP_MOVED] += 1
+
+        if tb_active and 0 <= tb_bar < i and _is_allow_trailing_move(last_price, tb_trailed_price) and \
+                (tb_is_long and last_price < tb_trailed_price or not tb_is_long and last_price > tb_trailed_price):
+            tb_trailed_price = last_price
+            tb_price = _calc_high_side_pr(last_price, _get_pct(tbdist, atr_mode, atr_pct[i]), tb_is_long)
+            tb_size = _get_order_size(sizer_mode, lotsize, risk, commission, value, next_open, close[i], sl_pct)
+            tb_bar = i
+            counters[COUNTER_TB_MOVED] += 1
+
+        if ttp_enabled and tp_active and not ttp_active and curr_position != 0:
+            if is_long and last_price > tp_price or not is_long and last_price < tp_price:
+                tp_trailed_price = last_price
+                ttp_price = _calc_low_side_pr(last_price, _get_pct(ttpdist, atr_mode, atr_pct[i]), is_long)
+                tp_bar = i
+                ttp_active = True
+
+    return num_trades
+
+
+class StrategySignals(object):
+    '''Per-bar arrays recorded from a strategy's ``calculate_signals()`` and the data it ran on.'''
+
+    def __init__(self, num_bars):
+        self.dtnums = np.zeros(num_bars)
+        self.open = np.zeros(num_bars)
+        self.high = np.zeros(num_bars)
+        self.low = np.zeros(num_bars)
+        self.close = np.zeros(num_bars)
+        self.atr_pct = np.zeros(num_bars)
+        self.open_long = np.zeros(num_bars, dtype=np.bool_)
+        self.close_long = np.zeros(num_bars, dtype=np.bool_)
+        self.open_short = np.zeros(num_bars, dtype=np.bool_)
+        self.close_short = np.zeros(num_bars, dtype=np.bool_)
+        self.within_daterange = np.zeros(num_bars, dtype=np.bool_)
+        self.beyond_daterange = np.zeros(num_bars, dtype=np.bool_)
+        self.first_bar = -1
+
+
+class SimulatedTrades(object):
+    def __init__(self, trades, counters):
+        self.trades = trades
+        self.counters = counters
+
+    def __len__(self):
+        # The number of closed trades, as TVTradeAnalyzer counts them
+        return len(self.trades)
+
+    def get_counted_trades(self):
+        return self.trades[self.trades[:, TRADE_SKIPPED] == 0]
+
+    def get_netprofits(self):
+        return self.get_counted_trades()[:, TRADE_PNLCOMM]
+
+    def get_exit_bars(self):
+        return self.get_counted_trades()[:, TRADE_EXIT_BAR].astype(np.int64)
+
+
+class FastExitSimulator(object):
+    '''Screening alternative of a full backtrader run of a GenericStrategy: applies the exit modes of the
+    strategy parameters (SL/TSL/TP/TTP, TRAILING-BUY, DCA-MODE, ATR mode) to recorded ``StrategySignals``
+    and returns the closed trades.
+
+    Simplifications compared to the event-driven engine: orders which could fill on the same bar are
+    checked in a fixed order (SL, TP, DCA), the broker value used by the sizers ignores the pending orders,
+    and signals which depend on the position state of the strategy are taken as recorded.
+    '''
+
+    def __init__(self, sizer_mode, lotsize, commission, risk):
+        self._sizer_mode = sizer_mode
+        self._lotsize = lotsize
+        self._commission = commission
+        self._risk = risk
+
+    @staticmethod
+    def get_param(params, name):
+        return params.get(name) or 0
+
+    def run(self, signals, params):
+        num_bars = len(signals.close)
+        trades = np.zeros((num_bars + 1, TRADE_NUM_COLUMNS))
+        counters = np.zeros(NUM_COUNTERS, dtype=np.int64)
+        atr_mode = bool(params.get("exitmode")) and params.get("exitmode") != TradeExitMode.EXIT_MODE_DEFAULT
+        num_trades = simulate_exit_managers(
+            signals.open, signals.high, signals.low, signals.close, signals.atr_pct,
+            signals.open_long, signals.close_long, signals.open_short, signals.close_short,
+            signals.within_daterange, signals.beyond_daterange, signals.first_bar,
+            bool(params.get("needlong")), bool(params.get("needshort")), atr_mode,
+            float(self.get_param(params, "sl")), bool(params.get("tslflag")), float(self.get_param(params, "tp")),
+            float(self.get_param(params, "ttpdist")), float(self.get_param(params, "tbdist")),
+            int(self.get_param(params, "numdca")), float(self.get_param(params, "dcainterval")),
+            float(params.get("startcash")), self._sizer_mode, float(self._lotsize), float(self._risk), float(self._commission),
+            trades, counters)
+        return SimulatedTrades(trades[:num_trades], counters)
@@ -51,7 +51,7 @@ class SLTPCalculator(object):
         elif self.exitmode == TradeExitMode.EXIT_MODE_SET_DYNAMIC_SLTP_WITH_ATR:
             atr_mult = self.sl_pct
             sl_pct = self.strategy.atr_tf_pct[0] * atr_mult
-            self.strategy.log("SLTPCalculator.get_sl_price(): self.exitmode={}, atr_mult={}, sl_pct={:.2f}%".format(self.exitmode, atr_mult, sl_pct))
+            self.strategy.log("SLTPCalculator.get_sl_price(): self.exitmode={}, atr_mult={}, sl_pct={:.2f}%", self.exitmode, atr_mult, sl_pct)
             return self.calc_low_side_pr(base_price, sl_pct, is_long)
 
     def get_tp_price(self, base_price, is_long):
@@ -60,7 +60,7 @@ class SLTPCalculator(object):
         elif self.exitmode == TradeExitMode.EXIT_MODE_SET_DYNAMIC_SLTP_WITH_ATR:
             atr_mult = self.tp_pct
             tp_pct = self.strategy.atr_tf_pct[0] * atr_mult
-            self.strategy.log("SLTPCalculator.get_tp_price(): self.exitmode={}, atr_mult={}, tp_pct={:.2f}%".format(self.exitmode, atr_mult, tp_pct))
+            self.strategy.log("SLTPCalculator.get_tp_price(): self.exitmode={}, atr_mult={}, tp_pct={:.2f}%", self.exitmode, atr_mult, tp_pct)
             return self.calc_high_side_pr(base_price, tp_pct, is_long)
 
     def get_ttp_price(self, base_price, is_long):
@@ -69,7 +69,7 @@ class SLTPCalculator(object):
         elif self.exitmode == TradeExitMode.EXIT_MODE_SET_DYNAMIC_SLTP_WITH_ATR:
             atr_mult = self.ttp_pct
             ttp_pct = self.strategy.atr_tf_pct[0] * atr_mult
-            self.strategy.log("SLTPCalculator.get_ttp_price(): self.exitmode={}, atr_mult={}, ttp_pct={:.2f}%".format(self.exitmode, atr_mult, ttp_pct))
+            self.strategy.log("SLTPCalculator.get_ttp_price(): self.exitmode={}, atr_mult={}, ttp_pct={:.2f}%", self.exitmode, atr_mult, ttp_pct)
             return self.calc_low_side_pr(base_price, ttp_pct, is_long)
 
     def get_tb_price(self, is_long, base_price):
@@ -78,7 +78,7 @@ class SLTPCalculator(object):
         elif self.exitmode == TradeExitMode.EXIT_MODE_SET_DYNAMIC_SLTP_WITH_ATR:
             atr_mult = self.tb_dist_pct
             tb_dist_pct = self.strategy.atr_tf_pct[0] * atr_mult
-            self.strategy.log("SLTPCalculator.get_tb_price(): self.exitmode={}, atr_mult={}, tb_dist_pct={:.2f}%".format(self.exitmode, atr_mult, tb_dist_pct))
+            self.strategy.log("SLTPCalculator.get_tb_price(): self.exitmode={}, atr_mult={}, tb_dist_pct={:.2f}%", self.exitmode, atr_mult, tb_dist_pct)
             return self.calc_high_side_pr(base_price, tb_dist_pct, is_long)
 
     def get_price_move_delta_pct(self, price1, price2):
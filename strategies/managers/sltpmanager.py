@@ -47,37 +47,43 @@ class SLTPManager(object):
         if is_long:
             self.sl_order = self.strategy.generic_sell(tradeid=tradeid, size=sl_size, price=sl_price, exectype=bt.Order.Stop, oco=self.oco_context.get_tp_order())
             self.oco_context.set_sl_order(self.sl_order)
-            self.strategy.log('Submitted a new {} order (SELL STOP MARKET): self.oco_context={}, tradeid={}, sl_size={}, sl_price={}, sl_order.ref={}, sl_order.size={}, sl_order.price={}, sl_order.side={}'.format(
-                self.get_sl_type_str(), self.oco_context, tradeid, sl_size, sl_price, self.sl_order.ref, self.sl_order.size, self.sl_order.price, self.sl_order.ordtypename()))
+            if self.strategy.is_log_enabled():
+                self.strategy.log('Submitted a new {} order (SELL STOP MARKET): self.oco_context={}, tradeid={}, sl_size={}, sl_price={}, sl_order.ref={}, sl_order.size={}, sl_order.price={}, sl_order.side={}',
+                    self.get_sl_type_str(), self.oco_context, tradeid, sl_size, sl_price, self.sl_order.ref, self.sl_order.size, self.sl_order.price, self.sl_order.ordtypename())
         else:
             self.sl_order = self.strategy.generic_buy(tradeid=tradeid, size=sl_size, price=sl_price, exectype=bt.Order.Stop, oco=self.oco_context.get_tp_order())
             self.oco_context.set_sl_order(self.sl_order)
-            self.strategy.log('Submitted a new {} order (BUY STOP MARKET): self.oco_context={}, tradeid={}, sl_size={}, sl_price={}, sl_order.ref={}, sl_order.size={}, sl_order.price={}, sl_order.side={}'.format(
-                self.get_sl_type_str(), self.oco_context, tradeid, sl_size, sl_price, self.sl_order.ref, self.sl_order.size, self.sl_order.price, self.sl_order.ordtypename()))
+            if self.strategy.is_log_enabled():
+                self.strategy.log('Submitted a new {} order (BUY STOP MARKET): self.oco_context={}, tradeid={}, sl_size={}, sl_price={}, sl_order.ref={}, sl_order.size={}, sl_order.price={}, sl_order.side={}',
+                    self.get_sl_type_str(), self.oco_context, tradeid, sl_size, sl_price, self.sl_order.ref, self.sl_order.size, self.sl_order.price, self.sl_order.ordtypename())
 
     def submit_new_tp_order(self, is_long, tradeid, tp_size, tp_price):
         if is_long:
             self.tp_order = self.strategy.generic_sell(tradeid=tradeid, size=tp_size, price=tp_price, exectype=bt.Order.Limit, oco=self.oco_context.get_sl_order())
             self.oco_context.set_tp_order(self.tp_order)
-            self.strategy.log('Submitted a new TAKE-PROFIT order (SELL LIMIT): self.oco_context={}, tradeid={}, tp_size={}, tp_price={}, self.tp_order.ref={}, self.tp_order.size={}, self.tp_order.price={}, self.tp_order.side={}'.format(
-                self.oco_context, tradeid, tp_size, tp_price, self.tp_order.ref, self.tp_order.size, self.tp_order.price, self.tp_order.ordtypename()))
+            if self.strategy.is_log_enabled():
+                self.strategy.log('Submitted a new TAKE-PROFIT order (SELL LIMIT): self.oco_context={}, tradeid={}, tp_size={}, tp_price={}, self.tp_order.ref={}, self.tp_order.size={}, self.tp_order.price={}, self.tp_order.side={}',
+                    self.oco_context, tradeid, tp_size, tp_price, self.tp_order.ref, self.tp_order.size, self.tp_order.price, self.tp_order.ordtypename())
         else:
             self.tp_order = self.strategy.generic_buy(tradeid=tradeid, size=tp_size, price=tp_price, exectype=bt.Order.Limit, oco=self.oco_context.get_sl_order())
             self.oco_context.set_tp_order(self.tp_order)
-            self.strategy.log('Submitted a new TAKE-PROFIT order (BUY LIMIT): self.oco_context={}, tradeid={}, tp_size={}, tp_price={}, self.tp_order.ref={}, self.tp_order.size={}, self.tp_order.price={}, self.tp_order.side={}'.format(
-                self.oco_context, tradeid, tp_size, tp_price, self.tp_order.ref, self.tp_order.size, self.tp_order.price, self.tp_order.ordtypename()))
+            if self.strategy.is_log_enabled():
+                self.strategy.log('Submitted a new TAKE-PROFIT order (BUY LIMIT): self.oco_context={}, tradeid={}, tp_size={}, tp_price={}, self.tp_order.ref={}, self.tp_order.size={}, self.tp_order.price={}, self.tp_order.side={}',
+                    self.oco_context, tradeid, tp_size, tp_price, self.tp_order.ref, self.tp_order.size, self.tp_order.price, self.tp_order.ordtypename())
 
     def submit_new_ttp_order(self, is_long, tradeid, ttp_size, ttp_price):
         if is_long:
             self.tp_order = self.strategy.generic_sell(tradeid=tradeid, size=ttp_size, price=ttp_price, exectype=bt.Order.Stop, oco=self.oco_context.get_sl_order())
             self.oco_context.set_tp_order(self.tp_order)
-            self.strategy.log('Submitted a new TRAILING TAKE-PROFIT order (SELL STOP MARKET): self.oco_context={}, tradeid={}, ttp_size={}, ttp_price={}, self.tp_order.ref={}, self.tp_order.size={}, self.tp_order.price={}, self.tp_order.side={}'.format(
-                self.oco_context, tradeid, ttp_size, ttp_price, self.tp_order.ref, self.tp_order.size, self.tp_order.price, self.tp_order.ordtypename()))
+            if self.strategy.is_log_enabled():
+                self.strategy.log('Submitted a new TRAILING TAKE-PROFIT order (SELL STOP MARKET): self.oco_context={}, tradeid={}, ttp_size={}, ttp_price={}, self.tp_order.ref={}, self.tp_order.size={}, self.tp_order.price={}, self.tp_order.side={}',
+                    self.oco_context, tradeid, ttp_size, ttp_price, self.tp_order.ref, self.tp_order.size, self.tp_order.price, self.tp_order.ordtypename())
         else:
             self.tp_order = self.strategy.generic_buy(tradeid=tradeid, size=ttp_size, price=ttp_price, exectype=bt.Order.Stop, oco=self.oco_context.get_sl_order())
             self.oco_context.set_tp_order(self.tp_order)
-            self.strategy.log('Submitted a new TRAILING TAKE-PROFIT order (BUY STOP MARKET): self.oco_context={}, tradeid={}, ttp_size={}, ttp_price={}, self.tp_order.ref={}, self.tp_order.size={}, self.tp_order.price={}, self.tp_order.side={}'.format(
-                self.oco_context, tradeid, ttp_size, ttp_price, self.tp_order.ref, self.tp_order.size, self.tp_order.price, self.tp_order.ordtypename()))
+            if self.strategy.is_log_enabled():
+                self.strategy.log('Submitted a new TRAILING TAKE-PROFIT order (BUY STOP MARKET): self.oco_context={}, tradeid={}, ttp_size={}, ttp_price={}, self.tp_order.ref={}, self.tp_order.size={}, self.tp_order.price={}, self.tp_order.side={}',
+                    self.oco_context, tradeid, ttp_size, ttp_price, self.tp_order.ref, self.tp_order.size, self.tp_order.price, self.tp_order.ordtypename())
 
     def sl_oco_resubmit_order(self, old_order, is_long):
         if self.is_sl_enabled and self.is_sl_mode_activated():
@@ -103,8 +109,9 @@ class SLTPManager(object):
             self.is_sl_activated = True
             if self.is_tsl_enabled:
                 self.sl_trailed_price = pos_price
-            self.strategy.log("Activated {} mode for self.oco_context={}, self.tradeid={}, self.sl_order.ref={}, self.sl_order.size={}, self.sl_order.price={}, pos_price={}, pos_size={}, self.trailed_price={}, self.sl_price={}".format(
-                self.get_sl_type_str(), self.oco_context, self.tradeid, self.sl_order.ref, self.sl_order.size, self.sl_order.price, pos_price, pos_size, self.sl_trailed_price, self.sl_price))
+            if self.strategy.is_log_enabled():
+                self.strategy.log("Activated {} mode for self.oco_context={}, self.tradeid={}, self.sl_order.ref={}, self.sl_order.size={}, self.sl_order.price={}, pos_price={}, pos_size={}, self.trailed_price={}, self.sl_price={}",
+                    self.get_sl_type_str(), self.oco_context, self.tradeid, self.sl_order.ref, self.sl_order.size, self.sl_order.price, pos_price, pos_size, self.sl_trailed_price, self.sl_price)
 
     def activate_tp(self, tradeid, pos_price, pos_size, is_long):
         if self.is_tp_enabled and not self.is_tp_activated and not self.is_ttp_activated:
@@ -113,12 +120,12 @@ class SLTPManager(object):
             if not self.is_ttp_enabled:
                 self.submit_new_tp_order(is_long, self.tradeid, pos_size, self.tp_price)
                 self.is_tp_activated = True
-                self.strategy.log("Activated TAKE-PROFIT mode for self.oco_context={}, self.tradeid={}, self.tp_order.ref={}, self.tp_order.size={}, self.tp_order.price={}, pos_price={}, pos_size={}, self.tp_price={}".format(
-                    self.oco_context, self.tradeid, self.tp_order.ref, self.tp_order.size, self.tp_order.price, pos_price, pos_size, self.tp_price))
+                self.strategy.log("Activated TAKE-PROFIT mode for self.oco_context={}, self.tradeid={}, self.tp_order.ref={}, self.tp_order.size={}, self.tp_order.price={}, pos_price={}, pos_size={}, self.tp_price={}",
+                    self.oco_context, self.tradeid, self.tp_order.ref, self.tp_order.size, self.tp_order.price, pos_price, pos_size, self.tp_price)
             else:
                 self.is_tp_activated = True
-                self.strategy.log("Prepared for TRAILING TAKE-PROFIT mode for self.oco_context={}, self.tradeid={}, pos_price={}, pos_size={}, self.tp_price={}".format(
-                    self.oco_context, self.tradeid, pos_price, pos_size, self.tp_price))
+                self.strategy.log("Prepared for TRAILING TAKE-PROFIT mode for self.oco_context={}, self.tradeid={}, pos_price={}, pos_size={}, self.tp_price={}",
+                    self.oco_context, self.tradeid, pos_price, pos_size, self.tp_price)
 
     def activate_ttp(self, tradeid, pos_size, last_price, is_long):
         if self.is_tp_activated and not self.is_ttp_activated:
@@ -126,20 +133,22 @@ class SLTPManager(object):
             self.ttp_price = self.sltpcalculator.get_ttp_price(last_price, is_long)
             self.submit_new_ttp_order(is_long, tradeid, pos_size, self.ttp_price)
             self.is_ttp_activated = True
-            self.strategy.log("Activated TRAILING TAKE-PROFIT mode for self.oco_context={}, self.tradeid={}, self.tp_order.ref={}, self.tp_order.size={}, self.tp_order.price={}, pos_size={}, last_price={}, self.trailed_price={}, self.ttp_price={}".format(
-                self.oco_context, self.tradeid, self.tp_order.ref, self.tp_order.size, self.tp_order.price, pos_size, last_price, self.tp_trailed_price, self.ttp_price))
+            self.strategy.log("Activated TRAILING TAKE-PROFIT mode for self.oco_context={}, self.tradeid={}, self.tp_order.ref={}, self.tp_order.size={}, self.tp_order.price={}, pos_size={}, last_price={}, self.trailed_price={}, self.ttp_price={}",
+                self.oco_context, self.tradeid, self.tp_order.ref, self.tp_order.size, self.tp_order.price, pos_size, last_price, self.tp_trailed_price, self.ttp_price)
 
     def cancel_sl_order(self):
         if self.is_sl_mode_activated() and self.sl_order:
             self.strategy.cancel(self.sl_order)
-            self.strategy.log("Cancelled the current {} order: self.sl_order.ref={}, self.oco_context={}".format(self.get_sl_type_str(), self.sl_order.ref, self.oco_context))
+            if self.strategy.is_log_enabled():
+                self.strategy.log("Cancelled the current {} order: self.sl_order.ref={}, self.oco_context={}", self.get_sl_type_str(), self.sl_order.ref, self.oco_context)
             self.sl_order = None
             self.oco_context.set_sl_order(None)
 
     def cancel_tp_order(self):
         if self.is_tp_mode_activated() and self.tp_order:
             self.strategy.cancel(self.tp_order)
-            self.strategy.log("Cancelled the current {} order: self.tp_order.ref={}, self.oco_context={}".format(self.get_tp_type_str(), self.tp_order.ref, self.oco_context))
+            if self.strategy.is_log_enabled():
+                self.strategy.log("Cancelled the current {} order: self.tp_order.ref={}, self.oco_context={}", self.get_tp_type_str(), self.tp_order.ref, self.oco_context)
             self.tp_order = None
             self.oco_context.set_tp_order(None)
 
@@ -154,10 +163,10 @@ class SLTPManager(object):
     def resubmit_oco_order(self, old_oco_order, is_long):
         if old_oco_order and old_oco_order.ref:
             if self.oco_context.is_sl_order(old_oco_order):
-                self.strategy.log("Resubmitting the OCO (SL) order: old_oco_order.ref={}".format(old_oco_order.ref))
+                self.strategy.log("Resubmitting the OCO (SL) order: old_oco_order.ref={}", old_oco_order.ref)
                 self.sl_oco_resubmit_order(old_oco_order, is_long)
             if self.oco_context.is_tp_order(old_oco_order):
-                self.strategy.log("Resubmitting the OCO (TP) order: old_oco_order.ref={}".format(old_oco_order.ref))
+                self.strategy.log("Resubmitting the OCO (TP) order: old_oco_order.ref={}", old_oco_order.ref)
                 self.tp_oco_resubmit_order(old_oco_order, is_long)
 
     def move_tsl(self, last_price, is_long):
@@ -167,8 +176,8 @@ class SLTPManager(object):
         old_sl_price = self.sl_price
         self.sl_trailed_price = last_price
         self.sl_price = self.sltpcalculator.get_sl_price(last_price, is_long)
-        self.strategy.log("Moving TRAILING STOP-LOSS targets: self.oco_context={}, self.trailed_price={} -> {}, self.sl_price={} -> {}, last_price={}, sl_size={}, is_long={}".format(
-            self.oco_context, old_sl_trailed_price, self.sl_trailed_price, old_sl_price, self.sl_price, last_price, sl_size, is_long))
+        self.strategy.log("Moving TRAILING STOP-LOSS targets: self.oco_context={}, self.trailed_price={} -> {}, self.sl_price={} -> {}, last_price={}, sl_size={}, is_long={}",
+            self.oco_context, old_sl_trailed_price, self.sl_trailed_price, old_sl_price, self.sl_price, last_price, sl_size, is_long)
         self.cancel_sl_order()
         self.resubmit_oco_order(self.oco_context.get_tp_order(), is_long)
         self.submit_new_sl_order(is_long, self.tradeid, sl_size, self.sl_price)
@@ -181,8 +190,8 @@ class SLTPManager(object):
         old_ttp_price = self.ttp_price
         self.tp_trailed_price = last_price
         self.ttp_price = self.sltpcalculator.get_ttp_price(last_price, is_long)
-        self.strategy.log("Moving TRAILING TAKE-PROFIT targets: self.oco_context={}, self.trailed_price={} -> {}, self.ttp_price={} -> {}, last_price={}, ttp_size={}, is_long={}".format(
-            self.oco_context, old_tp_trailed_price, self.tp_trailed_price, old_ttp_price, self.ttp_price, last_price, ttp_size, is_long))
+        self.strategy.log("Moving TRAILING TAKE-PROFIT targets: self.oco_context={}, self.trailed_price={} -> {}, self.ttp_price={} -> {}, last_price={}, ttp_size={}, is_long={}",
+            self.oco_context, old_tp_trailed_price, self.tp_trailed_price, old_ttp_price, self.ttp_price, last_price, ttp_size, is_long)
         self.cancel_tp_order()
         self.resubmit_oco_order(self.oco_context.get_sl_order(), is_long)
         self.submit_new_ttp_order(is_long, self.tradeid, ttp_size, self.ttp_price)
@@ -195,8 +204,8 @@ class SLTPManager(object):
         old_sl_price = self.sl_price
         self.sl_trailed_price = last_price
         self.sl_price = self.sltpcalculator.get_sl_price(last_price, is_long)
-        self.strategy.log("Moving TRAILING STOP-LOSS targets: self.oco_context={}, self.trailed_price={} -> {}, self.sl_price={} -> {}, last_price={}, sl_size={}, is_long={}".format(
-            self.oco_context, old_sl_trailed_price, self.sl_trailed_price, old_sl_price, self.sl_price, last_price, sl_size, is_long))
+        self.strategy.log("Moving TRAILING STOP-LOSS targets: self.oco_context={}, self.trailed_price={} -> {}, self.sl_price={} -> {}, last_price={}, sl_size={}, is_long={}",
+            self.oco_context, old_sl_trailed_price, self.sl_trailed_price, old_sl_price, self.sl_price, last_price, sl_size, is_long)
         self.cancel_sl_order()
         self.submit_new_sl_order(is_long, self.tradeid, sl_size, self.sl_price)
         self.strategy_analyzers.ta.update_moved_tsl_counts_data(self.is_tsl_enabled)
@@ -206,8 +215,8 @@ class SLTPManager(object):
         old_ttp_price = self.ttp_price
         self.tp_trailed_price = last_price
         self.ttp_price = self.sltpcalculator.get_ttp_price(last_price, is_long)
-        self.strategy.log("Moving TRAILING TAKE-PROFIT targets: self.oco_context={}, self.trailed_price={} -> {}, self.ttp_price={} -> {}, last_price={}, ttp_size={}, is_long={}".format(
-            self.oco_context, old_tp_trailed_price, self.tp_trailed_price, old_ttp_price, self.ttp_price, last_price, ttp_size, is_long))
+        self.strategy.log("Moving TRAILING TAKE-PROFIT targets: self.oco_context={}, self.trailed_price={} -> {}, self.ttp_price={} -> {}, last_price={}, ttp_size={}, is_long={}",
+            self.oco_context, old_tp_trailed_price, self.tp_trailed_price, old_ttp_price, self.ttp_price, last_price, ttp_size, is_long)
         self.submit_new_ttp_order(is_long, self.tradeid, ttp_size, self.ttp_price)
         self.strategy_analyzers.ta.update_moved_ttp_counts_data(self.is_ttp_enabled)
 
@@ -217,7 +226,7 @@ class SLTPManager(object):
             last_price = self.strategy.data.close[0]
             tsl_move_pending = self.is_tsl_move_pending(last_price, is_long)
             ttp_move_pending = self.is_ttp_move_pending(last_price, is_long)
-            self.strategy.log("Move trailing targets flags: tsl_move_pending={}, ttp_move_pending={}".format(tsl_move_pending, ttp_move_pending))
+            self.strategy.log("Move trailing targets flags: tsl_move_pending={}, ttp_move_pending={}", tsl_move_pending, ttp_move_pending)
             if tsl_move_pending and not ttp_move_pending:
                 self.move_tsl(last_price, is_long)
             if not tsl_move_pending and ttp_move_pending:
@@ -239,15 +248,16 @@ class SLTPManager(object):
             if self.is_tp_activated and not self.is_ttp_activated:
                 if self.is_tp_reached(self.tp_price, last_price, is_long):
                     pos_size = self.strategy.position.size
-                    self.strategy.log("Price has reached TAKE-PROFIT target and activating TRAILING TAKE-PROFIT mode: self.tp_price={}, pos_size={}, last_price={}, is_long={}".format(
-                        self.tp_price, pos_size, last_price, is_long))
+                    self.strategy.log("Price has reached TAKE-PROFIT target and activating TRAILING TAKE-PROFIT mode: self.tp_price={}, pos_size={}, last_price={}, is_long={}",
+                        self.tp_price, pos_size, last_price, is_long)
                     self.activate_ttp(self.tradeid, pos_size, last_price, is_long)
                     return True
 
     def handle_order_completed(self, order):
         if order.status == order.Completed and self.sl_order and self.sl_order.ref == order.ref:
-            self.strategy.log("The {} order has been triggered and COMPLETED: self.oco_context={}, self.sl_order.ref={}, self.trailed_price={}, self.sl_price={}, order.price={}, order.size={}".format(
-                self.get_sl_type_str(), self.oco_context, self.sl_order.ref, self.sl_trailed_price, self.sl_price, order.price, order.size))
+            if self.strategy.is_log_enabled():
+                self.strategy.log("The {} order has been triggered and COMPLETED: self.oco_context={}, self.sl_order.ref={}, self.trailed_price={}, self.sl_price={}, order.price={}, order.size={}",
+                    self.get_sl_type_str(), self.oco_context, self.sl_order.ref, self.sl_trailed_price, self.sl_price, order.price, order.size)
             self.sl_order = None
             self.sl_deactivate()
             self.tp_order = None
@@ -256,8 +266,9 @@ class SLTPManager(object):
             return True
 
         if order.status == order.Completed and self.tp_order and self.tp_order.ref == order.ref:
-            self.strategy.log("The {} order has been triggered and COMPLETED: self.oco_context={}, self.tp_order.ref={}, self.trailed_price={}, self.tp_price={}, self.ttp_price={}, order.price={}, order.size={}".format(
-                self.get_tp_type_str(), self.oco_context, self.tp_order.ref, self.tp_trailed_price, self.tp_price, self.ttp_price, order.price, order.size))
+            if self.strategy.is_log_enabled():
+                self.strategy.log("The {} order has been triggered and COMPLETED: self.oco_context={}, self.tp_order.ref={}, self.trailed_price={}, self.tp_price={}, self.ttp_price={}, order.price={}, order.size={}",
+                    self.get_tp_type_str(), self.oco_context, self.tp_order.ref, self.tp_trailed_price, self.tp_price, self.ttp_price, order.price, order.size)
             self.sl_order = None
             self.sl_deactivate()
             self.tp_order = None
@@ -269,7 +280,8 @@ class SLTPManager(object):
     def sl_deactivate(self):
         if self.is_sl_enabled and self.is_sl_mode_activated():
             sl_order_ref = self.sl_order.ref if self.sl_order else None
-            self.strategy.log('SLTPManager.sl_deactivate() - {} will be deactivated, self.oco_context={}, self.sl_order.ref={}'.format(self.get_sl_type_str(), self.oco_context, sl_order_ref))
+            if self.strategy.is_log_enabled():
+                self.strategy.log('SLTPManager.sl_deactivate() - {} will be deactivated, self.oco_context={}, self.sl_order.ref={}', self.get_sl_type_str(), self.oco_context, sl_order_ref)
             self.cancel_sl_order()
             self.oco_context.reset()
             self.is_sl_activated = False
@@ -280,7 +292,8 @@ class SLTPManager(object):
     def tp_deactivate(self):
         if self.is_tp_enabled and self.is_tp_mode_activated():
             tp_order_ref = self.tp_order.ref if self.tp_order else None
-            self.strategy.log('SLTPManager.tp_deactivate() - {} will be deactivated, self.oco_context={}, self.tp_order.ref={}'.format(self.get_tp_type_str(), self.oco_context, tp_order_ref))
+            if self.strategy.is_log_enabled():
+                self.strategy.log('SLTPManager.tp_deactivate() - {} will be deactivated, self.oco_context={}, self.tp_order.ref={}', self.get_tp_type_str(), self.oco_context, tp_order_ref)
             self.cancel_tp_order()
             self.oco_context.reset()
             self.is_tp_activated = False
@@ -312,17 +325,17 @@ class SLTPManager(object):
 
     def log_state(self):
         if self.is_sl_enabled:
-            self.strategy.log('SLTPManager.sl_price = {}'.format(self.sl_price))
-            self.strategy.log('SLTPManager.sl_trailed_price = {}'.format(self.sl_trailed_price))
+            self.strategy.log('SLTPManager.sl_price = {}', self.sl_price)
+            self.strategy.log('SLTPManager.sl_trailed_price = {}', self.sl_trailed_price)
             ta_analysis = self.strategy.analyzers.ta.get_analysis()
             tsl_moved_count = ta_analysis.tsl.moved.count if self.exists(ta_analysis, ['tsl', 'moved', 'count']) else 0
-            self.strategy.log('TSL Moved Count = {}'.format(tsl_moved_count))
+            self.strategy.log('TSL Moved Count = {}', tsl_moved_count)
         if self.is_tp_enabled:
-            self.strategy.log('SLTPManager.tp_price = {}'.format(self.tp_price))
-            self.strategy.log('SLTPManager.tp_trailed_price = {}'.format(self.tp_trailed_price))
-            self.strategy.log('SLTPManager.ttp_price = {}'.format(self.ttp_price))
+            self.strategy.log('SLTPManager.tp_price = {}', self.tp_price)
+            self.strategy.log('SLTPManager.tp_trailed_price = {}', self.tp_trailed_price)
+            self.strategy.log('SLTPManager.ttp_price = {}', self.ttp_price)
             ta_analysis = self.strategy.analyzers.ta.get_analysis()
             ttp_moved_count = ta_analysis.ttp.moved.count if self.exists(ta_analysis, ['ttp', 'moved', 'count']) else 0
-            self.strategy.log('TTP Moved Count = {}'.format(ttp_moved_count))
+            self.strategy.log('TTP Moved Count = {}', ttp_moved_count)
         if self.is_sl_enabled or self.is_tp_enabled:
-            self.strategy.log('SLTPManager.oco_context = {}'.format(self.oco_context))
+            self.strategy.log('SLTPManager.oco_context = {}', self.oco_context)
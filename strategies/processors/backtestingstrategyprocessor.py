@@ -38,16 +38,16 @@ class BacktestingStrategyProcessor(BaseStrategyProcessor):
     def open_long_position(self, size=None):
         order_size = self.get_order_size() if not size else size
         order = self.strategy.generic_buy(tradeid=self.strategy.curtradeid, exectype=bt.Order.Market, size=order_size)
-        self.log("BUY MARKET base order submitted: order.ref={}, order.size={}, curtradeid={}".format(order.ref, order.size, self.strategy.curtradeid))
+        self.strategy.log("BUY MARKET base order submitted: order.ref={}, order.size={}, curtradeid={}", order.ref, order.size, self.strategy.curtradeid)
         return order
 
     def open_short_position(self, size=None):
         order_size = self.get_order_size() if not size else size
         order = self.strategy.generic_sell(tradeid=self.strategy.curtradeid, exectype=bt.Order.Market, size=order_size)
-        self.log("SELL MARKET base order submitted: order.ref={}, order.size={}, curtradeid={}".format(order.ref, order.size, self.strategy.curtradeid))
+        self.strategy.log("SELL MARKET base order submitted: order.ref={}, order.size={}, curtradeid={}", order.ref, order.size, self.strategy.curtradeid)
         return order
 
     def close_position(self):
         order = self.strategy.generic_close(tradeid=self.strategy.curtradeid)
-        self.log("Closed position by MARKET order: order.ref={}, curtradeid={}".format(order.ref, self.strategy.curtradeid))
+        self.strategy.log("Closed position by MARKET order: order.ref={}, curtradeid={}", order.ref, self.strategy.curtradeid)
         return order
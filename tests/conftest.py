@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The tools are run from the repository root, which is where their imports are resolved from
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
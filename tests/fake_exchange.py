@@ -0,0 +1,36 @@
+from ccxt.base.errors import NetworkError
+
+
+class FakeExchange(object):
+    '''A local stand-in of a ``ccxt.async_support`` exchange serving the 1m candles of one symbol
+    from ``first_ms`` until ``end_ms`` (exclusive). The candles are made up from their timestamp.
+
+    ``fail_after`` makes every request after the first ``fail_after`` ones raise, as an interrupted
+    download would.
+    '''
+
+    TIMEFRAME_SECONDS = {"1m": 60, "5m": 300, "1h": 3600}
+
+    def __init__(self, first_ms, end_ms, fail_after=None, error=NetworkError):
+        self.first_ms = first_ms
+        self.end_ms = end_ms
+        self.fail_after = fail_after
+        self.error = error
+        self.requests = []
+
+    @classmethod
+    def get_candle(cls, timestamp_ms):
+        price = float(timestamp_ms // 60000 % 1000)
+        return [timestamp_ms, price, price + 2, price - 1, price + 1, 10.0]
+
+    def parse_timeframe(self, timeframe):
+        return self.TIMEFRAME_SECONDS[timeframe]
+
+    async def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        self.requests.append(since)
+        if self.fail_after is not None and len(self.requests) > self.fail_after:
+            raise self.error("Connection lost")
+        timeframe_ms = self.parse_timeframe(timeframe) * 1000
+        since = max(since, self.first_ms)
+        start_ms = since + (-(since - self.first_ms)) % timeframe_ms
+        return [self.get_candle(ts) for ts in range(start_ms, min(self.end_ms, start_ms + limit * timeframe_ms), timeframe_ms)]
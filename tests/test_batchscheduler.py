@@ -0,0 +1,82 @@
+from model.resultsstore import CsvResultsStore, ParquetResultsStore
+from optimization.batchscheduler import BatchManifest, BatchScheduler
+import pytest
+
+HEADER = ["Strategy ID", "Currency Pair", "Net Profit"]
+
+
+class FakeStep(object):
+    '''Writes the run results of a job as rows of a results store, failing after ``fail_after`` rows.'''
+
+    def __init__(self, store, fail_after=None):
+        self._store = store
+        self._fail_after = fail_after
+
+    def get_results_stores(self):
+        return [self._store]
+
+    def save_results(self, wfo_cycles, wfo_cycle_info, run_results, args):
+        self._store.set_header(HEADER)
+        for idx, row in enumerate(run_results):
+            if self._fail_after is not None and idx == self._fail_after:
+                raise KeyboardInterrupt()
+            self._store.append([row])
+            self._store.flush()
+        self._store.close()
+
+
+class FakeJob(object):
+    def __init__(self, key, step):
+        self.key = key
+        self.step = step
+        self.wfo_cycles = None
+        self.wfo_cycle_info = None
+        self.args = None
+
+
+def get_rows(pair, num_rows):
+    return [["S001", pair, float(i)] for i in range(num_rows)]
+
+
+@pytest.fixture(params=["csv", "parquet"])
+def store_class(request):
+    if request.param == "parquet":
+        pytest.importorskip("pyarrow")
+        return ParquetResultsStore
+    return CsvResultsStore
+
+
+def test_interrupted_job_results_are_removed_on_resume(tmp_path, store_class):
+    results_filename = str(tmp_path / "run_Step1.csv")
+    manifest_filename = str(tmp_path / "run_BatchManifest.json")
+    scheduler = BatchScheduler(1, BatchManifest(manifest_filename))
+    scheduler.save_job_results(FakeJob("job1", FakeStep(store_class(results_filename))), get_rows("BTCUSDT", 3))
+    with pytest.raises(KeyboardInterrupt):
+        scheduler.save_job_results(FakeJob("job2", FakeStep(store_class(results_filename), fail_after=2)), get_rows("ETHUSDT", 3))
+
+    manifest = BatchManifest(manifest_filename)
+    assert manifest.is_completed("job1")
+    assert not manifest.is_completed("job2")
+    assert manifest.get_writing()["job"] == "job2"
+
+    BatchScheduler(1, manifest).rollback_interrupted_job()
+
+    df = store_class(results_filename).read(HEADER[:2])
+    assert list(df.index) == [("S001", "BTCUSDT")] * 3
+    assert BatchManifest(manifest_filename).get_writing() is None
+
+
+def test_interrupted_first_job_results_are_removed_on_resume(tmp_path, store_class):
+    results_filename = str(tmp_path / "run_Step1.csv")
+    manifest_filename = str(tmp_path / "run_BatchManifest.json")
+    scheduler = BatchScheduler(1, BatchManifest(manifest_filename))
+    with pytest.raises(KeyboardInterrupt):
+        scheduler.save_job_results(FakeJob("job1", FakeStep(store_class(results_filename), fail_after=1)), get_rows("BTCUSDT", 3))
+
+    BatchScheduler(1, BatchManifest(manifest_filename)).rollback_interrupted_job()
+    # The job is written again from scratch, header included
+    BatchScheduler(1, BatchManifest(manifest_filename)).save_job_results(FakeJob("job1", FakeStep(store_class(results_filename))), get_rows("BTCUSDT", 2))
+
+    df = store_class(results_filename).read(HEADER[:2])
+    assert list(df["Net Profit"]) == [0.0, 1.0]
+    assert BatchManifest(manifest_filename).is_completed("job1")
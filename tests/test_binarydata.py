@@ -0,0 +1,98 @@
+from datetime import date, datetime, timedelta
+from extensions.analyzers.drawdown import TVNetProfitDrawDown
+from extensions.analyzers.tradeanalyzer import TVTradeAnalyzer
+from extensions.feeds.binarydata import MarketDataBinaryCache, BinaryOHLCVData, WindowedFeedFactory
+from extensions.sizers.cashsizer import FixedCashSizer
+from strategies.S011_emacrossover import S011_EMACrossOverStrategy
+import backtrader as bt
+import backtrader.feeds as btfeeds
+import numpy as np
+import pytest
+
+FIRST_DATE = datetime(2018, 1, 1)
+NUM_BARS = 24 * 200
+
+
+@pytest.fixture(scope="module")
+def csv_filename(tmp_path_factory):
+    '''A CSV file written by the downloader, converted into the binary cache by the first feed.'''
+    filename = str(tmp_path_factory.mktemp("marketdata") / "binance-BTCUSDT-1h.csv")
+    first_timestamp = int((FIRST_DATE - datetime(1970, 1, 1)).total_seconds())
+    rng = np.random.default_rng(5)
+    close = 8000 * np.exp(np.cumsum(rng.normal(0, 0.008, NUM_BARS)))
+    ohlcv = np.array([close * 0.999, close * 1.002, close * 0.998, close, rng.uniform(1, 100, NUM_BARS)])
+    with open(filename, 'wb') as f:
+        f.write(MarketDataBinaryCache.format_csv(first_timestamp + 3600 * np.arange(NUM_BARS), ohlcv, True))
+    return filename
+
+
+def get_csv_feed(csv_filename, fromdate, todate):
+    '''The feed the steps used to build before the binary cache.'''
+    return btfeeds.GenericCSVData(dataname=csv_filename, fromdate=fromdate, todate=todate, timeframe=bt.TimeFrame.Minutes, compression=60,
+                                  dtformat="%Y-%m-%dT%H:%M:%S", datetime=0, open=1, high=2, low=3, close=4, volume=5, openinterest=-1)
+
+
+def load_bars(data):
+    cerebro = bt.Cerebro(preload=True, stdstats=False)
+    cerebro.adddata(data)
+    cerebro.addstrategy(bt.Strategy)
+    cerebro.run()
+    return [bt.num2date(dtnum) for dtnum in data.datetime.array], list(data.close.array)
+
+
+@pytest.mark.parametrize("fromdate, todate", [
+    (date(2018, 2, 1), date(2018, 5, 31)),
+    (datetime(2018, 2, 1, 5), datetime(2018, 5, 31, 12)),
+    (date(2018, 2, 1), datetime(2018, 5, 31, 12)),
+])
+def test_binary_feed_matches_csv_feed(csv_filename, fromdate, todate):
+    expected_datetimes, expected_closes = load_bars(get_csv_feed(csv_filename, fromdate, todate))
+
+    datetimes, closes = load_bars(BinaryOHLCVData.from_csv_cache(csv_filename, fromdate=fromdate, todate=todate,
+                                                                  timeframe=bt.TimeFrame.Minutes, compression=60))
+
+    assert len(datetimes) == len(expected_datetimes)
+    assert (datetimes[0], datetimes[-1]) == (expected_datetimes[0], expected_datetimes[-1])
+    assert closes == expected_closes
+
+
+def test_date_todate_includes_the_whole_day(csv_filename):
+    datetimes, _ = load_bars(BinaryOHLCVData.from_csv_cache(csv_filename, fromdate=date(2018, 2, 1), todate=date(2018, 5, 31),
+                                                             timeframe=bt.TimeFrame.Minutes, compression=60))
+
+    assert datetimes[-1] == datetime(2018, 5, 31, 23)
+
+
+def test_windowed_feed_matches_csv_feed_of_the_padded_range(csv_filename):
+    fromdate, todate = date(2018, 3, 1), date(2018, 5, 31)
+    expected_datetimes, expected_closes = load_bars(get_csv_feed(csv_filename, fromdate - timedelta(days=50), todate + timedelta(days=2)))
+
+    datetimes, closes = load_bars(WindowedFeedFactory.build(csv_filename, fromdate, todate, bt.TimeFrame.Minutes, 60))
+
+    assert (len(datetimes), datetimes[0], datetimes[-1]) == (len(expected_datetimes), expected_datetimes[0], expected_datetimes[-1])
+    assert closes == expected_closes
+
+
+def run_strategy(data, fromdate, todate):
+    cerebro = bt.Cerebro(preload=True, cheat_on_open=True, optreturn=False, stdstats=False)
+    cerebro.broker.setcash(1500)
+    cerebro.broker.setcommission(0.0003)
+    cerebro.addanalyzer(TVNetProfitDrawDown, _name="dd", initial_cash=1500)
+    cerebro.addanalyzer(TVTradeAnalyzer, _name="ta", cash=1500)
+    cerebro.addsizer(FixedCashSizer, lotsize=1470, commission=0.0003, risk=0.02)
+    cerebro.adddata(data)
+    cerebro.addstrategy(S011_EMACrossOverStrategy, debug=False, startcash=1500, fromyear=fromdate.year, toyear=todate.year,
+                        frommonth=fromdate.month, tomonth=todate.month, fromday=fromdate.day, today=todate.day, wfo_cycle_id=1,
+                        needlong=True, needshort=True, ema_ratio=0.1, slow_ema_period=60, exitmode=1, sl=2, tslflag=False,
+                        tp=3, ttpdist=0, tbdist=0, numdca=0, dcainterval=0)
+    analysis = cerebro.run()[0].analyzers.ta.get_analysis()
+    return (analysis.total.closed, analysis.total.barsnumber, analysis.total.buyandholdreturnpct, analysis.len.tradebarsratio_pct,
+            analysis.pnl.netprofit.total)
+
+
+@pytest.mark.parametrize("fromdate, todate", [(date(2018, 3, 1), date(2018, 5, 31)), (date(2018, 6, 1), date(2018, 6, 30))],
+                         ids=["training", "testing"])
+def test_windowed_feed_results_match_csv_feed(csv_filename, fromdate, todate):
+    expected = run_strategy(get_csv_feed(csv_filename, fromdate - timedelta(days=50), todate + timedelta(days=2)), fromdate, todate)
+
+    assert run_strategy(WindowedFeedFactory.build(csv_filename, fromdate, todate, bt.TimeFrame.Minutes, 60), fromdate, todate) == expected
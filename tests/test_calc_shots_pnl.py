@@ -0,0 +1,78 @@
+from scalping.calc_shots_pnl import ShotsPnlCalculator, MAX_TP_TO_SHOT_RATIO, MIN_RR_RATIO
+import scalping.calc_shots_pnl as calc_shots_pnl
+import numpy as np
+import pandas as pd
+import pytest
+import itertools
+
+
+def get_filtered_combinations(is_moonbot, simulation_params):
+    '''The combinations the calculator used to keep: the itertools.product of the parameter values,
+    skipping the ones that fail the distance/buffer, MAX_TP_TO_SHOT_RATIO and MIN_RR_RATIO checks.'''
+    vals = [np.atleast_1d(v).tolist() for v in simulation_params.values()]
+    combinations = []
+    for first_param, second_param, c_tp, c_sl in itertools.product(*vals):
+        if is_moonbot:
+            if second_param <= first_param:
+                continue
+            if c_tp > (second_param / MAX_TP_TO_SHOT_RATIO):
+                continue
+        else:
+            if first_param <= second_param / 2:
+                continue
+            if c_tp > ((first_param + second_param / 2) / MAX_TP_TO_SHOT_RATIO):
+                continue
+        if c_sl / c_tp < MIN_RR_RATIO:
+            continue
+        combinations.append((first_param, second_param, c_tp, c_sl))
+    return combinations
+
+
+@pytest.mark.parametrize("is_moonbot", [True, False])
+@pytest.mark.parametrize("is_future", [True, False])
+@pytest.mark.parametrize("max_shot_depth", [0.45, 1.2, 2.5])
+def test_simulation_grid_matches_filtered_product(is_moonbot, is_future, max_shot_depth):
+    calculator = ShotsPnlCalculator()
+    shot_depth_list = [0.3, max_shot_depth, max_shot_depth + 0.5]
+    shot_count_list = [4, 2, 0]
+    simulation_params = calculator.get_simulation_params(is_moonbot, is_future, shot_depth_list, shot_count_list)
+
+    grid = calculator.get_sim_combinations(is_moonbot, is_future, shot_depth_list, shot_count_list)
+    param_arrays = grid.get_param_arrays(np.arange(len(grid)))
+
+    expected = get_filtered_combinations(is_moonbot, simulation_params)
+    assert len(grid) == len(expected)
+    assert list(zip(*[a.tolist() for a in param_arrays])) == expected
+
+
+def get_shots(seed):
+    '''Shot groups and shots, as process_shots takes them.'''
+    rng = np.random.default_rng(seed)
+    shot_depths = np.round(rng.uniform(0.5, 1.6, 40), 2)
+    shot_bounces = np.round(shot_depths * rng.uniform(0.1, 0.6, 40), 2)
+    groups_df = pd.DataFrame({"real_shot_depth": [0.5, 1.0, 1.5], "counts": [0, 0, 0]})
+    shots_data_dict = {depth: [] for depth in groups_df["real_shot_depth"]}
+    for shot_depth, shot_bounce in zip(shot_depths.tolist(), shot_bounces.tolist()):
+        group_idx = int(np.argmin(np.abs(groups_df["real_shot_depth"].values - shot_depth)))
+        groups_df.loc[group_idx, "counts"] += 1
+        shots_data_dict[groups_df["real_shot_depth"][group_idx]].append({'shot_depth': shot_depth, 'shot_bounce': shot_bounce})
+    return list(shot_depths), groups_df, shots_data_dict
+
+
+@pytest.mark.parametrize("is_moonbot", [True, False])
+@pytest.mark.parametrize("seed", [1, 2])
+def test_refined_rows_equal_rows_of_full_run(monkeypatch, is_moonbot, seed):
+    monkeypatch.setattr(calc_shots_pnl, "WORKING_MODE", calc_shots_pnl.WORKING_MODE_BEST_PNL_SIMULATION)
+    shots_list, groups_df, shots_data_dict = get_shots(seed)
+    calculator = ShotsPnlCalculator()
+    params_columns = ['MShotPriceMin', 'MShotPrice', 'TP', 'SL'] if is_moonbot else ['Distance', 'Buffer', 'TP', 'SL']
+
+    full_df = calculator.process_shots(is_moonbot, False, shots_list, groups_df, shots_data_dict)
+    monkeypatch.setattr(calc_shots_pnl, "SIMULATION_ADAPTIVE_REFINEMENT_FLAG", True)
+    refined_df = calculator.process_shots(is_moonbot, False, shots_list, groups_df, shots_data_dict)
+
+    assert 0 < len(refined_df) < len(full_df)
+    matching_df = full_df.merge(refined_df[params_columns], on=params_columns)
+    assert len(matching_df) == len(refined_df)
+    pd.testing.assert_frame_equal(refined_df.sort_values(params_columns).reset_index(drop=True),
+                                  matching_df.sort_values(params_columns).reset_index(drop=True))
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+from extensions.analyzers.drawdown import TVNetProfitDrawDown
+from extensions.analyzers.tradeanalyzer import TVTradeAnalyzer
+from extensions.feeds.binarydata import MarketDataBinaryCache, WindowedFeedFactory
+from extensions.sizers.cashsizer import FixedCashSizer
+from optimization.screening import GridScreener
+from strategies.S011_emacrossover import S011_EMACrossOverStrategy
+from strategies.managers.fastexitsimulator import FastExitSimulator, TRADE_SKIPPED
+import backtrader as bt
+import numpy as np
+import pytest
+
+STARTCASH = 1500
+LOTSIZE = 1470
+COMMISSION = 0.0003
+RISK = 0.02
+FROMDATE = datetime(2021, 5, 1)
+TODATE = datetime(2021, 6, 20)
+
+BASE_PARAMS = dict(debug=False, startcash=STARTCASH, fromyear=2021, toyear=2021, frommonth=5, tomonth=6, fromday=1, today=20,
+                   wfo_cycle_id=1, needlong=True, needshort=True, ema_ratio=0.1, slow_ema_period=60,
+                   exitmode=1, sl=0, tslflag=False, tp=0, ttpdist=0, tbdist=0, numdca=0, dcainterval=0)
+
+EXIT_MODES = [dict(), dict(sl=2), dict(sl=2, tp=3), dict(sl=2, tslflag=True), dict(tp=3, ttpdist=1), dict(tbdist=1),
+              dict(numdca=2, dcainterval=2, tp=3), dict(exitmode=3, sl=2, tp=3)]
+
+
+@pytest.fixture(scope="module")
+def csv_filename(tmp_path_factory):
+    '''Hourly candles of a random walk around 25000, from the warm-up period to after the look-ahead period.'''
+    filename = str(tmp_path_factory.mktemp("marketdata") / "binance-BTCUSDT-1h.csv")
+    first_date = FROMDATE - WindowedFeedFactory.WARMUP_PERIOD
+    first_timestamp = int((first_date - datetime(1970, 1, 1)).total_seconds())
+    num_bars = int((TODATE + WindowedFeedFactory.LOOKAHEAD_PERIOD + timedelta(days=1) - first_date).total_seconds()) // 3600
+    rng = np.random.default_rng(11)
+    close = 25000 * np.exp(np.cumsum(rng.normal(0, 0.008, num_bars)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.004, num_bars)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.004, num_bars)))
+    volume = rng.uniform(100, 1000, num_bars)
+    MarketDataBinaryCache.rewrite(filename, first_timestamp + 3600 * np.arange(num_bars), np.array([open_, high, low, close, volume]))
+    return filename
+
+
+def get_cerebro(csv_filename):
+    cerebro = bt.Cerebro(preload=True, cheat_on_open=True, optreturn=False)
+    cerebro.broker.setcash(STARTCASH)
+    cerebro.addanalyzer(TVNetProfitDrawDown, _name="dd", initial_cash=STARTCASH)
+    cerebro.addanalyzer(TVTradeAnalyzer, _name="ta", cash=STARTCASH)
+    cerebro.addsizer(FixedCashSizer, lotsize=LOTSIZE, commission=COMMISSION, risk=RISK)
+    cerebro.broker.setcommission(COMMISSION)
+    cerebro.adddata(WindowedFeedFactory.build(csv_filename, FROMDATE, TODATE, bt.TimeFrame.Minutes, 60))
+    return cerebro
+
+
+def run_engine(csv_filename, params):
+    cerebro = get_cerebro(csv_filename)
+    cerebro.addstrategy(S011_EMACrossOverStrategy, **params)
+    analysis = cerebro.run()[0].analyzers.ta.get_analysis()
+    netprofit = analysis.pnl.netprofit.total if 'pnl' in analysis else 0
+    return analysis.total.closed, netprofit
+
+
+@pytest.mark.parametrize("exit_mode", EXIT_MODES, ids=lambda exit_mode: "-".join(exit_mode) or "signals")
+def test_screener_matches_engine(csv_filename, exit_mode):
+    params = dict(BASE_PARAMS, **exit_mode)
+    closed, netprofit = run_engine(csv_filename, params)
+
+    result = GridScreener(get_cerebro(csv_filename), S011_EMACrossOverStrategy, 0, LOTSIZE, COMMISSION, RISK).screen([params])[0]
+
+    assert result.closed == closed
+    assert result.netprofit == pytest.approx(netprofit, abs=1e-6)
+
+
+def test_dca_trade_closed_beyond_date_range(csv_filename):
+    '''A DCA-MODE trade still open at the end of the date range is closed: the engine counts it as a closed trade,
+    but leaves its P/L out of the results.'''
+    params = dict(BASE_PARAMS, numdca=2, dcainterval=2, tp=3)
+    screener = GridScreener(get_cerebro(csv_filename), S011_EMACrossOverStrategy, 0, LOTSIZE, COMMISSION, RISK)
+    screener.screen([params])
+    simulated_trades = FastExitSimulator(0, LOTSIZE, COMMISSION, RISK).run(screener.record_signals(params), params)
+    closed, netprofit = run_engine(csv_filename, params)
+
+    assert np.count_nonzero(simulated_trades.trades[:, TRADE_SKIPPED]) == 1
+    assert len(simulated_trades) == closed
+    assert len(simulated_trades.get_netprofits()) == closed - 1
+    assert simulated_trades.get_netprofits().sum() == pytest.approx(netprofit, abs=1e-6)
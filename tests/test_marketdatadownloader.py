@@ -0,0 +1,100 @@
+from common.marketdatadownloader import MarketDataDownloader, DownloadCheckpoint, to_store_timestamps
+from extensions.feeds.binarydata import MarketDataBinaryCache
+from fake_exchange import FakeExchange
+from ccxt.base.errors import NetworkError
+import numpy as np
+import asyncio
+import pytest
+
+MINUTE_MS = 60000
+FIRST_MS = 1577836800000  # 2020-01-01 00:00 UTC
+LIMIT = 10
+
+
+def get_downloader(exchange, csv_filename, concurrency=1):
+    return MarketDataDownloader(exchange, "BTC/USDT", "1m", csv_filename, 0, concurrency=concurrency, limit=LIMIT, retries=1)
+
+
+def get_expected(first_ms, end_ms):
+    rows = np.array([FakeExchange.get_candle(ts) for ts in range(first_ms, end_ms, MINUTE_MS)])
+    return to_store_timestamps(rows[:, 0].astype(np.int64)), rows[:, 1:6].T
+
+
+def assert_stored(csv_filename, first_ms, end_ms):
+    cache = MarketDataBinaryCache.load(csv_filename)
+    timestamps, ohlcv = get_expected(first_ms, end_ms)
+    np.testing.assert_array_equal(cache.timestamps, timestamps)
+    np.testing.assert_array_equal(cache.ohlcv, ohlcv)
+
+
+@pytest.fixture
+def csv_filename(tmp_path):
+    return str(tmp_path / "binance-BTCUSDT-1m.csv")
+
+
+def test_download(csv_filename):
+    end_ms = FIRST_MS + 450 * MINUTE_MS
+    exchange = FakeExchange(FIRST_MS, end_ms)
+
+    num_chunks = asyncio.run(get_downloader(exchange, csv_filename, concurrency=3).download(FIRST_MS - 60 * MINUTE_MS, end_ms))
+
+    assert num_chunks == 5
+    assert_stored(csv_filename, FIRST_MS, end_ms)
+    assert DownloadCheckpoint(csv_filename).load() is None
+
+
+def test_interrupted_download_resumes(csv_filename):
+    end_ms = FIRST_MS + 450 * MINUTE_MS
+    # The probe of the first candle and the requests of the first two chunks succeed
+    failing_exchange = FakeExchange(FIRST_MS, end_ms, fail_after=1 + 2 * MarketDataDownloader.CHUNK_NUM_REQUESTS)
+    with pytest.raises(NetworkError):
+        asyncio.run(get_downloader(failing_exchange, csv_filename).download(FIRST_MS, end_ms))
+
+    state = DownloadCheckpoint(csv_filename).load()
+    assert state["appended_until_ms"] == FIRST_MS + 200 * MINUTE_MS
+    assert_stored(csv_filename, FIRST_MS, FIRST_MS + 200 * MINUTE_MS)
+
+    exchange = FakeExchange(FIRST_MS, end_ms)
+    num_chunks = asyncio.run(get_downloader(exchange, csv_filename).download(FIRST_MS, end_ms))
+
+    assert num_chunks == 3
+    assert min(exchange.requests[1:]) == FIRST_MS + 200 * MINUTE_MS
+    assert_stored(csv_filename, FIRST_MS, end_ms)
+    assert DownloadCheckpoint(csv_filename).load() is None
+
+
+def test_update_appends_newer_candles(csv_filename):
+    end_ms = FIRST_MS + 150 * MINUTE_MS
+    asyncio.run(get_downloader(FakeExchange(FIRST_MS, end_ms), csv_filename).download(FIRST_MS, end_ms))
+
+    new_end_ms = end_ms + 30 * MINUTE_MS
+    exchange = FakeExchange(FIRST_MS, new_end_ms)
+    asyncio.run(get_downloader(exchange, csv_filename).update(FIRST_MS, new_end_ms))
+
+    # Only the last stored candle is requested again
+    assert min(exchange.requests) == end_ms - MINUTE_MS
+    assert_stored(csv_filename, FIRST_MS, new_end_ms)
+
+
+def test_update_up_to_date(csv_filename):
+    end_ms = FIRST_MS + 50 * MINUTE_MS
+    asyncio.run(get_downloader(FakeExchange(FIRST_MS, end_ms), csv_filename).download(FIRST_MS, end_ms))
+
+    exchange = FakeExchange(FIRST_MS, end_ms)
+    assert asyncio.run(get_downloader(exchange, csv_filename).update(FIRST_MS, end_ms)) == 0
+    assert exchange.requests == []
+
+
+def test_download_with_other_checkpoint_keeps_stored_candles(csv_filename):
+    end_ms = FIRST_MS + 150 * MINUTE_MS
+    asyncio.run(get_downloader(FakeExchange(FIRST_MS, end_ms), csv_filename).download(FIRST_MS, end_ms))
+    # A checkpoint left over by a download of another range
+    DownloadCheckpoint(csv_filename).save({"start_ms": FIRST_MS + 20 * MINUTE_MS, "end_ms": end_ms, "chunk_length_ms": 1000 * MINUTE_MS,
+                                           "appended_until_ms": FIRST_MS + 40 * MINUTE_MS})
+
+    new_end_ms = end_ms + 30 * MINUTE_MS
+    exchange = FakeExchange(FIRST_MS, new_end_ms)
+    asyncio.run(get_downloader(exchange, csv_filename).download(FIRST_MS, new_end_ms))
+
+    assert min(exchange.requests[1:]) == end_ms - MINUTE_MS
+    assert_stored(csv_filename, FIRST_MS, new_end_ms)
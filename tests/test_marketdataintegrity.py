@@ -0,0 +1,96 @@
+from common.marketdatadownloader import MarketDataDownloader, MarketDataIntegrityChecker, from_store_timestamps, to_store_timestamps
+from extensions.feeds.binarydata import MarketDataBinaryCache
+from fake_exchange import FakeExchange
+import pandas as pd
+import numpy as np
+import asyncio
+import time
+import pytest
+
+MINUTE_MS = 60000
+DST_END_MS = 1603587600000  # 2020-10-25 01:00 UTC: 03:00 CEST -> 02:00 CET in Berlin
+DST_START_MS = 1585443600000  # 2020-03-29 01:00 UTC: 02:00 CET -> 03:00 CEST in Berlin
+
+
+@pytest.fixture(autouse=True)
+def local_timezone(monkeypatch):
+    monkeypatch.setenv("TZ", "Europe/Berlin")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+@pytest.fixture
+def csv_filename(tmp_path):
+    return str(tmp_path / "binance-BTCUSDT-1m.csv")
+
+
+def get_downloader(exchange, csv_filename):
+    return MarketDataDownloader(exchange, "BTC/USDT", "1m", csv_filename, 0, limit=10, retries=1)
+
+
+def write_candles(csv_filename, timestamps_ms):
+    rows = np.array([FakeExchange.get_candle(ts) for ts in timestamps_ms])
+    MarketDataBinaryCache.rewrite(csv_filename, to_store_timestamps(rows[:, 0].astype(np.int64)), rows[:, 1:6].T)
+
+
+def read_utc_timestamps_ms(csv_filename):
+    df = pd.read_csv(csv_filename)
+    return from_store_timestamps(pd.to_datetime(df["Timestamp"]).values.astype('datetime64[s]').astype(np.int64))
+
+
+def test_store_timestamps_round_trip_over_dst_end():
+    timestamps_ms = np.arange(DST_END_MS - 90 * MINUTE_MS, DST_END_MS + 90 * MINUTE_MS, MINUTE_MS)
+    store_timestamps = to_store_timestamps(timestamps_ms)
+
+    # The wall clock repeats the hour
+    assert len(np.unique(store_timestamps)) == len(timestamps_ms) - 60
+    np.testing.assert_array_equal(from_store_timestamps(store_timestamps), timestamps_ms)
+
+
+@pytest.mark.parametrize("dst_change_ms", [DST_END_MS, DST_START_MS])
+def test_check_over_dst_change(csv_filename, dst_change_ms):
+    write_candles(csv_filename, range(dst_change_ms - 120 * MINUTE_MS, dst_change_ms + 120 * MINUTE_MS, MINUTE_MS))
+
+    report = MarketDataIntegrityChecker(csv_filename, 60).check()
+
+    assert (report.num_candles, report.num_duplicates, report.num_unordered, report.gaps) == (240, 0, 0, [])
+
+
+def test_check_finds_duplicates_and_gaps(csv_filename):
+    timestamps_ms = list(range(DST_END_MS - 120 * MINUTE_MS, DST_END_MS + 120 * MINUTE_MS, MINUTE_MS))
+    write_candles(csv_filename, timestamps_ms[:130] + timestamps_ms[129:140] + timestamps_ms[150:])
+
+    report = MarketDataIntegrityChecker(csv_filename, 60).check()
+
+    assert report.num_duplicates == 1
+    assert report.num_unordered == 0
+    assert report.gaps == [(timestamps_ms[140] // 1000, timestamps_ms[149] // 1000, 10)]
+
+
+def test_repair_over_dst_end(csv_filename):
+    first_ms = DST_END_MS - 120 * MINUTE_MS
+    end_ms = DST_END_MS + 120 * MINUTE_MS
+    timestamps_ms = list(range(first_ms, end_ms, MINUTE_MS))
+    # Candles missing from both passes of the repeated hour, and a duplicate
+    write_candles(csv_filename, timestamps_ms[:70] + timestamps_ms[80:130] + timestamps_ms[129:140] + timestamps_ms[150:])
+
+    asyncio.run(get_downloader(FakeExchange(first_ms, end_ms), csv_filename).repair())
+
+    np.testing.assert_array_equal(read_utc_timestamps_ms(csv_filename), timestamps_ms)
+    report = MarketDataIntegrityChecker(csv_filename, 60).check()
+    assert (report.num_duplicates, report.num_unordered, report.gaps) == (0, 0, [])
+
+
+def test_download_and_update_over_dst_end(csv_filename):
+    first_ms = DST_END_MS - 120 * MINUTE_MS
+    end_ms = DST_END_MS + 120 * MINUTE_MS
+    # The first download stops in the middle of the repeated hour
+    asyncio.run(get_downloader(FakeExchange(first_ms, end_ms), csv_filename).download(first_ms, DST_END_MS + 30 * MINUTE_MS))
+    asyncio.run(get_downloader(FakeExchange(first_ms, end_ms), csv_filename).update(first_ms, end_ms))
+
+    np.testing.assert_array_equal(read_utc_timestamps_ms(csv_filename), np.arange(first_ms, end_ms, MINUTE_MS))
+    cache = MarketDataBinaryCache.load(csv_filename)
+    assert len(cache.timestamps) == 240
+    assert np.all(np.diff(cache.timestamps) >= 0)
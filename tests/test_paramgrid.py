@@ -0,0 +1,84 @@
+from optimization.paramgrid import ParameterGrid
+from strategies.helper.validation import ParametersValidator
+from strategies.helper.constants import TradeExitMode
+import itertools
+import pytest
+
+
+def get_product(params, validator):
+    '''The parameter dicts of the grid, the way they were enumerated before the lazy grid.'''
+    keys = list(params)
+    product = [dict(zip(keys, values)) for values in itertools.product(*ParameterGrid.iterize(params.values()))]
+    valid = []
+    for p in product:
+        try:
+            if validator(p):
+                valid.append(p)
+        except ValueError:
+            pass
+    return valid
+
+
+STEP1_PARAMS = {
+    "wfo_cycle_id": 1,
+    "needlong": [True, False],
+    "needshort": [False, True],
+    "exitmode": [TradeExitMode.EXIT_MODE_DEFAULT, TradeExitMode.EXIT_MODE_SET_DYNAMIC_SLTP_WITH_ATR],
+    "fastma": range(5, 8),
+    "sl": [None, 2, 3],
+    "tslflag": [False, True],
+    "tp": [None, 4],
+    "slowma": [20, 30],
+    "ttpdist": [None, 1],
+    "tbdist": [None, 1],
+    "numdca": [None, 2, 3],
+    "dcainterval": [None, 5],
+}
+
+
+def test_enumeration_order_matches_filtered_product():
+    grid = ParameterGrid(STEP1_PARAMS)
+    expected = get_product(STEP1_PARAMS, ParametersValidator.validate_params)
+
+    assert len(grid) == len(expected)
+    assert list(grid) == expected
+    assert grid.get_total_count() == len(list(itertools.product(*ParameterGrid.iterize(STEP1_PARAMS.values()))))
+
+
+def test_random_access():
+    grid = ParameterGrid(STEP1_PARAMS)
+    expected = get_product(STEP1_PARAMS, ParametersValidator.validate_params)
+
+    for idx in [0, 1, len(grid) // 3, len(grid) - 1, -1, -len(grid)]:
+        assert grid[idx] == expected[idx]
+    with pytest.raises(IndexError):
+        grid[len(grid)]
+    with pytest.raises(IndexError):
+        grid[-len(grid) - 1]
+
+
+@pytest.mark.parametrize("constrained_keys", [("b", "d"), ("d", "b", "a"), ("a", "b", "c", "d")])
+def test_constrained_parameters_anywhere(constrained_keys):
+    params = {"a": range(3), "b": [1, 2, 3, 4], "c": "x", "d": [0, 1], "e": [True, False]}
+
+    def validator(p):
+        return p["b"] % 2 == p["d"] or p["b"] == 4
+
+    grid = ParameterGrid(params, validator=validator, constrained_keys=constrained_keys)
+
+    assert list(grid) == get_product(params, validator)
+
+
+def test_without_constrained_parameters():
+    params = {"a": range(3), "b": [1, 2], "c": "x"}
+
+    grid = ParameterGrid(params, validator=lambda p: True, constrained_keys=())
+
+    assert list(grid) == get_product(params, lambda p: True)
+
+
+def test_no_valid_combination():
+    grid = ParameterGrid({"needlong": False, "needshort": False, "exitmode": TradeExitMode.EXIT_MODE_DEFAULT, "fastma": [1, 2]})
+
+    assert len(grid) == 0
+    assert list(grid) == []
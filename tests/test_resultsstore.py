@@ -0,0 +1,70 @@
+from model.reports_common import ColumnName
+from model.resultsstore import CsvResultsStore, ParquetResultsStore
+import pytest
+import json
+
+HEADER = [ColumnName.STRATEGY_ID, ColumnName.CURRENCY_PAIR, ColumnName.PARAMETERS, ColumnName.TOTAL_CLOSED_TRADES,
+          ColumnName.NET_PROFIT, ColumnName.EQUITY_CURVE_DATA_POINTS]
+INDEX_COLUMNS = [ColumnName.STRATEGY_ID, ColumnName.CURRENCY_PAIR, ColumnName.PARAMETERS]
+
+
+def get_rows(pair, first_row_id, num_rows):
+    return [["S001", pair, "{{'p': {}}}".format(i), i, 1.5 * i, json.dumps({"1577836800": 1000, "1577923200": 1000 + i})]
+            for i in range(first_row_id, first_row_id + num_rows)]
+
+
+def write_rows(store, batches):
+    store.reset()
+    store.set_header(HEADER)
+    for batch in batches:
+        store.append(batch)
+    store.flush()
+    store.close()
+
+
+@pytest.fixture(params=["csv", "parquet"])
+def store(request, tmp_path):
+    if request.param == "parquet":
+        pytest.importorskip("pyarrow")
+        return ParquetResultsStore(str(tmp_path / "out_Step1.csv"))
+    return CsvResultsStore(str(tmp_path / "out_Step1.csv"))
+
+
+def test_round_trip(store):
+    rows = get_rows("BTCUSDT", 0, 3)
+    write_rows(store, [rows])
+
+    df = store.read(INDEX_COLUMNS)
+
+    assert list(df.index) == [tuple(row[:3]) for row in rows]
+    assert list(df[ColumnName.TOTAL_CLOSED_TRADES]) == [row[3] for row in rows]
+    assert list(df[ColumnName.NET_PROFIT]) == [row[4] for row in rows]
+    assert [json.loads(v) for v in df[ColumnName.EQUITY_CURVE_DATA_POINTS]] == [json.loads(row[5]) for row in rows]
+
+
+def test_rows_are_read_in_append_order(store):
+    batches = [get_rows("ETHUSDT", 0, 2), get_rows("BTCUSDT", 2, 1), get_rows("ADAUSDT", 3, 2)]
+    write_rows(store, batches)
+
+    df = store.read(INDEX_COLUMNS)
+
+    assert list(df.index) == [tuple(row[:3]) for batch in batches for row in batch]
+
+
+def test_read_with_filters(store):
+    write_rows(store, [get_rows("ETHUSDT", 0, 2), get_rows("BTCUSDT", 2, 2)])
+
+    df = store.read(INDEX_COLUMNS, filters={ColumnName.CURRENCY_PAIR: "BTCUSDT"})
+
+    assert list(df[ColumnName.TOTAL_CLOSED_TRADES]) == [2, 3]
+
+
+def test_read_parquet_store_without_parts(tmp_path):
+    pytest.importorskip("pyarrow")
+    store = ParquetResultsStore(str(tmp_path / "out_Step1.csv"))
+    write_rows(store, [])
+
+    df = store.read(INDEX_COLUMNS)
+
+    assert len(df) == 0
+    assert list(df.index.names) == INDEX_COLUMNS